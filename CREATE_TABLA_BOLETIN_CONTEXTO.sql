@@ -0,0 +1,20 @@
+-- Crear tabla boletin_contexto: contexto de boletín ya calculado por grupo y período
+-- Se invalida (contexto = NULL, version + 1) cuando cambian notas, fallas, matrículas o asignaciones del grupo
+-- Equivale a la migración 0003 de app/core/migraciones.py (python -m app.core.migraciones).
+
+CREATE TABLE IF NOT EXISTS `boletin_contexto` (
+  `id_boletin_contexto` int(11) NOT NULL AUTO_INCREMENT,
+  `id_grupo` int(11) NOT NULL,
+  `id_periodo` int(11) NOT NULL,
+  `version` int(11) NOT NULL DEFAULT 0,
+  `contexto` longtext DEFAULT NULL,
+  `fecha_creacion` datetime DEFAULT current_timestamp(),
+  `fecha_actualizacion` datetime DEFAULT NULL,
+  PRIMARY KEY (`id_boletin_contexto`),
+  UNIQUE KEY `uk_boletin_contexto` (`id_grupo`, `id_periodo`),
+  KEY `id_periodo` (`id_periodo`),
+  CONSTRAINT `fk_boletin_contexto_grupo` FOREIGN KEY (`id_grupo`) REFERENCES `grupo` (`id_grupo`) ON DELETE CASCADE,
+  CONSTRAINT `fk_boletin_contexto_periodo` FOREIGN KEY (`id_periodo`) REFERENCES `periodo_academico` (`id_periodo`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+ALTER TABLE `boletin_contexto` COMMENT = 'Snapshot del contexto de boletines por grupo y período. Evita recalcular notas, fallas e intensidades en cada descarga.';
@@ -0,0 +1,26 @@
+-- Crear tabla correo_saliente: cola persistente de correos por enviar
+-- La vacía el trabajador de app/core/correo.py reutilizando la conexión SMTP
+-- (o SendGrid / archivo) y reintenta los fallos con espera creciente.
+-- Equivale a la migración 0003 de app/core/migraciones.py (python -m app.core.migraciones).
+
+CREATE TABLE IF NOT EXISTS `correo_saliente` (
+  `id_correo` int(11) NOT NULL AUTO_INCREMENT,
+  `destinatario` varchar(255) NOT NULL,
+  `asunto` varchar(255) NOT NULL,
+  `html` longtext NOT NULL,
+  `texto` text DEFAULT NULL,
+  `prioridad` int(11) NOT NULL DEFAULT 5,
+  `estado` varchar(20) NOT NULL DEFAULT 'pendiente',
+  `intentos` int(11) NOT NULL DEFAULT 0,
+  `proximo_intento` datetime NOT NULL,
+  `reclamo` varchar(32) DEFAULT NULL,
+  `ultimo_error` text DEFAULT NULL,
+  `lote` varchar(50) DEFAULT NULL,
+  `fecha_creacion` datetime DEFAULT CURRENT_TIMESTAMP,
+  `fecha_actualizacion` datetime DEFAULT NULL,
+  `fecha_envio` datetime DEFAULT NULL,
+  PRIMARY KEY (`id_correo`),
+  KEY `ix_correo_saliente_cola` (`estado`, `proximo_intento`, `prioridad`),
+  KEY `ix_correo_saliente_reclamo` (`reclamo`),
+  KEY `ix_correo_saliente_lote` (`lote`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
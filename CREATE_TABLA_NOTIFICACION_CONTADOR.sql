@@ -0,0 +1,22 @@
+-- Crear tabla notificacion_contador: notificaciones no leídas por usuario
+-- La aplicación la mantiene al crear notificaciones y al marcarlas como leídas.
+-- Incluye el índice de la bandeja (notificacion por destinatario) y el llenado inicial.
+-- Equivale a la migración 0002 de app/core/migraciones.py.
+
+CREATE TABLE IF NOT EXISTS `notificacion_contador` (
+  `id_usuario` int(11) NOT NULL,
+  `no_leidas` int(11) NOT NULL DEFAULT 0,
+  `fecha_actualizacion` datetime DEFAULT NULL,
+  PRIMARY KEY (`id_usuario`),
+  CONSTRAINT `fk_notificacion_contador_usuario` FOREIGN KEY (`id_usuario`) REFERENCES `usuario` (`id_usuario`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+CREATE INDEX `ix_notificacion_destino_id` ON `notificacion` (`id_usuario_destino`, `id_notificacion`);
+
+INSERT INTO `notificacion_contador` (`id_usuario`, `no_leidas`, `fecha_actualizacion`)
+SELECT n.`id_usuario_destino`, COUNT(*), NOW()
+FROM `notificacion` n
+WHERE n.`id_usuario_destino` IS NOT NULL
+  AND (n.`leida` IS NULL OR n.`leida` = 0)
+GROUP BY n.`id_usuario_destino`
+ON DUPLICATE KEY UPDATE `no_leidas` = VALUES(`no_leidas`);
@@ -0,0 +1,18 @@
+-- Crear tabla persona_busqueda: nombre, apellido e identificación normalizados (sin tildes, en minúsculas)
+-- La aplicación la mantiene al crear o editar personas; después de crearla ejecutar una vez
+-- POST /personas/buscar/reindexar para llenar las personas existentes.
+-- Equivale a la migración 0003 de app/core/migraciones.py (python -m app.core.migraciones),
+-- que además llena el índice de búsqueda.
+
+CREATE TABLE IF NOT EXISTS `persona_busqueda` (
+  `id_persona` int(11) NOT NULL,
+  `texto` varchar(400) NOT NULL,
+  `identificacion` varchar(50) DEFAULT NULL,
+  `fecha_actualizacion` datetime DEFAULT NULL,
+  PRIMARY KEY (`id_persona`),
+  KEY `ix_persona_busqueda_texto_trgm` (`texto`),
+  KEY `ix_persona_busqueda_identificacion` (`identificacion`),
+  CONSTRAINT `fk_persona_busqueda_persona` FOREIGN KEY (`id_persona`) REFERENCES `persona` (`id_persona`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+ALTER TABLE `persona_busqueda` COMMENT = 'Texto de búsqueda normalizado por persona. En PostgreSQL el índice de texto es GIN con pg_trgm.';
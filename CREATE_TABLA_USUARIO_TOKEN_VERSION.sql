@@ -0,0 +1,11 @@
+-- Crear tabla usuario_token_version para revocar tokens JWT sin consultar `usuario` en cada petición
+-- Se incrementa la versión al eliminar un usuario, cambiar sus roles o su contraseña
+-- Equivale a la migración 0003 de app/core/migraciones.py (python -m app.core.migraciones).
+
+CREATE TABLE IF NOT EXISTS `usuario_token_version` (
+  `id_usuario` int(11) NOT NULL,
+  `version` int(11) NOT NULL DEFAULT 0,
+  `fecha_actualizacion` datetime DEFAULT NULL,
+  PRIMARY KEY (`id_usuario`),
+  CONSTRAINT `fk_usuario_token_version_usuario` FOREIGN KEY (`id_usuario`) REFERENCES `usuario` (`id_usuario`) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -0,0 +1,66 @@
+# core/bulk.py
+from typing import Dict, List, Sequence, Union
+
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+
+def upsert(
+    db: Union[Session, Connection],
+    model,
+    filas: List[Dict],
+    claves: Sequence[str],
+    actualizar: Sequence[str],
+    sumar: Sequence[str] = (),
+) -> int:
+    """
+    Inserta o actualiza `filas` en una sola sentencia usando el upsert nativo
+    del motor: `ON CONFLICT (...) DO UPDATE` en PostgreSQL/SQLite y
+    `ON DUPLICATE KEY UPDATE` en MySQL. `claves` deben formar una restricción
+    única de la tabla; `actualizar` son las columnas que se sobrescriben y
+    `sumar` las que, si la fila ya existe, se incrementan con el valor nuevo
+    (contadores).
+
+    Escribe con Core (sin pasar por el flush del ORM) y no hace commit.
+    Acepta también una Connection (p. ej. `session.connection()` dentro de un
+    evento de flush).
+    """
+    if not filas:
+        return 0
+
+    bind = db.get_bind() if isinstance(db, Session) else db
+    dialecto = bind.dialect.name
+    tabla = model.__table__
+
+    if dialecto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(tabla).values(filas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(claves),
+            set_={
+                **{col: stmt.excluded[col] for col in actualizar},
+                **{col: tabla.c[col] + stmt.excluded[col] for col in sumar},
+            },
+        )
+    elif dialecto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(tabla).values(filas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(claves),
+            set_={
+                **{col: stmt.excluded[col] for col in actualizar},
+                **{col: tabla.c[col] + stmt.excluded[col] for col in sumar},
+            },
+        )
+    elif dialecto in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(tabla).values(filas)
+        stmt = stmt.on_duplicate_key_update({
+            **{col: stmt.inserted[col] for col in actualizar},
+            **{col: tabla.c[col] + stmt.inserted[col] for col in sumar},
+        })
+    else:
+        raise ValueError(f"Upsert no soportado para el motor '{dialecto}'")
+
+    db.execute(stmt)
+    return len(filas)
@@ -0,0 +1,224 @@
+# core/catalogo_cache.py
+"""
+Listados de catálogos (países, ciudades, grados, jornadas, asignaturas, roles,
+páginas...) servidos desde memoria, ya serializados, con ETag fuerte y
+Last-Modified. Una petición con If-None-Match / If-Modified-Since vigente
+recibe 304 sin cuerpo.
+
+Cada entrada depende de una o más tablas. Un commit que crea, modifica o
+borra filas de esas tablas (desde cualquier ruta, vía ORM) invalida sus
+entradas; CATALOGO_CACHE_TTL cubre cambios hechos en otros procesos o por SQL
+directo (o llamar a `invalidar_catalogos`).
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, UTC
+from email.utils import format_datetime, parsedate_to_datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+
+# Columnas de tablas no catálogo que sí afectan a un listado cacheado
+# (persona → /ubicacion/lugares-nacimiento)
+_COLUMNAS_VIGILADAS = {"persona": ("id_ciudad_nacimiento",)}
+
+
+class _Entrada:
+    __slots__ = ("versiones", "expira", "cuerpo", "etag", "modificado")
+
+    def __init__(self, versiones: tuple, expira: float, cuerpo: bytes, etag: str, modificado: datetime):
+        self.versiones = versiones
+        self.expira = expira
+        self.cuerpo = cuerpo
+        self.etag = etag
+        self.modificado = modificado
+
+
+# === CACHE ===
+class _CacheCatalogos:
+    def __init__(self):
+        self._entradas: "OrderedDict[tuple, _Entrada]" = OrderedDict()
+        self._versiones: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def versiones(self, tablas: Tuple[str, ...]) -> tuple:
+        return tuple(self._versiones.get(t, 0) for t in tablas)
+
+    def obtener(self, clave: tuple, versiones: tuple) -> Optional[_Entrada]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada.versiones != versiones or time.monotonic() >= entrada.expira:
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada
+
+    def guardar(self, clave: tuple, versiones: tuple, cuerpo: bytes) -> _Entrada:
+        """`clave` empieza por las tablas de las que depende la entrada."""
+        settings = get_settings()
+        etag = '"' + hashlib.sha256(cuerpo).hexdigest()[:32] + '"'
+        with self._lock:
+            anterior = self._entradas.get(clave)
+            # Mismo contenido que antes (p. ej. expiró el TTL): se conserva la fecha
+            if anterior is not None and anterior.etag == etag:
+                modificado = anterior.modificado
+            else:
+                modificado = datetime.now(UTC).replace(microsecond=0)
+            entrada = _Entrada(versiones, time.monotonic() + settings.CATALOGO_CACHE_TTL, cuerpo, etag, modificado)
+            # Si se invalidó mientras se consultaba, no se guarda una foto vieja
+            if versiones == self.versiones(clave[0]):
+                self._entradas[clave] = entrada
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > settings.CATALOGO_CACHE_MAX:
+                    self._entradas.popitem(last=False)
+            return entrada
+
+    def invalidar(self, tablas: Iterable[str]):
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+_cache_catalogos = _CacheCatalogos()
+
+
+def invalidar_catalogos(*tablas: str):
+    """Invalida los listados que dependen de `tablas` (todos si no se indica ninguna)."""
+    if tablas:
+        _cache_catalogos.invalidar(tablas)
+    else:
+        _cache_catalogos.limpiar()
+
+
+def version_catalogos(*tablas: str) -> tuple:
+    """Versiones actuales de `tablas`; sirve de llave para índices derivados en memoria."""
+    return _cache_catalogos.versiones(tablas)
+
+
+# === INVALIDACIÓN POR CAMBIOS EN BD ===
+def _tabla_afectada(obj, modificado: bool) -> Optional[str]:
+    tabla = getattr(getattr(obj, "__table__", None), "name", None)
+    if tabla is None:
+        return None
+    columnas = _COLUMNAS_VIGILADAS.get(tabla)
+    if columnas and modificado:
+        estado = inspect(obj)
+        if not any(estado.attrs[c].history.has_changes() for c in columnas):
+            return None
+    return tabla
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_cambios(session: Session, flush_context):
+    tablas = {_tabla_afectada(obj, False) for obj in session.new}
+    tablas |= {_tabla_afectada(obj, True) for obj in session.dirty}
+    tablas |= {_tabla_afectada(obj, False) for obj in session.deleted}
+    tablas.discard(None)
+    if tablas:
+        session.info.setdefault("catalogos_afectados", set()).update(tablas)
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_invalidacion(session: Session):
+    tablas = session.info.pop("catalogos_afectados", None)
+    if tablas:
+        _cache_catalogos.invalidar(tablas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendientes(session: Session):
+    session.info.pop("catalogos_afectados", None)
+
+
+# === RESPUESTA HTTP ===
+@lru_cache(maxsize=64)
+def _adaptador(modelo) -> TypeAdapter:
+    return TypeAdapter(modelo)
+
+
+def _serializar(modelo, datos: Any) -> bytes:
+    adaptador = _adaptador(modelo)
+    return adaptador.dump_json(adaptador.validate_python(datos, from_attributes=True))
+
+
+def coincide_etag(cabecera: str, etag: str) -> bool:
+    # If-None-Match usa comparación débil: W/"x" coincide con "x"
+    if cabecera.strip() == "*":
+        return True
+    return any(e.strip().removeprefix("W/") == etag for e in cabecera.split(","))
+
+
+def _no_modificado(request: Request, entrada: _Entrada) -> bool:
+    si_no_coincide = request.headers.get("if-none-match")
+    if si_no_coincide is not None:
+        return coincide_etag(si_no_coincide, entrada.etag)
+    si_modificado = request.headers.get("if-modified-since")
+    if si_modificado:
+        try:
+            return entrada.modificado <= parsedate_to_datetime(si_modificado)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _respuesta(request: Request, entrada: _Entrada) -> Response:
+    cabeceras = {
+        "ETag": entrada.etag,
+        "Last-Modified": format_datetime(entrada.modificado, usegmt=True),
+        # Respuestas con permisos: solo el navegador guarda, y revalida siempre
+        "Cache-Control": "private, no-cache",
+    }
+    if _no_modificado(request, entrada):
+        return Response(status_code=304, headers=cabeceras)
+    return Response(content=entrada.cuerpo, media_type="application/json", headers=cabeceras)
+
+
+def _clave(request: Request, tablas: Tuple[str, ...]) -> tuple:
+    parametros = tuple(sorted(request.query_params.multi_items()))
+    return (tablas, request.url.path, parametros)
+
+
+def respuesta_catalogo(
+    request: Request,
+    modelo,
+    tablas: Tuple[str, ...],
+    cargar: Callable[[], Any],
+) -> Response:
+    """
+    Listado cacheado para rutas sync. `modelo` es el tipo de la respuesta
+    (p. ej. List[Grado]); `cargar` hace la consulta solo si no hay entrada
+    vigente para la ruta y sus parámetros.
+    """
+    clave = _clave(request, tablas)
+    versiones = _cache_catalogos.versiones(tablas)
+    entrada = _cache_catalogos.obtener(clave, versiones)
+    if entrada is None:
+        entrada = _cache_catalogos.guardar(clave, versiones, _serializar(modelo, cargar()))
+    return _respuesta(request, entrada)
+
+
+async def respuesta_catalogo_async(
+    request: Request,
+    modelo,
+    tablas: Tuple[str, ...],
+    cargar: Callable[[], Awaitable[Any]],
+) -> Response:
+    clave = _clave(request, tablas)
+    versiones = _cache_catalogos.versiones(tablas)
+    entrada = _cache_catalogos.obtener(clave, versiones)
+    if entrada is None:
+        entrada = _cache_catalogos.guardar(clave, versiones, _serializar(modelo, await cargar()))
+    return _respuesta(request, entrada)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pydantic_settings import BaseSettings
 from pathlib import Path
 from functools import lru_cache
@@ -15,17 +16,125 @@ class Settings(BaseSettings):
         "mysql+pymysql://root:@localhost/boletines_academicos"  # Fallback para desarrollo local
     )
 
+    # Pool de conexiones (sync y async). DB_PRE_PING: "siempre" hace un
+    # SELECT 1 en cada checkout, "inactivas" solo si la conexión lleva más de
+    # DB_PRE_PING_INACTIVIDAD segundos sin usarse, "nunca" lo desactiva
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_PRE_PING: str = "inactivas"
+    DB_PRE_PING_INACTIVIDAD: int = 60
+
+    # URL para AsyncSession; si se deja vacía se deriva de DATABASE_URL
+    # (postgresql → asyncpg, mysql → aiomysql)
+    DATABASE_ASYNC_URL: str | None = None
+
     BOLETIN_TEMPLATE_PATH: str = os.getenv(
         "BOLETIN_TEMPLATE_PATH",
         str(Path(__file__).resolve().parent.parent.parent / "BOLETINES TERCERO PRIMER PERIODO REVISADO.docx")
     )
 
+    # Autenticación: con el modo sin estado, el token lleva roles y versión de
+    # credenciales y no se consulta `usuario` en cada petición
+    JWT_PRINCIPAL_SIN_ESTADO: bool = False
+    TOKEN_VERSION_TTL: int = 30
+
+    # Contraseñas: costo de bcrypt (al cambiarlo, cada hash se actualiza en el
+    # siguiente inicio de sesión) y pool de procesos que calcula los hashes.
+    # Con más de HASH_MAX_PENDIENTES operaciones en curso se responde 503;
+    # HASH_PROCESOS = 0 calcula en el propio proceso
+    BCRYPT_ROUNDS: int = 12
+    HASH_PROCESOS: int = 2
+    HASH_MAX_PENDIENTES: int = 32
+
+    # /auth/mi-perfil en memoria por usuario (se invalida al cambiar permisos,
+    # roles o la cuenta; el TTL cubre cambios hechos en otros procesos)
+    PERFIL_CACHE_TTL: int = 300
+    PERFIL_CACHE_MAX: int = 5000
+
+    # Listados de catálogos en memoria con ETag (se invalidan al modificar
+    # sus tablas; el TTL cubre cambios hechos en otros procesos)
+    CATALOGO_CACHE_TTL: int = 600
+    CATALOGO_CACHE_MAX: int = 500
+
+    # Paginación por cursor de los listados (personas, matrículas, notas, fallas, asignaciones).
+    # Es opcional: sin limit ni cursor el listado viene completo; el defecto
+    # aplica cuando llega un cursor sin limit
+    PAGINACION_LIMITE_DEFECTO: int = 500
+    PAGINACION_LIMITE_MAXIMO: int = 2000
+
+    # Segundos que la matriz de permisos se mantiene en memoria
+    PERMISOS_CACHE_TTL: int = 60
+
+    # Generación de boletines por lotes
+    BOLETIN_LOTE_WORKERS: int = 2
+    BOLETIN_LOTE_DIR: str = os.getenv(
+        "BOLETIN_LOTE_DIR",
+        str(Path(tempfile.gettempdir()) / "boletines_lotes")
+    )
+
+    # Imágenes subidas: se guardan como <sha256>.<ext> (mismo contenido = un
+    # solo archivo) y las fotos y firmas llevan miniaturas de estos anchos
+    IMAGEN_DIR: str = "static/images"
+    IMAGEN_TAMANO_MAX_MB: int = 5
+    IMAGEN_ANCHOS_MINIATURA: list[int] = [96, 256]
+    # Anchos aceptados en /imagenes/archivo/{nombre}?w= (cada uno se genera una vez)
+    IMAGEN_ANCHOS_VARIANTE: list[int] = [48, 96, 128, 256, 512]
+    # Las URLs de /imagenes/archivo van firmadas (HMAC con SECRET_KEY) y
+    # vencen entre 1 y 2 veces esta cantidad de segundos después de emitirse.
+    # Es la vida útil real de la cache del navegador: aunque la respuesta diga
+    # "immutable, max-age=1 año", al cambiar de ventana cambia la URL firmada
+    # y la imagen se vuelve a descargar (subirla aumenta los aciertos de cache
+    # a cambio de enlaces válidos por más tiempo)
+    IMAGEN_URL_VIGENCIA: int = 3600
+
+    # Notificaciones en vivo (/notificaciones/stream, SSE): cada cuántos
+    # segundos se manda un ping y se relee el contador (otros procesos)
+    NOTIFICACIONES_SSE_PING: int = 25
+    # Difusión a grupos, grados o roles: filas por INSERT (y por commit)
+    NOTIFICACIONES_LOTE: int = 1000
+
+    # Boletines en PDF (fuente TTF opcional; sin ella se usa Helvetica)
+    BOLETIN_PDF_FUENTE: str | None = None
+    BOLETIN_PDF_FUENTE_NEGRITA: str | None = None
+    BOLETIN_PDF_LOGO: str = os.getenv(
+        "BOLETIN_PDF_LOGO",
+        str(Path(__file__).resolve().parent.parent.parent / "static" / "logo.png")
+    )
+
     # Configuración de correo (SendGrid + SMTP)
     SENDGRID_API_KEY: str | None = None
     EMAIL_FROM: str | None = None
     EMAIL_PASSWORD: str | None = None
     SMTP_SERVER: str | None = None
     SMTP_PORT: str | None = None
+    # Usuario para el login SMTP (si se deja vacío se usa EMAIL_FROM)
+    SMTP_USUARIO: str | None = None
+
+    # Correo saliente: cola `correo_saliente` que vacía un hilo por proceso.
+    # CORREO_BACKEND: "smtp", "sendgrid" o "archivo" (.eml en CORREO_DIR_ARCHIVO,
+    # para desarrollo); vacío elige SendGrid si hay API key, si no SMTP si hay
+    # servidor, si no archivo. La conexión SMTP se reutiliza entre correos
+    # hasta CORREO_SMTP_MAX_POR_CONEXION envíos o CORREO_SMTP_INACTIVIDAD
+    # segundos sin uso. Un fallo se reintenta tras CORREO_REINTENTO_BASE
+    # segundos, duplicando la espera (tope CORREO_REINTENTO_MAX), hasta
+    # CORREO_MAX_INTENTOS intentos
+    CORREO_BACKEND: str = ""
+    CORREO_DIR_ARCHIVO: str = os.getenv(
+        "CORREO_DIR_ARCHIVO",
+        str(Path(tempfile.gettempdir()) / "correos")
+    )
+    CORREO_TRABAJADOR: bool = True
+    CORREO_LOTE: int = 100
+    CORREO_INTERVALO: float = 5.0
+    CORREO_MAX_INTENTOS: int = 6
+    CORREO_REINTENTO_BASE: int = 30
+    CORREO_REINTENTO_MAX: int = 3600
+    CORREO_SMTP_MAX_POR_CONEXION: int = 100
+    CORREO_SMTP_INACTIVIDAD: int = 60
+    # Correos "enviando" más de este tiempo (proceso caído) vuelven a la cola
+    CORREO_RECLAMO_VENCE: int = 600
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,178 @@
+# core/contrasenas.py
+"""
+Hash y verificación de contraseñas (bcrypt) en un pool de procesos acotado.
+
+bcrypt consume CPU a propósito; hecho en los hilos del servidor, un pico de
+inicios de sesión los ocupa todos y el resto de peticiones espera. Aquí el
+trabajo va a HASH_PROCESOS procesos aparte y como máximo HASH_MAX_PENDIENTES
+operaciones pueden estar en curso o en cola: por encima se responde 503 con
+Retry-After en lugar de acumular peticiones. Con HASH_PROCESOS = 0 se calcula
+en el propio proceso (scripts, desarrollo).
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+# === FUNCIONES DEL PROCESO DE HASH ===
+# Nivel de módulo y solo con passlib: se ejecutan en procesos "spawn"
+@lru_cache(maxsize=4)
+def _contexto(rondas: int) -> CryptContext:
+    # min = max = rondas: un hash con otro costo (mayor o menor) pide actualización
+    return CryptContext(
+        schemes=["bcrypt"], deprecated="auto",
+        bcrypt__rounds=rondas, bcrypt__min_rounds=rondas, bcrypt__max_rounds=rondas,
+    )
+
+
+def _hashear(password: str, rondas: int) -> str:
+    return _contexto(rondas).hash(password)
+
+
+def _verificar(password: str, hashed: str, rondas: int) -> Tuple[bool, Optional[str]]:
+    """(válida, hash nuevo si el costo guardado ya no es el configurado)."""
+    try:
+        return _contexto(rondas).verify_and_update(password, hashed)
+    except (ValueError, TypeError):
+        # Hash vacío o con formato desconocido: se trata como contraseña incorrecta
+        return False, None
+
+
+def _calentar() -> bool:
+    return True
+
+
+# === POOL ===
+class _PoolHash:
+    def __init__(self):
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cupos: Optional[threading.BoundedSemaphore] = None
+        self._lock = threading.Lock()
+
+    def _asegurar(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    from .config import get_settings
+                    settings = get_settings()
+                    self._cupos = threading.BoundedSemaphore(settings.HASH_MAX_PENDIENTES)
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=settings.HASH_PROCESOS,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def _reservar(self):
+        if not self._cupos.acquire(blocking=False):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Servidor ocupado validando credenciales. Intente de nuevo en unos segundos.",
+                headers={"Retry-After": "2"},
+            )
+
+    def _reiniciar(self, executor: ProcessPoolExecutor):
+        # Un proceso murió (OOM, kill): se descarta el pool y se crea otro en la siguiente llamada
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.error("Pool de hash de contraseñas roto; se recreará")
+
+    def ejecutar(self, funcion, *args):
+        """Desde código sync: bloquea el hilo (sin CPU) hasta tener el resultado."""
+        if _procesos() == 0:
+            return funcion(*args)
+        executor = self._asegurar()
+        self._reservar()
+        try:
+            return executor.submit(funcion, *args).result()
+        except BrokenProcessPool:
+            self._reiniciar(executor)
+            raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Servicio de contraseñas no disponible")
+        finally:
+            self._cupos.release()
+
+    async def ejecutar_async(self, funcion, *args):
+        if _procesos() == 0:
+            return await run_in_threadpool(funcion, *args)
+        executor = self._asegurar()
+        self._reservar()
+        try:
+            return await asyncio.wrap_future(executor.submit(funcion, *args))
+        except BrokenProcessPool:
+            self._reiniciar(executor)
+            raise HTTPException(status.HTTP_503_SERVICE_UNAVAILABLE, "Servicio de contraseñas no disponible")
+        finally:
+            self._cupos.release()
+
+    def iniciar(self):
+        """Arranca los procesos antes del primer login (spawn tarda ~1 s por proceso)."""
+        if _procesos() == 0:
+            return
+        executor = self._asegurar()
+        try:
+            for futuro in [executor.submit(_calentar) for _ in range(_procesos())]:
+                futuro.result()
+        except BrokenProcessPool:
+            # No impide arrancar: la primera operación intentará con un pool nuevo
+            self._reiniciar(executor)
+
+    def cerrar(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _procesos() -> int:
+    from .config import get_settings
+    return get_settings().HASH_PROCESOS
+
+
+def _rondas() -> int:
+    from .config import get_settings
+    return get_settings().BCRYPT_ROUNDS
+
+
+_pool = _PoolHash()
+
+
+# === API ===
+def hashear_contrasena(password: str) -> str:
+    return _pool.ejecutar(_hashear, password, _rondas())
+
+
+def verificar_contrasena(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return _pool.ejecutar(_verificar, password, hashed, _rondas())
+
+
+async def hashear_contrasena_async(password: str) -> str:
+    return await _pool.ejecutar_async(_hashear, password, _rondas())
+
+
+async def verificar_contrasena_async(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    (válida, hash nuevo). El hash nuevo solo viene cuando la contraseña es
+    válida y fue guardada con un costo distinto de BCRYPT_ROUNDS: quien llama
+    debe guardarlo (rehash transparente al iniciar sesión).
+    """
+    return await _pool.ejecutar_async(_verificar, password, hashed, _rondas())
+
+
+def iniciar_pool_hash():
+    _pool.iniciar()
+
+
+def cerrar_pool_hash():
+    _pool.cerrar()
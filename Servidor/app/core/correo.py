@@ -0,0 +1,416 @@
+# core/correo.py
+"""
+Envío de la cola `correo_saliente`.
+
+Un hilo por proceso toma lotes de hasta CORREO_LOTE correos pendientes
+(primero los de menor `prioridad`), los marca como suyos con un UPDATE
+condicionado (`reclamo`), así varios workers pueden vaciar la misma cola sin
+enviar dos veces, y los envía por el backend configurado:
+
+- smtp: una conexión autenticada que se reutiliza entre correos y lotes (un
+  solo saludo TLS + login por cada CORREO_SMTP_MAX_POR_CONEXION envíos).
+- sendgrid: API v3 con el paquete `sendgrid` (un cliente para todo el proceso).
+- archivo: escribe cada correo como .eml (desarrollo, pruebas).
+
+Un fallo temporal vuelve a la cola con espera creciente; un rechazo
+definitivo (destinatario inválido, 5xx) o agotar CORREO_MAX_INTENTOS lo deja
+como `fallido` con el error.
+"""
+import abc
+import logging
+import random
+import smtplib
+import ssl
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from .config import get_settings
+from ..models.models import CorreoSaliente
+
+logger = logging.getLogger(__name__)
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_ENVIANDO = "enviando"
+ESTADO_ENVIADO = "enviado"
+ESTADO_FALLIDO = "fallido"
+
+
+class ErrorPermanente(Exception):
+    """El servidor rechazó el destinatario o el mensaje: no se reintenta."""
+
+
+class ErrorConexion(Exception):
+    """No se pudo conectar o autenticar: se reintenta el lote completo más tarde."""
+
+
+# === BACKENDS ===
+class BackendCorreo(abc.ABC):
+    nombre = ""
+
+    @abc.abstractmethod
+    def enviar(self, mensaje: EmailMessage):
+        """Envía un correo; ErrorPermanente si no tiene sentido reintentarlo."""
+
+    def cerrar(self):
+        pass
+
+
+class BackendSMTP(BackendCorreo):
+    nombre = "smtp"
+
+    def __init__(self, settings):
+        self.servidor = settings.SMTP_SERVER
+        self.puerto = int(settings.SMTP_PORT or 465)
+        self.usuario = settings.SMTP_USUARIO or settings.EMAIL_FROM
+        self.password = settings.EMAIL_PASSWORD
+        self.max_por_conexion = max(1, settings.CORREO_SMTP_MAX_POR_CONEXION)
+        self._conexion: Optional[smtplib.SMTP] = None
+        self._enviados = 0
+        self._ultimo_uso = 0.0
+
+    def _conectar(self):
+        contexto = ssl.create_default_context()
+        try:
+            if self.puerto == 465:
+                conexion = smtplib.SMTP_SSL(self.servidor, self.puerto, timeout=30, context=contexto)
+            else:
+                conexion = smtplib.SMTP(self.servidor, self.puerto, timeout=30)
+                conexion.ehlo()
+                if conexion.has_extn("starttls"):
+                    conexion.starttls(context=contexto)
+                    conexion.ehlo()
+            if self.password:
+                conexion.login(self.usuario, self.password)
+        except (smtplib.SMTPException, OSError) as e:
+            raise ErrorConexion(f"SMTP {self.servidor}:{self.puerto}: {e}") from e
+        self._conexion, self._enviados = conexion, 0
+
+    def _conexion_vigente(self) -> bool:
+        if self._conexion is None:
+            return False
+        if self._enviados >= self.max_por_conexion:
+            self.cerrar()
+            return False
+        # Tras unos segundos sin uso el servidor pudo cortar: se comprueba con NOOP
+        if time.monotonic() - self._ultimo_uso > 10:
+            try:
+                if self._conexion.noop()[0] != 250:
+                    raise smtplib.SMTPServerDisconnected("NOOP rechazado")
+            except (smtplib.SMTPException, OSError):
+                self._descartar()
+                return False
+        return True
+
+    def _descartar(self):
+        conexion, self._conexion = self._conexion, None
+        if conexion is not None:
+            try:
+                conexion.close()
+            except OSError:
+                pass
+
+    def enviar(self, mensaje: EmailMessage):
+        for intento in (1, 2):
+            if not self._conexion_vigente():
+                self._conectar()
+            try:
+                self._conexion.send_message(mensaje)
+            except smtplib.SMTPServerDisconnected:
+                # Conexión cerrada por el servidor entre correos: una reconexión
+                self._descartar()
+                if intento == 2:
+                    raise
+                continue
+            except smtplib.SMTPRecipientsRefused as e:
+                # 4xx (buzón lleno, greylisting) se reintenta; 5xx es definitivo
+                if all(500 <= codigo < 600 for codigo, _ in e.recipients.values()):
+                    raise ErrorPermanente(f"Destinatario rechazado: {e.recipients}") from e
+                raise
+            except smtplib.SMTPResponseException as e:
+                # Remitente o datos rechazados: la sesión sigue abierta, se limpia con RSET
+                try:
+                    self._conexion.rset()
+                except (smtplib.SMTPException, OSError):
+                    self._descartar()
+                if 500 <= e.smtp_code < 600:
+                    raise ErrorPermanente(f"{e.smtp_code} {e.smtp_error!r}") from e
+                raise
+            self._enviados += 1
+            self._ultimo_uso = time.monotonic()
+            return
+
+    def cerrar(self):
+        conexion, self._conexion = self._conexion, None
+        if conexion is not None:
+            try:
+                conexion.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+
+
+class BackendSendGrid(BackendCorreo):
+    nombre = "sendgrid"
+
+    def __init__(self, settings):
+        try:
+            from sendgrid import SendGridAPIClient
+        except ImportError as e:
+            raise RuntimeError("CORREO_BACKEND=sendgrid requiere el paquete 'sendgrid'") from e
+        self._cliente = SendGridAPIClient(settings.SENDGRID_API_KEY)
+
+    def enviar(self, mensaje: EmailMessage):
+        from python_http_client.exceptions import HTTPError
+        from sendgrid.helpers.mail import Mail
+
+        html = mensaje.get_body(("html",))
+        texto = mensaje.get_body(("plain",))
+        correo = Mail(
+            from_email=mensaje["From"],
+            to_emails=mensaje["To"],
+            subject=mensaje["Subject"],
+            html_content=html.get_content() if html else None,
+            plain_text_content=texto.get_content() if texto else None,
+        )
+        try:
+            self._cliente.send(correo)
+        except HTTPError as e:
+            # 4xx (salvo 429, límite de envío) no se arregla reintentando
+            if 400 <= e.status_code < 500 and e.status_code != 429:
+                raise ErrorPermanente(f"SendGrid {e.status_code}: {e.body!r}") from e
+            raise
+        except OSError as e:
+            raise ErrorConexion(f"SendGrid: {e}") from e
+
+
+class BackendArchivo(BackendCorreo):
+    nombre = "archivo"
+
+    def __init__(self, settings):
+        self.directorio = Path(settings.CORREO_DIR_ARCHIVO)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+    def enviar(self, mensaje: EmailMessage):
+        nombre = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.eml"
+        (self.directorio / nombre).write_bytes(mensaje.as_bytes())
+
+
+_BACKENDS = {b.nombre: b for b in (BackendSMTP, BackendSendGrid, BackendArchivo)}
+
+
+def crear_backend(settings=None) -> BackendCorreo:
+    settings = settings or get_settings()
+    nombre = (settings.CORREO_BACKEND or "").lower()
+    if not nombre:
+        if settings.SENDGRID_API_KEY:
+            nombre = "sendgrid"
+        elif settings.SMTP_SERVER:
+            nombre = "smtp"
+        else:
+            nombre = "archivo"
+    if nombre not in _BACKENDS:
+        raise ValueError(f"CORREO_BACKEND desconocido: {nombre!r} (use smtp, sendgrid o archivo)")
+    return _BACKENDS[nombre](settings)
+
+
+# === MENSAJES ===
+def _mensaje(correo: CorreoSaliente, remitente: str) -> EmailMessage:
+    mensaje = EmailMessage()
+    mensaje["From"] = remitente
+    mensaje["To"] = correo.destinatario
+    mensaje["Subject"] = correo.asunto
+    mensaje["Date"] = formatdate(localtime=True)
+    mensaje["Message-ID"] = make_msgid()
+    if correo.texto:
+        mensaje.set_content(correo.texto)
+        mensaje.add_alternative(correo.html, subtype="html")
+    else:
+        mensaje.set_content(correo.html, subtype="html")
+    return mensaje
+
+
+def _espera_reintento(intentos: int, settings) -> timedelta:
+    segundos = min(settings.CORREO_REINTENTO_BASE * 2 ** max(intentos - 1, 0), settings.CORREO_REINTENTO_MAX)
+    # ± 20 %: los reintentos de un mismo lote no vuelven todos en el mismo segundo
+    return timedelta(seconds=segundos * random.uniform(0.8, 1.2))
+
+
+# === COLA ===
+def _reclamar(db: Session, settings) -> List[CorreoSaliente]:
+    ahora = datetime.utcnow()
+    # Envíos que quedaron a medias (proceso caído) vuelven a la cola
+    db.execute(
+        update(CorreoSaliente)
+        .where(
+            CorreoSaliente.estado == ESTADO_ENVIANDO,
+            CorreoSaliente.fecha_actualizacion < ahora - timedelta(seconds=settings.CORREO_RECLAMO_VENCE),
+        )
+        .values(estado=ESTADO_PENDIENTE, reclamo=None)
+    )
+    ids = list(db.execute(
+        select(CorreoSaliente.id_correo)
+        .where(CorreoSaliente.estado == ESTADO_PENDIENTE, CorreoSaliente.proximo_intento <= ahora)
+        .order_by(CorreoSaliente.prioridad, CorreoSaliente.id_correo)
+        .limit(settings.CORREO_LOTE)
+    ).scalars())
+    if not ids:
+        db.commit()
+        return []
+
+    # Solo quedan con este reclamo las filas que otro proceso no tomó antes
+    reclamo = uuid.uuid4().hex
+    db.execute(
+        update(CorreoSaliente)
+        .where(CorreoSaliente.id_correo.in_(ids), CorreoSaliente.estado == ESTADO_PENDIENTE)
+        .values(estado=ESTADO_ENVIANDO, reclamo=reclamo, fecha_actualizacion=ahora)
+    )
+    db.commit()
+    return list(db.execute(
+        select(CorreoSaliente)
+        .where(CorreoSaliente.reclamo == reclamo)
+        .order_by(CorreoSaliente.prioridad, CorreoSaliente.id_correo)
+    ).scalars())
+
+
+def _registrar_fallo(correo: CorreoSaliente, error: str, permanente: bool, settings, ahora: datetime):
+    correo.intentos += 1
+    correo.ultimo_error = error[:2000]
+    correo.reclamo = None
+    correo.fecha_actualizacion = ahora
+    if permanente or correo.intentos >= settings.CORREO_MAX_INTENTOS:
+        correo.estado = ESTADO_FALLIDO
+        logger.warning("Correo %s a %s descartado: %s", correo.id_correo, correo.destinatario, error)
+    else:
+        correo.estado = ESTADO_PENDIENTE
+        correo.proximo_intento = ahora + _espera_reintento(correo.intentos, settings)
+
+
+def procesar_lote(db: Session, backend: BackendCorreo) -> int:
+    """Envía un lote de la cola y guarda el resultado de cada correo. Devuelve cuántos tomó."""
+    settings = get_settings()
+    correos = _reclamar(db, settings)
+    if not correos:
+        return 0
+
+    remitente = settings.EMAIL_FROM
+    error_conexion: Optional[str] = None
+    for correo in correos:
+        ahora = datetime.utcnow()
+        if error_conexion:
+            # Sin conexión al servidor: el resto del lote se reintenta más tarde
+            _registrar_fallo(correo, error_conexion, False, settings, ahora)
+            continue
+        try:
+            backend.enviar(_mensaje(correo, remitente))
+        except ErrorConexion as e:
+            error_conexion = str(e)
+            logger.error("Sin conexión para enviar correos: %s", e)
+            _registrar_fallo(correo, error_conexion, False, settings, ahora)
+        except ErrorPermanente as e:
+            _registrar_fallo(correo, str(e), True, settings, ahora)
+        except Exception as e:
+            logger.warning("Error enviando correo %s: %s", correo.id_correo, e)
+            _registrar_fallo(correo, f"{type(e).__name__}: {e}", False, settings, ahora)
+        else:
+            correo.estado = ESTADO_ENVIADO
+            correo.reclamo = None
+            correo.intentos += 1
+            correo.fecha_envio = correo.fecha_actualizacion = ahora
+    db.commit()
+    return len(correos)
+
+
+# === TRABAJADOR ===
+class _TrabajadorCorreo:
+    def __init__(self):
+        self._hilo: Optional[threading.Thread] = None
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        if not get_settings().CORREO_TRABAJADOR:
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._ciclo, name="correo-saliente", daemon=True)
+            self._hilo.start()
+
+    def despertar(self):
+        self._despertar.set()
+
+    def detener(self, espera: float = 10):
+        self._detener.set()
+        self._despertar.set()
+        hilo = self._hilo
+        if hilo is not None:
+            hilo.join(espera)
+
+    def _ciclo(self):
+        from .database import SessionLocal
+
+        settings = get_settings()
+        try:
+            backend = crear_backend(settings)
+        except Exception:
+            logger.exception("No se pudo crear el backend de correo; los correos quedan en cola")
+            return
+        logger.info("Trabajador de correo iniciado (backend %s)", backend.nombre)
+        ultimo_envio = time.monotonic()
+        try:
+            while not self._detener.is_set():
+                tomados = 0
+                try:
+                    with SessionLocal() as db:
+                        tomados = procesar_lote(db, backend)
+                except Exception:
+                    logger.exception("Error procesando la cola de correo")
+                if tomados:
+                    ultimo_envio = time.monotonic()
+                    if tomados >= settings.CORREO_LOTE:
+                        # Lote lleno: puede haber más en cola, se sigue sin esperar
+                        continue
+                elif time.monotonic() - ultimo_envio > settings.CORREO_SMTP_INACTIVIDAD:
+                    backend.cerrar()
+                self._despertar.wait(settings.CORREO_INTERVALO)
+                self._despertar.clear()
+        finally:
+            backend.cerrar()
+
+
+_trabajador = _TrabajadorCorreo()
+
+
+def iniciar_envio_correos():
+    _trabajador.iniciar()
+
+
+def detener_envio_correos():
+    _trabajador.detener()
+
+
+def despertar_envio_correos():
+    """Que el trabajador revise la cola ya, sin esperar CORREO_INTERVALO."""
+    _trabajador.despertar()
+
+
+# Un commit que encoló correos despierta al trabajador de este proceso
+@event.listens_for(Session, "after_commit")
+def _despertar_si_hay_correos(session: Session):
+    if session.info.pop("correos_encolados", False):
+        _trabajador.despertar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_aviso(session: Session):
+    session.info.pop("correos_encolados", None)
@@ -1,11 +1,36 @@
 # core/database.py
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from .config import get_settings
+from .pool import ESTRATEGIAS_PRE_PING, PoolAsyncMedido, PoolMedido, pre_ping_inactivas
 
 settings = get_settings()
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+
+
+def _opciones_pool(poolclass) -> dict:
+    if settings.DB_PRE_PING not in ESTRATEGIAS_PRE_PING:
+        raise ValueError(
+            f"DB_PRE_PING inválido: '{settings.DB_PRE_PING}' (use {', '.join(ESTRATEGIAS_PRE_PING)})"
+        )
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_PRE_PING == "siempre",
+    }
+
+
+def _configurar_pool(pool):
+    if settings.DB_PRE_PING == "inactivas":
+        pre_ping_inactivas(pool, settings.DB_PRE_PING_INACTIVIDAD)
+
+
+engine = create_engine(settings.DATABASE_URL, **_opciones_pool(PoolMedido))
+_configurar_pool(engine.pool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -15,4 +40,72 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# === MOTOR ASÍNCRONO (rutas de lectura con AsyncSession) ===
+# Driver async equivalente a cada driver sync de DATABASE_URL
+_DRIVERS_ASYNC = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+    "mariadb": "mariadb+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def url_async(url: str) -> str:
+    """Convierte DATABASE_URL (p. ej. mysql+pymysql://, postgresql://) a su variante async."""
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    u = make_url(url)
+    backend = u.get_backend_name()
+    if backend not in _DRIVERS_ASYNC:
+        raise ValueError(f"No hay driver async configurado para '{backend}'")
+    u = u.set(drivername=_DRIVERS_ASYNC[backend])
+    if backend in ("postgres", "postgresql") and "sslmode" in u.query:
+        # asyncpg no entiende sslmode (libpq); usa ssl con los mismos valores
+        u = u.difference_update_query(["sslmode"]).update_query_dict({"ssl": u.query["sslmode"]})
+    return u.render_as_string(hide_password=False)
+
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine():
+    """Se crea al primer uso para que la app arranque aunque falte el driver async."""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(
+            settings.DATABASE_ASYNC_URL or url_async(settings.DATABASE_URL),
+            **_opciones_pool(PoolAsyncMedido),
+        )
+        _configurar_pool(_async_engine.sync_engine.pool)
+        _AsyncSessionLocal = async_sessionmaker(
+            bind=_async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+def sesion_async():
+    """AsyncSession suelta (`async with sesion_async() as db:`) para procesos largos como SSE."""
+    get_async_engine()
+    return _AsyncSessionLocal()
+
+
+# === MÉTRICAS DEL POOL ===
+def metricas_pool() -> dict:
+    """Estado y latencias de los pools (el async solo si ya se creó)."""
+    metricas = {"sync": engine.pool.metricas()}
+    if _async_engine is not None:
+        metricas["async"] = _async_engine.sync_engine.pool.metricas()
+    return metricas
@@ -1,13 +1,92 @@
 # core/email.py
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from .config import get_settings
+"""
+Correos de la aplicación. No se envían en la petición: se guardan en la cola
+`correo_saliente` y los envía el trabajador de core/correo.py, que reutiliza
+la conexión con el servidor y reintenta los fallos.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from .correo import ESTADO_PENDIENTE, despertar_envio_correos
+from .database import SessionLocal
+from ..models.models import CorreoSaliente
+
+# Prioridades de la cola: menor sale primero
+PRIORIDAD_TRANSACCIONAL = 0
+PRIORIDAD_NORMAL = 5
+PRIORIDAD_MASIVA = 9
+
+# Filas por INSERT al encolar envíos masivos
+_FILAS_POR_INSERT = 1000
+
+
+def encolar_correo(
+    db: Session,
+    destinatario: str,
+    asunto: str,
+    html: str,
+    texto: Optional[str] = None,
+    prioridad: int = PRIORIDAD_NORMAL,
+    lote: Optional[str] = None,
+) -> CorreoSaliente:
+    """Agrega un correo a la cola; sale cuando la transacción hace commit."""
+    correo = CorreoSaliente(
+        destinatario=destinatario,
+        asunto=asunto,
+        html=html,
+        texto=texto,
+        prioridad=prioridad,
+        estado=ESTADO_PENDIENTE,
+        intentos=0,
+        proximo_intento=datetime.utcnow(),
+        lote=lote,
+    )
+    db.add(correo)
+    db.info["correos_encolados"] = True
+    return correo
+
+
+def encolar_correos(
+    db: Session,
+    mensajes: Iterable[Dict],
+    lote: Optional[str] = None,
+    prioridad: int = PRIORIDAD_MASIVA,
+) -> int:
+    """
+    Encola envíos masivos (p. ej. avisos de boletín disponible) con INSERT
+    multi-fila. Cada mensaje es un dict con destinatario, asunto, html y
+    opcionalmente texto. No hace commit; devuelve cuántos se encolaron.
+    """
+    ahora = datetime.utcnow()
+    total, filas = 0, []
+    for mensaje in mensajes:
+        filas.append({
+            "destinatario": mensaje["destinatario"],
+            "asunto": mensaje["asunto"],
+            "html": mensaje["html"],
+            "texto": mensaje.get("texto"),
+            "prioridad": prioridad,
+            "estado": ESTADO_PENDIENTE,
+            "intentos": 0,
+            "proximo_intento": ahora,
+            "lote": lote,
+        })
+        if len(filas) >= _FILAS_POR_INSERT:
+            db.execute(insert(CorreoSaliente), filas)
+            total, filas = total + len(filas), []
+    if filas:
+        db.execute(insert(CorreoSaliente), filas)
+        total += len(filas)
+    if total:
+        db.info["correos_encolados"] = True
+    return total
 
-settings = get_settings()
 
 def enviar_email_recuperacion(email: str, codigo: str):
-    """Envía el código de recuperación usando Gmail y SMTP seguro."""
+    """Encola el código de recuperación con prioridad sobre los envíos masivos."""
     asunto = "Recuperación de contraseña"
     html = f"""
     <h2>Tu código de recuperación es:</h2>
@@ -15,19 +94,9 @@ def enviar_email_recuperacion(email: str, codigo: str):
     <p>Válido por <strong>10 minutos</strong>.</p>
     <p>Si no solicitaste esto, ignora el mensaje.</p>
     """
+    texto = f"Tu código de recuperación es: {codigo}\nVálido por 10 minutos.\nSi no solicitaste esto, ignora el mensaje."
 
-    msg = MIMEMultipart()
-    msg["From"] = settings.EMAIL_FROM
-    msg["To"] = email
-    msg["Subject"] = asunto
-    msg.attach(MIMEText(html, "html"))
-
-    try:
-        # Si usas el puerto 465 (SSL)
-        server = smtplib.SMTP_SSL(settings.SMTP_SERVER, int(settings.SMTP_PORT))
-        server.login(settings.EMAIL_FROM, settings.EMAIL_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        print("✅ Correo enviado correctamente (SMTP SSL)")
-    except Exception as e:
-        print(f"❌ Error al enviar correo SMTP: {e}")
+    with SessionLocal() as db:
+        encolar_correo(db, email, asunto, html, texto, prioridad=PRIORIDAD_TRANSACCIONAL)
+        db.commit()
+    despertar_envio_correos()
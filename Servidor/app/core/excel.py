@@ -0,0 +1,92 @@
+# core/excel.py
+import unicodedata
+from tempfile import SpooledTemporaryFile
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+from urllib.parse import quote
+
+from fastapi.responses import StreamingResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# En memoria hasta 1 MB; por encima el archivo pasa a disco
+_LIMITE_MEMORIA = 1024 * 1024
+_TAMANO_BLOQUE = 64 * 1024
+
+# Mismo estilo que pandas aplica a la fila de encabezados
+_BORDE_FINO = Side(style="thin")
+ESTILO_ENCABEZADO = {
+    "font": Font(bold=True),
+    "border": Border(left=_BORDE_FINO, right=_BORDE_FINO, top=_BORDE_FINO, bottom=_BORDE_FINO),
+    "alignment": Alignment(horizontal="center", vertical="top"),
+}
+
+
+class HojaStreaming:
+    """
+    Hoja XLSX en modo write-only de openpyxl: las filas se escriben a medida
+    que llegan (p. ej. directamente desde el cursor de la BD) y no se guarda
+    el libro completo en memoria.
+
+    Los anchos y las celdas combinadas se declaran antes de escribir filas.
+    """
+
+    def __init__(self, titulo: str, anchos: Optional[Dict[str, float]] = None):
+        self.libro = Workbook(write_only=True)
+        self.hoja = self.libro.create_sheet(titulo)
+        for columna, ancho in (anchos or {}).items():
+            self.hoja.column_dimensions[columna].width = ancho
+
+    def combinar(self, rango: str):
+        self.hoja.merged_cells.add(rango)
+
+    def celda(self, valor: Any, **estilo) -> WriteOnlyCell:
+        celda = WriteOnlyCell(self.hoja, value=valor)
+        for atributo, valor_estilo in estilo.items():
+            setattr(celda, atributo, valor_estilo)
+        return celda
+
+    def fila(self, valores: Sequence[Any]):
+        self.hoja.append(list(valores))
+
+    def filas(self, filas: Iterable[Sequence[Any]]):
+        for valores in filas:
+            self.hoja.append(list(valores))
+
+    def encabezados(self, nombres: Sequence[str]):
+        self.hoja.append([self.celda(nombre, **ESTILO_ENCABEZADO) for nombre in nombres])
+
+    def guardar(self) -> SpooledTemporaryFile:
+        archivo = SpooledTemporaryFile(max_size=_LIMITE_MEMORIA)
+        self.libro.save(archivo)
+        archivo.seek(0)
+        return archivo
+
+
+def _leer_en_bloques(archivo: SpooledTemporaryFile) -> Iterator[bytes]:
+    try:
+        while True:
+            bloque = archivo.read(_TAMANO_BLOQUE)
+            if not bloque:
+                break
+            yield bloque
+    finally:
+        archivo.close()
+
+
+def respuesta_xlsx(hoja: HojaStreaming, filename: str) -> StreamingResponse:
+    """
+    Guarda la hoja en un archivo temporal y lo envía por bloques. El libro se
+    termina de escribir aquí, mientras la sesión de BD sigue abierta.
+    """
+    archivo = hoja.guardar()
+    ascii_nombre = unicodedata.normalize("NFKD", filename).encode("ascii", "ignore").decode().replace('"', "")
+    return StreamingResponse(
+        _leer_en_bloques(archivo),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f"attachment; filename=\"{ascii_nombre}\"; filename*=UTF-8''{quote(filename)}"
+        },
+    )
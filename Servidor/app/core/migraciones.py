@@ -0,0 +1,166 @@
+# core/migraciones.py
+"""
+Migraciones versionadas del esquema.
+
+Cada migración se registra con `@migracion("0001", "descripción")`, se aplica
+una sola vez en orden de versión y queda anotada en `migracion_esquema`.
+`Base.metadata.create_all` solo crea tablas nuevas; lo que cambia en tablas
+existentes (p. ej. índices) va aquí.
+
+Uso:
+    python -m app.core.migraciones            # aplica las pendientes
+    python -m app.core.migraciones --estado   # lista aplicadas / pendientes
+"""
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select, text
+from sqlalchemy.engine import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+# Tabla de control fuera de Base.metadata: no es un modelo de la aplicación
+_metadata = MetaData()
+migracion_esquema = Table(
+    "migracion_esquema",
+    _metadata,
+    Column("version", String(20), primary_key=True),
+    Column("descripcion", String(255), nullable=False),
+    Column("fecha_aplicacion", DateTime, nullable=False),
+)
+
+# Llave del advisory lock de PostgreSQL (varios workers arrancando a la vez)
+_LLAVE_BLOQUEO = 0x626F6C65
+
+
+class Migracion:
+    def __init__(self, version: str, descripcion: str, aplicar: Callable[[Connection], None]):
+        self.version = version
+        self.descripcion = descripcion
+        self.aplicar = aplicar
+
+
+_MIGRACIONES: Dict[str, Migracion] = {}
+
+
+def migracion(version: str, descripcion: str):
+    def registrar(funcion: Callable[[Connection], None]):
+        if version in _MIGRACIONES:
+            raise ValueError(f"Versión de migración duplicada: {version}")
+        _MIGRACIONES[version] = Migracion(version, descripcion, funcion)
+        return funcion
+    return registrar
+
+
+def migraciones() -> List[Migracion]:
+    return [_MIGRACIONES[v] for v in sorted(_MIGRACIONES)]
+
+
+# === EJECUCIÓN ===
+def _aplicadas(conexion: Connection) -> set:
+    return set(conexion.execute(select(migracion_esquema.c.version)).scalars())
+
+
+def pendientes(engine: Engine) -> List[Migracion]:
+    _metadata.create_all(engine, checkfirst=True)
+    with engine.connect() as conexion:
+        aplicadas = _aplicadas(conexion)
+    return [m for m in migraciones() if m.version not in aplicadas]
+
+
+def migrar(engine: Engine = None) -> List[str]:
+    """Aplica las migraciones pendientes, cada una en su propia transacción."""
+    if engine is None:
+        from .database import engine
+    aplicadas_ahora = []
+    for m in pendientes(engine):
+        with engine.begin() as conexion:
+            if conexion.dialect.name == "postgresql":
+                conexion.execute(text("SELECT pg_advisory_xact_lock(:llave)"), {"llave": _LLAVE_BLOQUEO})
+                # Otro proceso pudo aplicarla mientras se esperaba el bloqueo
+                if m.version in _aplicadas(conexion):
+                    continue
+            logger.info("Aplicando migración %s: %s", m.version, m.descripcion)
+            m.aplicar(conexion)
+            conexion.execute(migracion_esquema.insert().values(
+                version=m.version, descripcion=m.descripcion, fecha_aplicacion=datetime.now()
+            ))
+        aplicadas_ahora.append(m.version)
+    return aplicadas_ahora
+
+
+# === MIGRACIONES ===
+def _crear_indices(conexion: Connection, tabla_indices: Dict[str, List[str]]):
+    """Crea (si no existen) índices ya declarados en los modelos; parciales donde el motor lo permite."""
+    from ..models.models import Base
+
+    for tabla, nombres in tabla_indices.items():
+        indices = {i.name: i for i in Base.metadata.tables[tabla].indexes}
+        for nombre in nombres:
+            indices[nombre].create(conexion, checkfirst=True)
+
+
+@migracion("0001", "Índices para los filtros frecuentes (fallas, matrículas, notas, asignaciones, permisos)")
+def _indices_rendimiento(conexion: Connection):
+    _crear_indices(conexion, {
+        "falla": ["ix_falla_persona_asignatura_fecha"],
+        "matricula": ["ix_matricula_grupo_anio_activo"],
+        "calificacion": ["ix_calificacion_periodo_anio_asignatura"],
+        "docente_asignatura": ["ix_docente_asignatura_anio_grado_grupo"],
+        "grupo": ["ix_grupo_director"],
+        "permisos": ["ix_permisos_rol_pagina"],
+        "paginas": ["ix_paginas_ruta"],
+    })
+
+
+@migracion("0002", "Índice de la bandeja de notificaciones y contador de no leídas")
+def _notificaciones(conexion: Connection):
+    from ..models.models import NotificacionContador
+
+    _crear_indices(conexion, {"notificacion": ["ix_notificacion_destino_id"]})
+    NotificacionContador.__table__.create(conexion, checkfirst=True)
+    # Contadores iniciales a partir de las notificaciones existentes
+    conexion.execute(text("""
+        INSERT INTO notificacion_contador (id_usuario, no_leidas, fecha_actualizacion)
+        SELECT n.id_usuario_destino, COUNT(*), CURRENT_TIMESTAMP
+        FROM notificacion n
+        WHERE n.id_usuario_destino IS NOT NULL
+          AND (n.leida IS NULL OR n.leida = :falso)
+          AND NOT EXISTS (SELECT 1 FROM notificacion_contador c WHERE c.id_usuario = n.id_usuario_destino)
+        GROUP BY n.id_usuario_destino
+    """), {"falso": False})
+
+
+@migracion("0003", "Tablas de búsqueda de personas, snapshots de boletín, versión de tokens y cola de correo")
+def _tablas_auxiliares(conexion: Connection):
+    """
+    Tablas que la aplicación escribe desde listeners del ORM (cada alta o
+    edición de persona, cada cambio de notas, cada correo): sin ellas esas
+    escrituras fallan. En PostgreSQL ya las crea `create_all` al arrancar.
+    """
+    from sqlalchemy.orm import Session
+    from ..models.models import BoletinContexto, CorreoSaliente, PersonaBusqueda, UsuarioTokenVersion
+    from ..services.persona_busqueda_service import reindexar
+
+    for modelo in (PersonaBusqueda, BoletinContexto, UsuarioTokenVersion, CorreoSaliente):
+        modelo.__table__.create(conexion, checkfirst=True)
+    # Texto de búsqueda de las personas existentes (la sesión usa la
+    # transacción de la migración: sus commits no la confirman)
+    with Session(bind=conexion) as sesion:
+        reindexar(sesion)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    from .database import engine as _engine
+
+    if "--estado" in sys.argv:
+        faltan = {m.version for m in pendientes(_engine)}
+        for m in migraciones():
+            print(f"{m.version}  {'pendiente' if m.version in faltan else 'aplicada '}  {m.descripcion}")
+    else:
+        aplicadas = migrar(_engine)
+        print(f"Migraciones aplicadas: {', '.join(aplicadas) if aplicadas else 'ninguna (esquema al día)'}")
@@ -0,0 +1,134 @@
+# core/paginacion.py
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, List, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import and_, or_
+
+from .config import get_settings
+
+HEADER_CURSOR = "X-Cursor-Siguiente"
+HEADER_TOTAL = "X-Total-Count"
+
+_settings = get_settings()
+
+
+# === PARÁMETROS ===
+class ParametrosPagina:
+    def __init__(self, limit: Optional[int], cursor: Optional[str], contar: bool):
+        self.limit = limit
+        self.cursor = cursor
+        self.contar = contar
+
+
+def parametros_pagina(
+    limit: Optional[int] = Query(
+        None, ge=1, le=_settings.PAGINACION_LIMITE_MAXIMO,
+        description="Cantidad máxima de registros por página (sin limit ni cursor se devuelve todo)",
+    ),
+    cursor: Optional[str] = Query(
+        None, description=f"Valor del header {HEADER_CURSOR} de la página anterior"
+    ),
+    contar: bool = Query(False, description=f"Incluir el total de registros en {HEADER_TOTAL}"),
+) -> ParametrosPagina:
+    return ParametrosPagina(limit, cursor, contar)
+
+
+# === CURSOR OPACO ===
+def _codificar_valor(valor: Any):
+    if isinstance(valor, datetime):
+        return {"dt": valor.isoformat()}
+    if isinstance(valor, date):
+        return {"d": valor.isoformat()}
+    if isinstance(valor, Decimal):
+        return {"dec": str(valor)}
+    return valor
+
+
+def _decodificar_valor(valor: Any):
+    if isinstance(valor, dict):
+        if "dt" in valor:
+            return datetime.fromisoformat(valor["dt"])
+        if "d" in valor:
+            return date.fromisoformat(valor["d"])
+        if "dec" in valor:
+            return Decimal(valor["dec"])
+    return valor
+
+
+def codificar_cursor(valores: Sequence[Any]) -> str:
+    contenido = json.dumps([_codificar_valor(v) for v in valores], separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenido.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, cantidad: int) -> List[Any]:
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(valores, list) or len(valores) != cantidad:
+            raise ValueError
+        return [_decodificar_valor(v) for v in valores]
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise HTTPException(400, "Cursor de paginación inválido")
+
+
+# === KEYSET ===
+def _despues_de(claves: Sequence, valores: Sequence[Any], descendente: bool = False):
+    """(a, b, c) > (x, y, z) expandido en OR/AND para no depender de row values (< si es descendente)."""
+    condiciones = []
+    for i, columna in enumerate(claves):
+        iguales = [claves[j] == valores[j] for j in range(i)]
+        condiciones.append(and_(*iguales, columna < valores[i] if descendente else columna > valores[i]))
+    return or_(*condiciones)
+
+
+def paginar(
+    query,
+    claves: Sequence,
+    pagina: ParametrosPagina,
+    response: Response,
+    valores: Optional[Callable[[Any], Sequence[Any]]] = None,
+    descendente: bool = False,
+) -> list:
+    """
+    Aplica paginación por llave (keyset) a un `db.query(...)`: ordena por
+    `claves` (columnas no nulas, la última única), filtra lo posterior al
+    cursor y trae `limit + 1` filas para saber si hay otra página.
+
+    La paginación es opcional: sin `limit` ni `cursor` se devuelven todas las
+    filas (como antes de paginar); con cursor y sin limit se usa
+    PAGINACION_LIMITE_DEFECTO.
+
+    El cursor siguiente va en el header X-Cursor-Siguiente (ausente en la
+    última página) y, con `contar=true`, el total filtrado en X-Total-Count.
+    `valores(fila)` extrae las claves de cada fila; por defecto se leen por
+    nombre de columna. Con `descendente` todas las claves van de mayor a menor.
+    """
+    if valores is None:
+        nombres = [columna.key for columna in claves]
+        valores = lambda fila: [getattr(fila, nombre) for nombre in nombres]
+
+    if pagina.contar:
+        response.headers[HEADER_TOTAL] = str(query.order_by(None).count())
+
+    if pagina.cursor:
+        query = query.filter(_despues_de(claves, decodificar_cursor(pagina.cursor, len(claves)), descendente))
+
+    orden = [c.desc() for c in claves] if descendente else claves
+    query = query.order_by(None).order_by(*orden)
+
+    limite = pagina.limit
+    if limite is None:
+        if not pagina.cursor:
+            return query.all()
+        limite = _settings.PAGINACION_LIMITE_DEFECTO
+
+    filas = query.limit(limite + 1).all()
+    if len(filas) > limite:
+        filas = filas[:limite]
+        response.headers[HEADER_CURSOR] = codificar_cursor(valores(filas[-1]))
+    return filas
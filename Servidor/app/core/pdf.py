@@ -1,38 +1,107 @@
 # core/pdf.py
+from functools import lru_cache
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import StyleSheet1, getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.lib import colors
-from jinja2 import Environment, FileSystemLoader
-from io import BytesIO
-import os
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Flowable, PageBreak, SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 
-def generar_boletin_pdf(data: dict) -> BytesIO:
-    buffer = BytesIO()
-    
-    # Configuración del documento
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch)
+from app.core.config import get_settings
+
+
+# === RECURSOS POR PROCESO (fuentes, estilos y logo se construyen una sola vez) ===
+@lru_cache()
+def _fuentes() -> tuple:
+    """Registra la fuente TTF configurada (si hay) y devuelve (normal, negrita)."""
+    settings = get_settings()
+    if settings.BOLETIN_PDF_FUENTE and Path(settings.BOLETIN_PDF_FUENTE).exists():
+        pdfmetrics.registerFont(TTFont("BoletinFuente", settings.BOLETIN_PDF_FUENTE))
+        negrita = "BoletinFuente"
+        if settings.BOLETIN_PDF_FUENTE_NEGRITA and Path(settings.BOLETIN_PDF_FUENTE_NEGRITA).exists():
+            pdfmetrics.registerFont(TTFont("BoletinFuente-Bold", settings.BOLETIN_PDF_FUENTE_NEGRITA))
+            negrita = "BoletinFuente-Bold"
+        pdfmetrics.registerFontFamily("BoletinFuente", normal="BoletinFuente", bold=negrita)
+        return "BoletinFuente", negrita
+    return "Helvetica", "Helvetica-Bold"
+
+
+@lru_cache()
+def _estilos() -> StyleSheet1:
+    fuente, _ = _fuentes()
     styles = getSampleStyleSheet()
-    
+    styles['Normal'].fontName = fuente
+
     # Estilos personalizados
-    styles.add(ParagraphStyle(name='TitleCenter', fontSize=16, alignment=1, spaceAfter=20))
-    styles.add(ParagraphStyle(name='Subtitle', fontSize=12, alignment=1, spaceAfter=10))
-    styles.add(ParagraphStyle(name='Info', fontSize=10, spaceAfter=6))
-    
+    styles.add(ParagraphStyle(name='TitleCenter', fontName=fuente, fontSize=16, alignment=1, spaceAfter=20))
+    styles.add(ParagraphStyle(name='Subtitle', fontName=fuente, fontSize=12, alignment=1, spaceAfter=10))
+    styles.add(ParagraphStyle(name='Info', fontName=fuente, fontSize=10, spaceAfter=6))
+    return styles
+
+
+@lru_cache()
+def _estilo_tabla() -> TableStyle:
+    fuente, negrita = _fuentes()
+    return TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.grey),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+        ('FONTNAME', (0,0), (-1,-1), fuente),
+        ('FONTNAME', (0,0), (-1,0), negrita),
+        ('FONTSIZE', (0,0), (-1,0), 12),
+        ('BOTTOMPADDING', (0,0), (-1,0), 12),
+        ('BACKGROUND', (0,1), (-1,-2), colors.beige),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+        ('ROWBACKGROUNDS', (0,-1), (-1,-1), [colors.lightgrey, colors.white])
+    ])
+
+
+@lru_cache()
+def _logo() -> Optional[ImageReader]:
+    """Logo decodificado una vez; None si no está configurado o no existe."""
+    logo_path = Path(get_settings().BOLETIN_PDF_LOGO)
+    if not logo_path.exists():
+        return None
+    return ImageReader(BytesIO(logo_path.read_bytes()))
+
+
+class _Logo(Flowable):
+    """Dibuja el logo ya decodificado sin volver a leer el archivo por cada boletín."""
+
+    def __init__(self, imagen: ImageReader, width: float, height: float):
+        super().__init__()
+        self.imagen = imagen
+        self.width = width
+        self.height = height
+        self.hAlign = 'LEFT'
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.imagen, 0, 0, self.width, self.height, mask='auto')
+
+
+# === CONSTRUCCIÓN DEL BOLETÍN ===
+def _historia_boletin(data: dict) -> List[Flowable]:
+    styles = _estilos()
     story = []
-    
+
     # === ENCABEZADO ===
-    logo_path = "static/logo.png"  # Asegúrate de tenerlo
-    if os.path.exists(logo_path):
-        logo = Image(logo_path, width=1*inch, height=1*inch)
-        logo.hAlign = 'LEFT'
-        story.append(logo)
-    
-    story.append(Paragraph("COLEGIO EJEMPLO", styles['TitleCenter']))
+    logo = _logo()
+    if logo is not None:
+        story.append(_Logo(logo, width=1*inch, height=1*inch))
+
+    story.append(Paragraph(data.get('institucion', "COLEGIO EJEMPLO"), styles['TitleCenter']))
     story.append(Paragraph("Boletín de Calificaciones", styles['Subtitle']))
     story.append(Spacer(1, 0.2*inch))
-    
+
     # === DATOS DEL ESTUDIANTE ===
     info = f"""
     <b>Estudiante:</b> {data['estudiante']['nombre']} {data['estudiante']['apellido']}<br/>
@@ -42,10 +111,10 @@ def generar_boletin_pdf(data: dict) -> BytesIO:
     """
     story.append(Paragraph(info, styles['Info']))
     story.append(Spacer(1, 0.3*inch))
-    
+
     # === TABLA DE CALIFICACIONES ===
     table_data = [["Asignatura", "Nota", "Fallas", "Observación"]]
-    
+
     for cal in data['calificaciones']:
         fallas = f"{cal['fallas_injustificadas']}I / {cal['fallas_justificadas']}J"
         table_data.append([
@@ -54,31 +123,73 @@ def generar_boletin_pdf(data: dict) -> BytesIO:
             fallas,
             cal.get('observacion', '')
         ])
-    
+
     # Promedio
-    table_data.append(["", "Promedio:", f"{data['promedio']:.2f}", ""])
-    
+    promedio = data['promedio']
+    table_data.append(["", "Promedio:", f"{promedio:.2f}" if isinstance(promedio, (int, float)) else promedio, ""])
+
     table = Table(table_data, colWidths=[3*inch, 0.8*inch, 1*inch, 2*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.grey),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,0), 12),
-        ('BOTTOMPADDING', (0,0), (-1,0), 12),
-        ('BACKGROUND', (0,1), (-1,-2), colors.beige),
-        ('GRID', (0,0), (-1,-1), 0.5, colors.black),
-        ('ROWBACKGROUNDS', (0,-1), (-1,-1), [colors.lightgrey, colors.white])
-    ]))
+    table.setStyle(_estilo_tabla())
     story.append(table)
-    
+
     # === FIRMA ===
     story.append(Spacer(1, 1*inch))
     story.append(Paragraph("_________________________", styles['Normal']))
     story.append(Paragraph(f"{data['director']}", styles['Normal']))
     story.append(Paragraph("Director de Grupo", styles['Normal']))
-    
-    # Generar PDF
+
+    return story
+
+
+def _construir_pdf(historias: List[List[Flowable]]) -> BytesIO:
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch)
+
+    story: List[Flowable] = []
+    for i, historia in enumerate(historias):
+        if i:
+            story.append(PageBreak())
+        story.extend(historia)
+
     doc.build(story)
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+
+def datos_pdf_estudiante(context: Dict, estudiante: Dict) -> dict:
+    """Adapta un estudiante del contexto de `obtener_contexto_boletin` al formato del PDF."""
+    return {
+        "institucion": context["institucion"]["nombre"],
+        "estudiante": {
+            "nombre": estudiante["primer_nombre"] + (f" {estudiante['segundo_nombre']}" if estudiante["segundo_nombre"] else ""),
+            "apellido": estudiante["apellido"],
+        },
+        "grado": context["grupo"]["grado"],
+        "grupo": context["grupo"]["codigo"],
+        "periodo": context["periodo"]["nombre"],
+        "anio": context["grupo"]["anio"],
+        "director": context["grupo"].get("director", ""),
+        "calificaciones": [
+            {
+                "asignatura": asig["asignatura"],
+                "calificacion": asig["nota"],
+                "fallas_justificadas": asig["fallas_justificadas"],
+                "fallas_injustificadas": asig["fallas_injustificadas"],
+                "observacion": asig["desempeno"],
+            }
+            for asig in estudiante["asignaturas"]
+        ],
+        "promedio": estudiante["promedio"],
+    }
+
+
+def generar_boletin_pdf(data: dict) -> BytesIO:
+    return _construir_pdf([_historia_boletin(data)])
+
+
+def generar_boletines_pdf(context: Dict) -> BytesIO:
+    """Todos los estudiantes del contexto en un solo PDF, un boletín por página."""
+    return _construir_pdf([
+        _historia_boletin(datos_pdf_estudiante(context, estudiante))
+        for estudiante in context["estudiantes"]
+    ])
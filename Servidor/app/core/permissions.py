@@ -1,13 +1,189 @@
 # core/permissions.py
 from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..core.database import get_db
-from ..core.security import get_current_user
+from ..core.config import get_settings
+from ..core.database import get_async_db, get_db
+from ..core.security import PrincipalToken, get_current_user, get_current_user_async
 from ..models.models import Permiso, Pagina, usuario_rol
+from typing import Dict, List, Optional, Tuple
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+
+# === MATRIZ ROL → PÁGINA → ACCIÓN EN MEMORIA ===
+class _MatrizPermisos:
+    """
+    Foto de páginas, roles por usuario y permisos, cargada con tres consultas.
+    Los permisos de cada página se guardan ordenados por id_permiso para
+    resolver igual que `.first()` sobre la consulta original.
+    """
+
+    def __init__(self, paginas, roles, permisos):
+        self.paginas: Dict[str, int] = {}
+        for id_pagina, ruta in paginas:
+            self.paginas.setdefault(ruta, id_pagina)
+
+        self.roles: Dict[int, Tuple[int, ...]] = {}
+        for id_usuario, id_rol in roles:
+            self.roles[id_usuario] = self.roles.get(id_usuario, ()) + (id_rol,)
+
+        self.permisos: Dict[int, List[Tuple[int, dict]]] = {}
+        for p in permisos:
+            self.permisos.setdefault(p.id_pagina, []).append((p.id_rol, {
+                "ver": p.puede_ver,
+                "crear": p.puede_crear,
+                "editar": p.puede_editar,
+                "eliminar": p.puede_eliminar,
+            }))
+
+    @classmethod
+    def cargar(cls, db: Session) -> "_MatrizPermisos":
+        return cls(
+            db.execute(_CONSULTA_PAGINAS).all(),
+            db.execute(_CONSULTA_ROLES).all(),
+            db.execute(_CONSULTA_PERMISOS).all(),
+        )
+
+    @classmethod
+    async def cargar_async(cls, db: AsyncSession) -> "_MatrizPermisos":
+        return cls(
+            (await db.execute(_CONSULTA_PAGINAS)).all(),
+            (await db.execute(_CONSULTA_ROLES)).all(),
+            (await db.execute(_CONSULTA_PERMISOS)).all(),
+        )
+
+    def roles_usuario(self, db: Session, id_usuario: int) -> Tuple[int, ...]:
+        rol_ids = self.roles.get(id_usuario)
+        if rol_ids is None:
+            # Usuario que no estaba al cargar la matriz (p. ej. recién creado)
+            rol_ids = tuple(db.execute(_roles_de(id_usuario)).scalars())
+            self.roles[id_usuario] = rol_ids
+        return rol_ids
+
+    async def roles_usuario_async(self, db: AsyncSession, id_usuario: int) -> Tuple[int, ...]:
+        rol_ids = self.roles.get(id_usuario)
+        if rol_ids is None:
+            rol_ids = tuple((await db.execute(_roles_de(id_usuario))).scalars())
+            self.roles[id_usuario] = rol_ids
+        return rol_ids
+
+    def permiso(self, id_pagina: int, rol_ids: Tuple[int, ...]) -> Optional[dict]:
+        for id_rol, acciones in self.permisos.get(id_pagina, ()):
+            if id_rol in rol_ids:
+                return acciones
+        return None
+
+
+_CONSULTA_PAGINAS = select(Pagina.id_pagina, Pagina.ruta).order_by(Pagina.id_pagina)
+_CONSULTA_ROLES = select(usuario_rol.c.id_usuario, usuario_rol.c.id_rol)
+_CONSULTA_PERMISOS = select(
+    Permiso.id_pagina, Permiso.id_rol,
+    Permiso.puede_ver, Permiso.puede_crear, Permiso.puede_editar, Permiso.puede_eliminar,
+).order_by(Permiso.id_permiso)
+
+
+def _roles_de(id_usuario: int):
+    return select(usuario_rol.c.id_rol).where(usuario_rol.c.id_usuario == id_usuario)
+
+
+class _CachePermisos:
+    def __init__(self):
+        self._matriz: Optional[_MatrizPermisos] = None
+        self._expira = 0.0
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def obtener(self, db: Session) -> _MatrizPermisos:
+        matriz = self._matriz
+        if matriz is not None and time.monotonic() < self._expira:
+            return matriz
+
+        with self._lock:
+            if self._matriz is None or time.monotonic() >= self._expira:
+                version = self.version
+                return self._guardar(version, _MatrizPermisos.cargar(db))
+            return self._matriz
+
+    async def obtener_async(self, db: AsyncSession) -> _MatrizPermisos:
+        matriz = self._matriz
+        if matriz is not None and time.monotonic() < self._expira:
+            return matriz
+        # Sin lock (no se puede esperar un threading.Lock en el loop): en el
+        # peor caso dos corrutinas cargan la misma foto
+        version = self.version
+        matriz = await _MatrizPermisos.cargar_async(db)
+        with self._lock:
+            return self._guardar(version, matriz)
+
+    def _guardar(self, version: int, matriz: _MatrizPermisos) -> _MatrizPermisos:
+        # Si se invalidó mientras se cargaba, esta foto no se reutiliza
+        if version == self.version:
+            self._matriz = matriz
+            self._expira = time.monotonic() + get_settings().PERMISOS_CACHE_TTL
+        return matriz
+
+    def invalidar(self):
+        with self._lock:
+            self._matriz = None
+            self._expira = 0.0
+            self.version += 1
+
+
+_cache_permisos = _CachePermisos()
+
+
+def invalidar_cache_permisos():
+    """Descarta la matriz en memoria; llamar después de modificar permisos, páginas o roles de usuario."""
+    _cache_permisos.invalidar()
+    logger.debug("Cache de permisos invalidada")
+
+
+def version_permisos() -> int:
+    """Contador que cambia con cada invalidación (sirve como llave de caches derivados)."""
+    return _cache_permisos.version
+
+
+def _verificar_permiso(matriz: _MatrizPermisos, ruta: str, accion: str, rol_ids: Tuple[int, ...]):
+    # 2. SIN ROLES NO HAY PERMISOS
+    if not rol_ids:
+        raise HTTPException(status_code=403, detail="Usuario sin roles asignados")
+
+    # 3. BUSCAR PERMISO
+    permiso = matriz.permiso(matriz.paginas[ruta], rol_ids)
+
+    if not permiso:
+        raise HTTPException(status_code=403, detail="No tienes permiso para esta página")
+
+    # 4. VERIFICAR ACCIÓN
+    accion_map = {
+        "ver": permiso["ver"],
+        "crear": permiso["crear"],
+        "editar": permiso["editar"],
+        "eliminar": permiso["eliminar"],
+        "importar": permiso["crear"],      # ← REUTILIZAMOS CREAR
+        "exportar": permiso["ver"],       # ← REUTILIZAMOS VER
+        "imprimir": permiso["ver"],       # ← REUTILIZAMOS VER
+    }
+
+    if accion not in accion_map:
+        raise HTTPException(400, f"Acción no soportada: {accion}")
+
+    if not accion_map[accion]:
+        raise HTTPException(403, f"Permiso denegado: {accion}")
+
+
+def _verificar_pagina(matriz: _MatrizPermisos, ruta: str):
+    # 1. BUSCAR PÁGINA POR RUTA (exacta)
+    if ruta not in matriz.paginas:
+        logger.warning(f"Página no encontrada en BD: {ruta}")
+        raise HTTPException(status_code=404, detail=f"Página no encontrada: {ruta}")
+
+
 def require_permission(
     ruta: str,  # ← AHORA ES RUTA
     accion: str  # "ver", "crear", "editar", "eliminar"
@@ -17,48 +193,40 @@ def require_permission(
         db: Session = Depends(get_db)
     ):
         logger.debug(f"Verificando permiso: {ruta} - {accion} para user {user.id_usuario}")
+        matriz = _cache_permisos.obtener(db)
+        _verificar_pagina(matriz, ruta)
+
+        if isinstance(user, PrincipalToken):
+            rol_ids = user.roles
+        else:
+            rol_ids = matriz.roles_usuario(db, user.id_usuario)
+
+        _verificar_permiso(matriz, ruta, accion, rol_ids)
+        return user
+
+    return decorator
+
+
+def require_permission_async(ruta: str, accion: str):
+    """
+    Igual que `require_permission` para rutas async: usuario, matriz y roles
+    se leen con la AsyncSession de la petición (sin hilo del threadpool ni
+    conexión del pool sync).
+    """
+    async def decorator(
+        user = Depends(get_current_user_async),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        logger.debug(f"Verificando permiso: {ruta} - {accion} para user {user.id_usuario}")
+        matriz = await _cache_permisos.obtener_async(db)
+        _verificar_pagina(matriz, ruta)
 
-        # 1. BUSCAR PÁGINA POR RUTA (exacta)
-        pagina = db.query(Pagina).filter(Pagina.ruta == ruta).first()
-        if not pagina:
-            logger.warning(f"Página no encontrada en BD: {ruta}")
-            raise HTTPException(status_code=404, detail=f"Página no encontrada: {ruta}")
-
-        # 2. OBTENER ROLES DEL USUARIO
-        roles = db.query(usuario_rol.c.id_rol).filter(
-            usuario_rol.c.id_usuario == user.id_usuario
-        ).all()
-        rol_ids = [r.id_rol for r in roles]
-
-        if not rol_ids:
-            raise HTTPException(status_code=403, detail="Usuario sin roles asignados")
-
-        # 3. BUSCAR PERMISO
-        permiso = db.query(Permiso).filter(
-            Permiso.id_rol.in_(rol_ids),
-            Permiso.id_pagina == pagina.id_pagina
-        ).first()
-
-        if not permiso:
-            raise HTTPException(status_code=403, detail="No tienes permiso para esta página")
-
-        # 4. VERIFICAR ACCIÓN
-        accion_map = {
-            "ver": permiso.puede_ver,
-            "crear": permiso.puede_crear,
-            "editar": permiso.puede_editar,
-            "eliminar": permiso.puede_eliminar,
-            "importar": permiso.puede_crear,      # ← REUTILIZAMOS CREAR
-            "exportar": permiso.puede_ver,       # ← REUTILIZAMOS VER
-            "imprimir": permiso.puede_ver,       # ← REUTILIZAMOS VER
-        }
-
-        if accion not in accion_map:
-            raise HTTPException(400, f"Acción no soportada: {accion}")
-
-        if not accion_map[accion]:
-            raise HTTPException(403, f"Permiso denegado: {accion}")
+        if isinstance(user, PrincipalToken):
+            rol_ids = user.roles
+        else:
+            rol_ids = await matriz.roles_usuario_async(db, user.id_usuario)
 
+        _verificar_permiso(matriz, ruta, accion, rol_ids)
         return user
 
-    return decorator
\ No newline at end of file
+    return decorator
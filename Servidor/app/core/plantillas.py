@@ -0,0 +1,141 @@
+# core/plantillas.py
+import re
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Tuple
+
+from docxtpl import DocxTemplate
+from jinja2 import Environment, Template, TemplateError
+
+
+class _EntradaPlantilla:
+    """
+    Plantilla .docx cargada en memoria: bytes originales, XML ya parcheado por
+    docxtpl y plantillas Jinja compiladas, compartidos por todas las copias.
+    """
+
+    def __init__(self, ruta: Path, mtime_ns: int, tamano: int):
+        self.ruta = ruta
+        self.mtime_ns = mtime_ns
+        self.tamano = tamano
+        self.contenido = ruta.read_bytes()
+        self.jinja_env = Environment()
+        self._parcheados: Dict[str, str] = {}
+        self._compiladas: Dict[str, Tuple[Template, str]] = {}
+        self._lock = threading.Lock()
+
+    def parchear(self, src_xml: str, patch) -> str:
+        parcheado = self._parcheados.get(src_xml)
+        if parcheado is None:
+            parcheado = patch(src_xml)
+            with self._lock:
+                self._parcheados[src_xml] = parcheado
+        return parcheado
+
+    def compilar(self, src_xml: str) -> Tuple[Template, str]:
+        compilada = self._compiladas.get(src_xml)
+        if compilada is None:
+            # Mismo preprocesado que DocxTemplate.render_xml_part
+            fuente = re.sub(r"<w:p([ >])", r"\n<w:p\1", src_xml)
+            compilada = (self.jinja_env.from_string(fuente), fuente)
+            with self._lock:
+                self._compiladas[src_xml] = compilada
+        return compilada
+
+    def precompilar(self):
+        """Parchea y compila cuerpo, encabezados y pies una sola vez."""
+        copia = PlantillaCompilada(self)
+        copia.init_docx()
+        copia.render_init()
+        self.compilar(copia.patch_xml(copia.get_xml()))
+        for uri in (DocxTemplate.HEADER_URI, DocxTemplate.FOOTER_URI):
+            for _, part in copia.get_headers_footers(uri):
+                self.compilar(copia.patch_xml(copia.get_part_xml(part)))
+
+
+class PlantillaCompilada(DocxTemplate):
+    """
+    Copia de trabajo de una plantilla registrada. Se abre desde los bytes en
+    memoria y reutiliza el XML parcheado y el Jinja compilado de su entrada,
+    así que cada render solo paga el parseo del paquete y el render en sí.
+    """
+
+    def __init__(self, entrada: _EntradaPlantilla):
+        super().__init__(BytesIO(entrada.contenido))
+        self._entrada = entrada
+
+    def init_docx(self, reload: bool = True):
+        if isinstance(self.template_file, BytesIO):
+            self.template_file.seek(0)
+        super().init_docx(reload)
+
+    def patch_xml(self, src_xml):
+        return self._entrada.parchear(src_xml, super().patch_xml)
+
+    def render_xml_part(self, src_xml, part, context, jinja_env=None):
+        if jinja_env is not None:
+            return super().render_xml_part(src_xml, part, context, jinja_env)
+
+        template, fuente = self._entrada.compilar(src_xml)
+        try:
+            self.current_rendering_part = part
+            dst_xml = template.render(context)
+        except TemplateError as exc:
+            if hasattr(exc, "lineno") and exc.lineno is not None:
+                line_number = max(exc.lineno - 4, 0)
+                exc.docx_context = map(
+                    lambda x: re.sub(r"<[^>]+>", "", x),
+                    fuente.splitlines()[line_number: (line_number + 7)],
+                )
+            raise exc
+        dst_xml = re.sub(r"\n<w:p([ >])", r"<w:p\1", dst_xml)
+        dst_xml = (
+            dst_xml.replace("{_{", "{{")
+            .replace("}_}", "}}")
+            .replace("{_%", "{%")
+            .replace("%_}", "%}")
+        )
+        return self.resolve_listing(dst_xml)
+
+
+class RegistroPlantillas:
+    """
+    Registro por proceso de plantillas .docx, indexado por ruta y validado con
+    mtime/tamaño: si el archivo cambia en disco se vuelve a cargar y compilar.
+    """
+
+    def __init__(self):
+        self._entradas: Dict[str, _EntradaPlantilla] = {}
+        self._lock = threading.Lock()
+
+    def _entrada(self, ruta: str) -> _EntradaPlantilla:
+        path = Path(ruta).resolve()
+        stat = path.stat()
+        clave = str(path)
+
+        entrada = self._entradas.get(clave)
+        if entrada and entrada.mtime_ns == stat.st_mtime_ns and entrada.tamano == stat.st_size:
+            return entrada
+
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada.mtime_ns != stat.st_mtime_ns or entrada.tamano != stat.st_size:
+                entrada = _EntradaPlantilla(path, stat.st_mtime_ns, stat.st_size)
+                entrada.precompilar()
+                self._entradas[clave] = entrada
+            return entrada
+
+    def obtener(self, ruta: str) -> PlantillaCompilada:
+        """Devuelve una copia nueva lista para `render()`/`save()`."""
+        return PlantillaCompilada(self._entrada(ruta))
+
+    def invalidar(self, ruta: str | None = None):
+        with self._lock:
+            if ruta is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(str(Path(ruta).resolve()), None)
+
+
+registro_plantillas = RegistroPlantillas()
@@ -0,0 +1,156 @@
+# core/pool.py
+import bisect
+import logging
+import threading
+import time
+from typing import Dict, List, Sequence
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de cada cubeta; la última es "+Inf"
+CUBETAS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+ESTRATEGIAS_PRE_PING = ("siempre", "nunca", "inactivas")
+
+
+# === HISTOGRAMA ===
+class Histograma:
+    """Histograma acumulado de duraciones (mismas cubetas que Prometheus: le = límite)."""
+
+    def __init__(self, cubetas: Sequence[float] = CUBETAS_MS):
+        self.cubetas = tuple(cubetas)
+        self._conteos: List[int] = [0] * (len(self.cubetas) + 1)
+        self._suma = 0.0
+        self._maximo = 0.0
+        self._lock = threading.Lock()
+
+    def registrar(self, ms: float):
+        indice = bisect.bisect_left(self.cubetas, ms)
+        with self._lock:
+            self._conteos[indice] += 1
+            self._suma += ms
+            if ms > self._maximo:
+                self._maximo = ms
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            conteos = list(self._conteos)
+            suma, maximo = self._suma, self._maximo
+        total = sum(conteos)
+        acumulado, cubetas = 0, {}
+        for limite, conteo in zip(self.cubetas + ("+Inf",), conteos):
+            acumulado += conteo
+            cubetas[str(limite)] = acumulado
+        return {
+            "total": total,
+            "suma_ms": round(suma, 3),
+            "promedio_ms": round(suma / total, 3) if total else 0.0,
+            "max_ms": round(maximo, 3),
+            "cubetas_ms": cubetas,
+        }
+
+
+# === POOL CON MÉTRICAS ===
+class _MedicionPool:
+    """
+    Mide, por cada checkout: la espera por una conexión libre (`espera`), el
+    checkout completo incluyendo pre-ping o conexión nueva (`checkout`) y el
+    tiempo que la petición retiene la conexión (`uso`).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hist_espera = Histograma()
+        self.hist_checkout = Histograma()
+        self.hist_uso = Histograma()
+        self.timeouts = 0
+        self.checkouts = 0
+        # `+= 1` no es atómico entre hilos
+        self._lock_contadores = threading.Lock()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            registro = super()._do_get()
+        except exc.TimeoutError:
+            with self._lock_contadores:
+                self.timeouts += 1
+            logger.warning("Timeout esperando conexión del pool (%s)", self.status())
+            raise
+        finally:
+            self.hist_espera.registrar((time.perf_counter() - inicio) * 1000)
+        registro.info["inicio_uso"] = time.perf_counter()
+        return registro
+
+    def _do_return_conn(self, registro):
+        inicio = registro.info.pop("inicio_uso", None)
+        if inicio is not None:
+            self.hist_uso.registrar((time.perf_counter() - inicio) * 1000)
+        super()._do_return_conn(registro)
+
+    def connect(self):
+        inicio = time.perf_counter()
+        conexion = super().connect()
+        with self._lock_contadores:
+            self.checkouts += 1
+        self.hist_checkout.registrar((time.perf_counter() - inicio) * 1000)
+        return conexion
+
+    def metricas(self) -> Dict:
+        with self._lock_contadores:
+            checkouts, timeouts = self.checkouts, self.timeouts
+        return {
+            "clase": type(self).__name__,
+            "tamano": self.size(),
+            "en_uso": self.checkedout(),
+            "disponibles": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "max_overflow": self._max_overflow,
+            "timeout_s": self.timeout(),
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "espera": self.hist_espera.to_dict(),
+            "checkout": self.hist_checkout.to_dict(),
+            "uso": self.hist_uso.to_dict(),
+        }
+
+
+class PoolMedido(_MedicionPool, QueuePool):
+    pass
+
+
+class PoolAsyncMedido(_MedicionPool, AsyncAdaptedQueuePool):
+    pass
+
+
+# === PRE-PING SOLO PARA CONEXIONES INACTIVAS ===
+def pre_ping_inactivas(pool, inactividad: float):
+    """
+    Hace `SELECT 1` solo si la conexión lleva más de `inactividad` segundos sin
+    usarse; si falla, el pool la descarta y entrega otra (DisconnectionError).
+    """
+
+    @event.listens_for(pool, "checkin")
+    def _marcar(dbapi_connection, connection_record):
+        connection_record.info["ultimo_uso"] = time.monotonic()
+
+    @event.listens_for(pool, "checkout")
+    def _verificar(dbapi_connection, connection_record, connection_proxy):
+        ultimo = connection_record.info.get("ultimo_uso")
+        if ultimo is None or time.monotonic() - ultimo < inactividad:
+            return
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        except Exception as e:
+            logger.info("Conexión inactiva descartada por el pre-ping: %s", e)
+            raise exc.DisconnectionError() from e
+        finally:
+            try:
+                cursor.close()
+            except Exception:
+                pass
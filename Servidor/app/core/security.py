@@ -1,21 +1,26 @@
 # core/security.py
 from datetime import datetime, timedelta, UTC
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from fastapi import HTTPException, status, Depends
-from ..models.models import Usuario
-from ..core.database import get_db
+from ..models.models import Usuario, UsuarioTokenVersion, usuario_rol
+from ..core.database import get_async_db, get_db
+from ..core.contrasenas import hashear_contrasena, verificar_contrasena
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from typing import Dict, Optional, Tuple
+import threading
+import time
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
+# bcrypt corre en el pool de procesos de core/contrasenas (no en los hilos del servidor)
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    valida, _ = verificar_contrasena(plain, hashed)
+    return valida
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hashear_contrasena(password)
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     from ..core.config import get_settings
@@ -33,16 +38,122 @@ def decode_token(token: str):
     except JWTError:
         return None
 
+# === VERSIÓN DE TOKENS (revocación) ===
+class _VersionesToken:
+    """
+    Versiones de credenciales de todos los usuarios en memoria, recargadas en
+    bloque cada TOKEN_VERSION_TTL segundos. Usuarios sin fila tienen versión 0.
+    """
+
+    def __init__(self):
+        self._versiones: Dict[int, int] = {}
+        self._expira = 0.0
+        self._lock = threading.Lock()
+
+    def _cargar(self, filas):
+        from ..core.config import get_settings
+        self._versiones = dict(filas)
+        self._expira = time.monotonic() + get_settings().TOKEN_VERSION_TTL
+
+    def version(self, db: Session, id_usuario: int) -> int:
+        if time.monotonic() >= self._expira:
+            with self._lock:
+                if time.monotonic() >= self._expira:
+                    self._cargar(db.query(UsuarioTokenVersion.id_usuario, UsuarioTokenVersion.version).all())
+        return self._versiones.get(id_usuario, 0)
+
+    async def version_async(self, db: AsyncSession, id_usuario: int) -> int:
+        if time.monotonic() >= self._expira:
+            # Sin lock: en el peor caso dos corrutinas recargan la misma foto
+            filas = (await db.execute(
+                select(UsuarioTokenVersion.id_usuario, UsuarioTokenVersion.version)
+            )).all()
+            self._cargar(filas)
+        return self._versiones.get(id_usuario, 0)
+
+    def invalidar(self):
+        self._expira = 0.0
+
+
+_versiones_token = _VersionesToken()
+
+
+def version_token_usuario(db: Session, id_usuario: int) -> int:
+    return _versiones_token.version(db, id_usuario)
+
+
+async def version_token_usuario_async(db: AsyncSession, id_usuario: int) -> int:
+    return await _versiones_token.version_async(db, id_usuario)
+
+
+def revocar_tokens_usuario(db: Session, id_usuario: int):
+    """
+    Incrementa la versión de credenciales del usuario (baja, cambio de roles o
+    de contraseña). Los tokens anteriores dejan de valer cuando la transacción
+    se confirma; no hace commit.
+    """
+    registro = db.get(UsuarioTokenVersion, id_usuario)
+    if registro:
+        registro.version += 1
+        registro.fecha_actualizacion = datetime.now()
+    else:
+        db.add(UsuarioTokenVersion(id_usuario=id_usuario, version=1, fecha_actualizacion=datetime.now()))
+    event.listen(db, "after_commit", lambda session: _versiones_token.invalidar(), once=True)
+
+
+def datos_token_usuario(db: Session, user: Usuario) -> dict:
+    """Claims del token: identidad, ids de rol y versión de credenciales."""
+    rol_ids = [r.id_rol for r in db.query(usuario_rol.c.id_rol).filter(
+        usuario_rol.c.id_usuario == user.id_usuario
+    )]
+    return {
+        "sub": user.username,
+        "uid": user.id_usuario,
+        "roles": rol_ids,
+        "ver": version_token_usuario(db, user.id_usuario),
+    }
+
+
+async def datos_token_usuario_async(db: AsyncSession, user: Usuario) -> dict:
+    rol_ids = (await db.execute(
+        select(usuario_rol.c.id_rol).where(usuario_rol.c.id_usuario == user.id_usuario)
+    )).scalars().all()
+    return {
+        "sub": user.username,
+        "uid": user.id_usuario,
+        "roles": list(rol_ids),
+        "ver": await version_token_usuario_async(db, user.id_usuario),
+    }
+
+
+class PrincipalToken:
+    """Usuario autenticado solo con los datos del token (sin consultar `usuario`)."""
+
+    def __init__(self, id_usuario: int, username: str, roles: Tuple[int, ...]):
+        self.id_usuario = id_usuario
+        self.username = username
+        self.roles = roles
+
+    def __repr__(self):
+        return f"PrincipalToken(id_usuario={self.id_usuario}, username={self.username!r})"
+
+
 # === OBTENER USUARIO ACTUAL ===
 from fastapi.security import OAuth2PasswordBearer
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/iniciar-sesion")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def credenciales_invalidas() -> HTTPException:
+    """401 estándar para tokens ausentes, inválidos, vencidos o revocados."""
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Token inválido o expirado",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def payload_valido(token: str) -> dict:
+    """Claims del token firmado y vigente (con `sub` y `uid`); 401 si no lo es."""
+    credentials_exception = credenciales_invalidas()
     payload = decode_token(token)
     if not payload:
         raise credentials_exception
@@ -51,13 +162,58 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user_id: int = payload.get("uid")
     if not username or not user_id:
         raise credentials_exception
+    return payload
 
+
+def get_usuario_actual(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Usuario:
+    """Usuario ORM completo; para endpoints que leen o modifican la cuenta."""
+    payload = payload_valido(token)
     user = db.query(Usuario).filter(
-        Usuario.id_usuario == user_id,
-        Usuario.username == username,
+        Usuario.id_usuario == payload["uid"],
+        Usuario.username == payload["sub"],
         Usuario.fecha_eliminacion.is_(None)
     ).first()
     if not user:
-        raise credentials_exception
+        raise credenciales_invalidas()
+
+    return user
 
-    return user
\ No newline at end of file
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """
+    Usuario autenticado para verificar permisos. Con JWT_PRINCIPAL_SIN_ESTADO
+    y un token que trae versión, basta comparar la versión en memoria (sin
+    consultas mientras la cache esté vigente); tokens antiguos cargan el usuario.
+    """
+    from ..core.config import get_settings
+    payload = payload_valido(token)
+
+    if not get_settings().JWT_PRINCIPAL_SIN_ESTADO or "ver" not in payload:
+        return get_usuario_actual(token, db)
+
+    if payload["ver"] != version_token_usuario(db, payload["uid"]):
+        raise credenciales_invalidas()
+
+    return PrincipalToken(payload["uid"], payload["sub"], tuple(payload.get("roles") or ()))
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """`get_current_user` para rutas async: misma lógica sobre la AsyncSession de la petición."""
+    from ..core.config import get_settings
+    payload = payload_valido(token)
+
+    if get_settings().JWT_PRINCIPAL_SIN_ESTADO and "ver" in payload:
+        if payload["ver"] != await version_token_usuario_async(db, payload["uid"]):
+            raise credenciales_invalidas()
+        return PrincipalToken(payload["uid"], payload["sub"], tuple(payload.get("roles") or ()))
+
+    user = (await db.execute(
+        select(Usuario).where(
+            Usuario.id_usuario == payload["uid"],
+            Usuario.username == payload["sub"],
+            Usuario.fecha_eliminacion.is_(None),
+        )
+    )).scalar_one_or_none()
+    if not user:
+        raise credenciales_invalidas()
+    return user
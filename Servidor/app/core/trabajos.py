@@ -0,0 +1,122 @@
+# core/trabajos.py
+import logging
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_EN_PROCESO = "en_proceso"
+ESTADO_COMPLETADO = "completado"
+ESTADO_FALLIDO = "fallido"
+
+
+class Trabajo:
+    """Estado de un trabajo en segundo plano (generación por lotes, envíos masivos, etc.)."""
+
+    def __init__(self, tipo: str, total: int = 0):
+        self.id_trabajo = uuid.uuid4().hex
+        self.tipo = tipo
+        self.estado = ESTADO_PENDIENTE
+        self.total = total
+        self.procesados = 0
+        self.errores: List[str] = []
+        self.resultado: Optional[str] = None
+        self.fecha_creacion = datetime.now()
+        self.fecha_fin: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def avanzar(self, cantidad: int = 1, error: Optional[str] = None):
+        with self._lock:
+            self.procesados += cantidad
+            if error:
+                self.errores.append(error)
+
+    def finalizar(self, resultado: Optional[str] = None, error: Optional[str] = None):
+        with self._lock:
+            self.resultado = resultado
+            if error:
+                self.errores.append(error)
+                self.estado = ESTADO_FALLIDO
+            else:
+                self.estado = ESTADO_COMPLETADO
+            self.fecha_fin = datetime.now()
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "id_trabajo": self.id_trabajo,
+                "tipo": self.tipo,
+                "estado": self.estado,
+                "total": self.total,
+                "procesados": self.procesados,
+                "porcentaje": round(self.procesados * 100 / self.total, 1) if self.total else 0.0,
+                "errores": list(self.errores),
+                "fecha_creacion": self.fecha_creacion,
+                "fecha_fin": self.fecha_fin,
+            }
+
+
+class RegistroTrabajos:
+    """
+    Registro en memoria de los trabajos lanzados por este proceso.
+    Los trabajos terminados se descartan pasado el tiempo de retención;
+    `al_descartar` permite limpiar los archivos que hayan generado.
+    """
+
+    def __init__(self, retencion: timedelta = timedelta(hours=24)):
+        self._trabajos: Dict[str, Trabajo] = {}
+        self._lock = threading.Lock()
+        self.retencion = retencion
+
+    def crear(self, tipo: str, total: int = 0) -> Trabajo:
+        trabajo = Trabajo(tipo, total)
+        with self._lock:
+            self._trabajos[trabajo.id_trabajo] = trabajo
+        return trabajo
+
+    def obtener(self, id_trabajo: str) -> Optional[Trabajo]:
+        with self._lock:
+            return self._trabajos.get(id_trabajo)
+
+    def lanzar(self, trabajo: Trabajo, funcion: Callable, *args, **kwargs) -> threading.Thread:
+        """Ejecuta `funcion(trabajo, *args, **kwargs)` en un hilo propio."""
+        def _ejecutar():
+            trabajo.estado = ESTADO_EN_PROCESO
+            try:
+                funcion(trabajo, *args, **kwargs)
+                if trabajo.estado == ESTADO_EN_PROCESO:
+                    trabajo.finalizar(trabajo.resultado)
+            except Exception as e:
+                logger.exception(f"Error en trabajo {trabajo.tipo} {trabajo.id_trabajo}")
+                trabajo.finalizar(error=str(e))
+
+        hilo = threading.Thread(target=_ejecutar, name=f"trabajo-{trabajo.tipo}", daemon=True)
+        hilo.start()
+        return hilo
+
+    def purgar(self, al_descartar: Optional[Callable[[Trabajo], None]] = None, tipo: Optional[str] = None):
+        """
+        Descarta los trabajos terminados hace más de `retencion`. Con `tipo`
+        solo los de ese tipo: cada servicio purga los suyos con su limpieza.
+        """
+        limite = datetime.now() - self.retencion
+        with self._lock:
+            vencidos = [
+                t for t in self._trabajos.values()
+                if t.fecha_fin is not None and t.fecha_fin < limite
+                and (tipo is None or t.tipo == tipo)
+            ]
+            for trabajo in vencidos:
+                del self._trabajos[trabajo.id_trabajo]
+        if al_descartar:
+            for trabajo in vencidos:
+                try:
+                    al_descartar(trabajo)
+                except Exception:
+                    logger.warning(f"No se pudo limpiar el trabajo {trabajo.id_trabajo}")
+
+
+registro_trabajos = RegistroTrabajos()
@@ -36,6 +36,9 @@ class Persona(PersonaBase):
     id_persona: int
     tipo_identificacion_nombre: Optional[str] = None
     ciudad_nacimiento_nombre: Optional[str] = None
+    # URLs firmadas de las miniaturas de foto y firma (relativas a la raíz de la API)
+    foto_miniatura: Optional[str] = None
+    firma_miniatura: Optional[str] = None
     fecha_creacion: Optional[datetime ] = None
     fecha_actualizacion: Optional[datetime ] = None
     fecha_eliminacion: Optional[datetime ] = None
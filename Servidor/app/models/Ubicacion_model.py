@@ -1,6 +1,6 @@
 # models/Ubicacion_model.py
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class PaisBase(BaseModel):
@@ -56,4 +56,22 @@ class LugarNacimiento(BaseModel):
     nombre_completo: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Árbol país → departamento → ciudad (/ubicacion/arbol)
+class CiudadArbol(BaseModel):
+    id_ciudad: int
+    nombre: str
+
+
+class DepartamentoArbol(BaseModel):
+    id_departamento: int
+    nombre: str
+    ciudades: List[CiudadArbol] = []
+
+
+class PaisArbol(BaseModel):
+    id_pais: int
+    nombre: str
+    codigo_iso: Optional[str] = None
+    departamentos: List[DepartamentoArbol] = []
@@ -1,13 +1,27 @@
 # models/models.py
 from sqlalchemy import (
     Column, Integer, String, Boolean, Date, DateTime, Enum, DECIMAL,
-    ForeignKey, Table, UniqueConstraint, text, Float, CHAR, Text
+    ForeignKey, Table, UniqueConstraint, text, Float, CHAR, Text, Index
 )
+from sqlalchemy.dialects.mysql import LONGTEXT
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from sqlalchemy.sql import func
 from app.core.database import Base
 
+# === ÍNDICES ===
+def indice_vigentes(nombre: str, *columnas: str) -> Index:
+    """
+    Índice sobre las filas no eliminadas (borrado lógico). PostgreSQL y SQLite
+    lo crean parcial (WHERE fecha_eliminacion IS NULL); MySQL, completo.
+    """
+    return Index(
+        nombre, *columnas,
+        postgresql_where=text("fecha_eliminacion IS NULL"),
+        sqlite_where=text("fecha_eliminacion IS NULL"),
+    )
+
+
 # === TABLAS INTERMEDIAS ===
 usuario_rol = Table(
     "usuario_rol",
@@ -146,6 +160,8 @@ class Pagina(Base):
 
     permisos = relationship("Permiso", back_populates="pagina")
 
+    __table_args__ = (Index("ix_paginas_ruta", "ruta"),)
+
 
 class Permiso(Base):
     __tablename__ = "permisos"
@@ -160,6 +176,8 @@ class Permiso(Base):
     rol = relationship("Rol", back_populates="permisos")
     pagina = relationship("Pagina", back_populates="permisos")
 
+    __table_args__ = (Index("ix_permisos_rol_pagina", "id_rol", "id_pagina"),)
+
 
 class EstadoAnioLectivo(Base):
     __tablename__ = "estado_anio_lectivo"
@@ -256,7 +274,10 @@ class Grupo(Base):
     matriculas = relationship("Matricula", back_populates="grupo")
     asignaturas_docente = relationship("DocenteAsignatura", back_populates="grupo")
 
-    __table_args__ = (UniqueConstraint('codigo_grupo', 'id_anio_lectivo', name='uk_codigo_anio'),)
+    __table_args__ = (
+        UniqueConstraint('codigo_grupo', 'id_anio_lectivo', name='uk_codigo_anio'),
+        indice_vigentes('ix_grupo_director', 'id_usuario_director'),
+    )
 
 
 class Matricula(Base):
@@ -275,7 +296,10 @@ class Matricula(Base):
     grupo = relationship("Grupo", back_populates="matriculas")
     anio_lectivo = relationship("AnioLectivo", back_populates="matriculas")
 
-    __table_args__ = (UniqueConstraint('id_persona', 'id_grupo', 'id_anio_lectivo', name='uk_matricula'),)
+    __table_args__ = (
+        UniqueConstraint('id_persona', 'id_grupo', 'id_anio_lectivo', name='uk_matricula'),
+        indice_vigentes('ix_matricula_grupo_anio_activo', 'id_grupo', 'id_anio_lectivo', 'activo'),
+    )
 
 
 class Asignatura(Base):
@@ -314,7 +338,10 @@ class Calificacion(Base):
     docente = relationship("Usuario", back_populates="calificaciones")
     fallas = relationship("Falla", back_populates="calificacion")
 
-    __table_args__ = (UniqueConstraint('id_persona', 'id_asignatura', 'id_periodo', 'id_anio_lectivo', name='uk_calificacion'),)
+    __table_args__ = (
+        UniqueConstraint('id_persona', 'id_asignatura', 'id_periodo', 'id_anio_lectivo', name='uk_calificacion'),
+        indice_vigentes('ix_calificacion_periodo_anio_asignatura', 'id_periodo', 'id_anio_lectivo', 'id_asignatura'),
+    )
 
 
 class Falla(Base):
@@ -333,6 +360,10 @@ class Falla(Base):
     estudiante = relationship("Persona", back_populates="fallas")
     asignatura = relationship("Asignatura", back_populates="fallas")
 
+    __table_args__ = (
+        indice_vigentes('ix_falla_persona_asignatura_fecha', 'id_persona', 'id_asignatura', 'fecha_falla'),
+    )
+
 
 class DocenteAsignatura(Base):
     __tablename__ = "docente_asignatura"
@@ -354,6 +385,7 @@ class DocenteAsignatura(Base):
 
     __table_args__ = (
         UniqueConstraint('id_persona_docente', 'id_asignatura', 'id_grado', 'id_grupo', 'id_anio_lectivo', name='uk_docente_asignatura_completo'),
+        indice_vigentes('ix_docente_asignatura_anio_grado_grupo', 'id_anio_lectivo', 'id_grado', 'id_grupo'),
     )
 
 
@@ -439,4 +471,83 @@ class Notificacion(Base):
 
     # Relationships
     destinatario = relationship("Usuario", foreign_keys=[id_usuario_destino], backref="notificaciones_recibidas")
-    origen = relationship("Usuario", foreign_keys=[id_usuario_origen], backref="notificaciones_enviadas")
\ No newline at end of file
+    origen = relationship("Usuario", foreign_keys=[id_usuario_origen], backref="notificaciones_enviadas")
+
+    __table_args__ = (
+        # Bandeja del usuario, de la más reciente a la más antigua (paginación por id)
+        Index("ix_notificacion_destino_id", "id_usuario_destino", "id_notificacion"),
+    )
+
+
+class NotificacionContador(Base):
+    """No leídas por usuario; se mantiene al crear o marcar notificaciones (sin COUNT sobre notificacion)."""
+    __tablename__ = "notificacion_contador"
+    id_usuario = Column(Integer, ForeignKey("usuario.id_usuario", ondelete="CASCADE"), primary_key=True)
+    no_leidas = Column(Integer, nullable=False, default=0)
+    fecha_actualizacion = Column(DateTime, nullable=True)
+
+
+class BoletinContexto(Base):
+    """Contexto de boletín ya calculado por grupo y período (se invalida al cambiar notas, fallas, matrículas o asignaciones)."""
+    __tablename__ = "boletin_contexto"
+    id_boletin_contexto = Column(Integer, primary_key=True, autoincrement=True)
+    id_grupo = Column(Integer, ForeignKey("grupo.id_grupo", ondelete="CASCADE"), nullable=False)
+    id_periodo = Column(Integer, ForeignKey("periodo_academico.id_periodo", ondelete="CASCADE"), nullable=False)
+    version = Column(Integer, nullable=False, default=0)
+    contexto = Column(Text().with_variant(LONGTEXT, "mysql"), nullable=True)
+    fecha_creacion = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+    fecha_actualizacion = Column(DateTime, nullable=True)
+
+    __table_args__ = (UniqueConstraint('id_grupo', 'id_periodo', name='uk_boletin_contexto'),)
+
+
+class UsuarioTokenVersion(Base):
+    """Versión de credenciales por usuario: al incrementarla se revocan los tokens emitidos antes."""
+    __tablename__ = "usuario_token_version"
+    id_usuario = Column(Integer, ForeignKey("usuario.id_usuario", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    fecha_actualizacion = Column(DateTime, nullable=True)
+
+
+class PersonaBusqueda(Base):
+    """Texto normalizado (sin tildes, en minúsculas) de nombre, apellido e identificación para la búsqueda de personas."""
+    __tablename__ = "persona_busqueda"
+    id_persona = Column(Integer, ForeignKey("persona.id_persona", ondelete="CASCADE"), primary_key=True)
+    texto = Column(String(400), nullable=False)
+    identificacion = Column(String(50), nullable=True, index=True)
+    fecha_actualizacion = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # En PostgreSQL, índice de trigramas (pg_trgm) para LIKE '%x%' y similarity()
+        Index(
+            "ix_persona_busqueda_texto_trgm", "texto",
+            postgresql_using="gin", postgresql_ops={"texto": "gin_trgm_ops"},
+        ),
+    )
+
+
+class CorreoSaliente(Base):
+    """Cola de correos por enviar; la vacía el trabajador de core/correo.py (reintentos con espera creciente)."""
+    __tablename__ = "correo_saliente"
+    id_correo = Column(Integer, primary_key=True, autoincrement=True)
+    destinatario = Column(String(255), nullable=False)
+    asunto = Column(String(255), nullable=False)
+    html = Column(Text().with_variant(LONGTEXT, "mysql"), nullable=False)
+    texto = Column(Text, nullable=True)
+    # 0 = transaccional (recuperación de contraseña); los envíos masivos van detrás
+    prioridad = Column(Integer, nullable=False, default=5)
+    estado = Column(String(20), nullable=False, default="pendiente")  # pendiente, enviando, enviado, fallido
+    intentos = Column(Integer, nullable=False, default=0)
+    proximo_intento = Column(DateTime, nullable=False)
+    reclamo = Column(String(32), nullable=True)  # proceso que lo está enviando
+    ultimo_error = Column(Text, nullable=True)
+    lote = Column(String(50), nullable=True)
+    fecha_creacion = Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+    fecha_actualizacion = Column(DateTime, nullable=True)
+    fecha_envio = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_correo_saliente_cola", "estado", "proximo_intento", "prioridad"),
+        Index("ix_correo_saliente_reclamo", "reclamo"),
+        Index("ix_correo_saliente_lote", "lote"),
+    )
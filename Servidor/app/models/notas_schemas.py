@@ -8,13 +8,17 @@ class DocenteClaseSchema(BaseModel):
     id_docente_asignatura: int
     id_asignatura: int
     nombre_asignatura: str
-    id_grupo: int
+    id_grupo: Optional[int] = None  # None = asignación para todos los grupos del grado
     codigo_grupo: str
     nombre_grado: str
     id_anio_lectivo: int
     anio: int
     id_periodo: Optional[int] = None
     nombre_periodo: Optional[str] = None
+    # Carga de trabajo en el período (id_periodo)
+    estudiantes_matriculados: int = 0
+    notas_registradas: int = 0
+    notas_pendientes: int = 0
 
     class Config:
         from_attributes = True
@@ -26,6 +30,8 @@ class EstudianteNotaSchema(BaseModel):
     nombre: str
     apellido: str
     foto: Optional[str] = None
+    # URL firmada de la miniatura de la foto (relativa a la raíz de la API)
+    foto_miniatura: Optional[str] = None
     nota_existente: Optional[float] = None
     total_fallas: int = 0
     fallas_justificadas: int = 0
@@ -1,10 +1,13 @@
 # routers/asignaturas_route.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
-from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.catalogo_cache import respuesta_catalogo_async
+from ..core.database import get_db, get_async_db
+from ..core.permissions import require_permission, require_permission_async
 from ..models.Asignatura_model import Asignatura, AsignaturaCreate, AsignaturaUpdate
 from ..models.models import Asignatura as AsignaturaDB, DocenteAsignatura
 
@@ -13,17 +16,19 @@ router = APIRouter(prefix="/asignaturas", tags=["Asignaturas"])
 
 # ==================== LISTAR + FILTRO ====================
 @router.get("/", response_model=List[Asignatura])
-def listar_asignaturas(
+async def listar_asignaturas(
+    request: Request,
     nombre: Optional[str] = Query(None, description="Filtrar por nombre (contiene)"),
-    user = Depends(require_permission("/asignaturas", "ver")),
-    db: Session = Depends(get_db)
+    user = Depends(require_permission_async("/asignaturas", "ver")),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(AsignaturaDB).filter(AsignaturaDB.fecha_eliminacion.is_(None))
-
-    if nombre:
-        query = query.filter(AsignaturaDB.nombre_asignatura.ilike(f"%{nombre}%"))
+    async def cargar():
+        query = select(AsignaturaDB).filter(AsignaturaDB.fecha_eliminacion.is_(None))
+        if nombre:
+            query = query.filter(AsignaturaDB.nombre_asignatura.ilike(f"%{nombre}%"))
+        return (await db.execute(query)).scalars().all()
 
-    return query.all()
+    return await respuesta_catalogo_async(request, List[Asignatura], ("asignatura",), cargar)
 
 
 # ==================== OBTENER POR ID ====================
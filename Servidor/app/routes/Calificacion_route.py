@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session, aliased
 from typing import List, Optional
 from datetime import datetime
 from ..core.database import get_db
 from ..core.permissions import require_permission
+from ..core.paginacion import ParametrosPagina, paginar, parametros_pagina
 from ..models.Calificacion_model import CalificacionCreate, CalificacionUpdate, CalificacionConContexto
 from ..models.models import (
     Calificacion as CalificacionDB,
@@ -22,10 +23,12 @@ router = APIRouter(prefix="/calificaciones", tags=["Calificaciones"])
 # ✅ Listar calificaciones con contexto completo
 @router.get("/", response_model=List[CalificacionConContexto])
 def listar_calificaciones(
+    response: Response,
     persona_id: Optional[int] = Query(None),
     asignatura_id: Optional[int] = Query(None),
     periodo_id: Optional[int] = Query(None),
     anio_lectivo_id: Optional[int] = Query(None),
+    pagina: ParametrosPagina = Depends(parametros_pagina),
     user=Depends(require_permission("/calificaciones", "ver")),
     db: Session = Depends(get_db)
 ):
@@ -64,7 +67,11 @@ def listar_calificaciones(
         query = query.filter(CalificacionDB.id_anio_lectivo == anio_lectivo_id)
 
     resultados = []
-    for cal, estudiante, asignatura, periodo, docente, anio, id_docente in query.all():
+    filas = paginar(
+        query, (CalificacionDB.id_calificacion,), pagina, response,
+        valores=lambda fila: (fila[0].id_calificacion,),
+    )
+    for cal, estudiante, asignatura, periodo, docente, anio, id_docente in filas:
         resultados.append({
             "id_calificacion": cal.id_calificacion,
             "calificacion_numerica": cal.calificacion_numerica,
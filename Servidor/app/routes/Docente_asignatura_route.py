@@ -1,5 +1,6 @@
 # routers/docente_asignatura_route.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, aliased, joinedload
 from sqlalchemy.sql import func, and_, select
 from sqlalchemy import or_
@@ -8,8 +9,10 @@ from datetime import datetime
 from pydantic import BaseModel
 
 # === CORE Y SEGURIDAD ===
-from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.database import get_db, get_async_db
+from ..core.permissions import require_permission, require_permission_async
+from ..core.paginacion import ParametrosPagina, paginar, parametros_pagina
+from ..services.imagen_service import url_miniatura
 
 # === MODELOS SQLALCHEMY ===
 from ..models.models import (
@@ -35,6 +38,7 @@ class EstudianteNotaSchema(BaseModel):
     apellido: str
     numero_identificacion: Optional[str] = None
     foto: Optional[str] = None
+    foto_miniatura: Optional[str] = None
     calificacion_actual: Optional[float] = None
     id_calificacion: Optional[int] = None
     total_fallas: Optional[int] = 0
@@ -103,6 +107,7 @@ class EstudianteClaseSchema(BaseModel):
     apellido: str
     numero_identificacion: Optional[str] = None
     foto: Optional[str] = None
+    foto_miniatura: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -222,40 +227,53 @@ def _expandir_asignacion_a_grupos(
 # ==============================
 
 # 1️⃣ OBTENER CLASE + ESTUDIANTES CON NOTAS
-@router.get("/clase/{id_docente_asignatura}/periodo/{id_periodo}", response_model=ClasePeriodoSchema)
-def obtener_clase_con_notas_y_fallas(
-    id_docente_asignatura: int,
-    id_periodo: int,
-    db: Session = Depends(get_db),
-    user = Depends(require_permission("/nota", "ver"))
-):
-    da = db.query(DocenteAsignatura).options(
+async def _cargar_clase(db: AsyncSession, id_docente_asignatura: int) -> Optional[DocenteAsignatura]:
+    """Asignación con todas las relaciones que usan las vistas de clase (sin lazy loads en async)."""
+    return (await db.execute(select(DocenteAsignatura).options(
         joinedload(DocenteAsignatura.asignatura),
+        joinedload(DocenteAsignatura.grado),
         joinedload(DocenteAsignatura.grupo).joinedload(Grupo.grado),
         joinedload(DocenteAsignatura.anio_lectivo)
     ).filter(
         DocenteAsignatura.id_docente_asignatura == id_docente_asignatura,
         DocenteAsignatura.fecha_eliminacion.is_(None)
-    ).first()
+    ))).scalars().first()
+
+
+def _grupos_del_grado(da: DocenteAsignatura):
+    """Subconsulta con los grupos del grado y año de una asignación sin grupo."""
+    return select(Grupo.id_grupo).filter(
+        Grupo.id_grado == da.id_grado,
+        Grupo.id_anio_lectivo == da.id_anio_lectivo,
+        Grupo.fecha_eliminacion.is_(None)
+    )
+
+
+@router.get("/clase/{id_docente_asignatura}/periodo/{id_periodo}", response_model=ClasePeriodoSchema)
+async def obtener_clase_con_notas_y_fallas(
+    id_docente_asignatura: int,
+    id_periodo: int,
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(require_permission_async("/nota", "ver"))
+):
+    da = await _cargar_clase(db, id_docente_asignatura)
     if not da:
         raise HTTPException(404, "Asignación no encontrada")
 
-    periodo = db.query(PeriodoAcademico).filter(
+    periodo = (await db.execute(select(PeriodoAcademico).filter(
         PeriodoAcademico.id_periodo == id_periodo,
         PeriodoAcademico.id_anio_lectivo == da.id_anio_lectivo,
         PeriodoAcademico.fecha_eliminacion.is_(None)
-    ).first()
+    ))).scalars().first()
     if not periodo:
         raise HTTPException(404, "Período no encontrado o no pertenece al año lectivo")
     
     # Obtener id_usuario del docente si existe (para filtrar calificaciones)
     id_usuario_docente = None
     if da.id_persona_docente:
-        usuario_docente = db.query(Usuario).filter(
+        id_usuario_docente = (await db.execute(select(Usuario.id_usuario).filter(
             Usuario.id_persona == da.id_persona_docente
-        ).first()
-        if usuario_docente:
-            id_usuario_docente = usuario_docente.id_usuario
+        ))).scalars().first()
 
     # Consulta principal: estudiantes + calificación + conteo de fallas
     stmt_estudiantes = (
@@ -300,13 +318,7 @@ def obtener_clase_con_notas_y_fallas(
     # Si id_grupo IS NULL → filtrar por todos los grupos del grado
     # Si id_grupo tiene valor → filtrar solo por ese grupo
     if da.id_grupo is None:
-        grupos_del_grado = db.query(Grupo.id_grupo).filter(
-            Grupo.id_grado == da.id_grado,
-            Grupo.id_anio_lectivo == da.id_anio_lectivo,
-            Grupo.fecha_eliminacion.is_(None)
-        ).all()
-        grupos_ids = [g[0] for g in grupos_del_grado]
-        stmt_estudiantes = stmt_estudiantes.filter(Matricula.id_grupo.in_(grupos_ids))
+        stmt_estudiantes = stmt_estudiantes.filter(Matricula.id_grupo.in_(_grupos_del_grado(da)))
     else:
         stmt_estudiantes = stmt_estudiantes.filter(Matricula.id_grupo == da.id_grupo)
     
@@ -320,7 +332,7 @@ def obtener_clase_con_notas_y_fallas(
         Calificacion.calificacion_numerica
     ).order_by(Persona.apellido, Persona.nombre)
 
-    estudiantes_data = db.execute(stmt_estudiantes).all()
+    estudiantes_data = (await db.execute(stmt_estudiantes)).all()
 
     # Obtener información del grupo (puede ser NULL si es asignación por grado)
     grupo_info = da.grupo if da.id_grupo else None
@@ -341,6 +353,7 @@ def obtener_clase_con_notas_y_fallas(
                 apellido=e.apellido,
                 numero_identificacion=e.numero_identificacion,
                 foto=e.foto,
+                foto_miniatura=url_miniatura(e.foto),
                 id_calificacion=e.id_calificacion,
                 calificacion_actual=float(e.calificacion_numerica) if e.calificacion_numerica else None,
                 total_fallas=int(e.total_fallas),
@@ -352,12 +365,14 @@ def obtener_clase_con_notas_y_fallas(
 # 2️⃣ LISTAR ASIGNACIONES
 @router.get("/", response_model=List[DocenteAsignaturaModel])
 def listar_asignaciones(
+    response: Response,
     docente_id: Optional[int] = Query(None, alias="persona_docente_id"),
     asignatura_id: Optional[int] = Query(None),
     grado_id: Optional[int] = Query(None),
     grupo_id: Optional[int] = Query(None),
     anio_lectivo_id: Optional[int] = Query(None),
     buscar: Optional[str] = Query(None, description="Buscar por nombre, apellido o identificación del docente"),
+    pagina: ParametrosPagina = Depends(parametros_pagina),
     db: Session = Depends(get_db),
     user = Depends(require_permission("/docente-asignatura", "ver"))
 ):
@@ -418,7 +433,7 @@ def listar_asignaciones(
                 )
             )
 
-        raw_results = query.all()
+        raw_results = paginar(query, (DocenteAsignatura.id_docente_asignatura,), pagina, response)
 
         results: List[DocenteAsignaturaModel] = []
         for row in raw_results:
@@ -472,49 +487,29 @@ def listar_asignaciones(
 
 # 3️⃣ OBTENER DETALLE DE CLASE
 @router.get("/clase/{id_docente_asignatura}", response_model=ClaseInfoSchema)
-def obtener_clase_completa(
+async def obtener_clase_completa(
     id_docente_asignatura: int,
-    db: Session = Depends(get_db),
-    user = Depends(require_permission("/nota", "ver"))
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(require_permission_async("/nota", "ver"))
 ):
-    da = db.query(DocenteAsignatura).options(
-        joinedload(DocenteAsignatura.asignatura),
-        joinedload(DocenteAsignatura.grupo).joinedload(Grupo.grado),
-        joinedload(DocenteAsignatura.anio_lectivo)
-    ).filter(
-        DocenteAsignatura.id_docente_asignatura == id_docente_asignatura,
-        DocenteAsignatura.fecha_eliminacion.is_(None)
-    ).first()
+    da = await _cargar_clase(db, id_docente_asignatura)
 
     if not da:
         raise HTTPException(404, "Clase no encontrada")
 
     # Si id_grupo IS NULL → obtener estudiantes de TODOS los grupos del grado
     # Si id_grupo tiene valor → obtener estudiantes solo de ese grupo
-    if da.id_grupo is None:
-        # Obtener todos los grupos del grado y año
-        grupos_del_grado = db.query(Grupo.id_grupo).filter(
-            Grupo.id_grado == da.id_grado,
-            Grupo.id_anio_lectivo == da.id_anio_lectivo,
-            Grupo.fecha_eliminacion.is_(None)
-        ).all()
-        grupos_ids = [g[0] for g in grupos_del_grado]
-        
-        estudiantes = db.query(Persona).join(Matricula).filter(
-            Matricula.id_grupo.in_(grupos_ids),
-            Matricula.id_anio_lectivo == da.id_anio_lectivo,
-            Matricula.activo == True,
-            Matricula.fecha_eliminacion.is_(None),
-            Persona.fecha_eliminacion.is_(None)
-        ).all()
-    else:
-        estudiantes = db.query(Persona).join(Matricula).filter(
-        Matricula.id_grupo == da.id_grupo,
+    filtro_grupo = (
+        Matricula.id_grupo.in_(_grupos_del_grado(da)) if da.id_grupo is None
+        else Matricula.id_grupo == da.id_grupo
+    )
+    estudiantes = (await db.execute(select(Persona).join(Matricula).filter(
+        filtro_grupo,
         Matricula.id_anio_lectivo == da.id_anio_lectivo,
         Matricula.activo == True,
         Matricula.fecha_eliminacion.is_(None),
         Persona.fecha_eliminacion.is_(None)
-    ).all()
+    ))).scalars().all()
 
     # Obtener información del grupo (puede ser NULL si es asignación por grado)
     grupo_info = da.grupo if da.id_grupo else None
@@ -531,7 +526,8 @@ def obtener_clase_completa(
             nombre=e.nombre,
             apellido=e.apellido,
             numero_identificacion=e.numero_identificacion,
-            foto=e.foto
+            foto=e.foto,
+            foto_miniatura=url_miniatura(e.foto)
         ) for e in estudiantes]
     )
 
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from typing import List, Optional
 from datetime import date, datetime
 from ..core.database import get_db
 from ..core.permissions import require_permission
+from ..core.paginacion import ParametrosPagina, paginar, parametros_pagina
 from ..models.Falla_model import Falla, FallaCreate, FallaUpdate
 # ASUMIDO: Necesitas todos estos DB models definidos en models.models
 from ..models.models import (
@@ -20,11 +21,13 @@ router = APIRouter(prefix="/fallas", tags=["Fallas"])
 # ==================== LISTAR + FILTROS ====================
 @router.get("/", response_model=List[Falla])
 def listar_fallas(
+    response: Response,
     persona_id: Optional[int] = Query(None),
     asignatura_id: Optional[int] = Query(None),
     justificada: Optional[bool] = Query(None),
     fecha_desde: Optional[date] = Query(None),
     fecha_hasta: Optional[date] = Query(None),
+    pagina: ParametrosPagina = Depends(parametros_pagina),
     user=Depends(require_permission("/fallas", "ver")),
     db: Session = Depends(get_db) # <-- Uso de Session
 ):
@@ -58,9 +61,10 @@ def listar_fallas(
     if fecha_hasta:
         query = query.filter(FallaDB.fecha_falla <= fecha_hasta)
     
-    # 3. Ejecutar query y mapear a Pydantic
-    # .all() retorna Row objects, los mapeamos usando ._asdict() para Pydantic
-    return [Falla(**row._asdict()) for row in query.all()]
+    # 3. Ejecutar query (una página si se pidió limit) y mapear a Pydantic
+    # Las filas son Row objects, los mapeamos usando ._asdict() para Pydantic
+    filas = paginar(query, (FallaDB.id_falla,), pagina, response)
+    return [Falla(**row._asdict()) for row in filas]
 
 
 # ==================== CREAR ====================
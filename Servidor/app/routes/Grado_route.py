@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
-from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.catalogo_cache import respuesta_catalogo_async
+from ..core.database import get_db, get_async_db
+from ..core.permissions import require_permission, require_permission_async
 from ..models.Grado_model import Grado, GradoCreate, GradoUpdate
 # ASUMIDO: Necesitas GradoDB y GrupoDB definidos en models.models
 from ..models.models import Grado as GradoDB, Grupo as GrupoDB 
@@ -13,23 +16,27 @@ router = APIRouter(prefix="/grados", tags=["Grados"])
 
 # ==================== LISTAR + BUSCADOR ====================
 @router.get("/", response_model=List[Grado])
-def listar_grados(
+async def listar_grados(
+    request: Request,
     nivel: Optional[str] = Query(None, description="primaria, secundaria, media"),
     nombre: Optional[str] = Query(None, description="Buscar por nombre"),
-    user=Depends(require_permission("/grados", "ver")),
-    db: Session = Depends(get_db) # <-- Uso de Session
+    user=Depends(require_permission_async("/grados", "ver")),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(GradoDB).filter(GradoDB.fecha_eliminacion.is_(None))
-
-    if nivel:
-        if nivel not in ["primaria", "secundaria", "media"]:
-            raise HTTPException(400, "Nivel inválido")
-        query = query.filter(GradoDB.nivel == nivel)
-    if nombre:
-        query = query.filter(GradoDB.nombre_grado.ilike(f"%{nombre}%"))
+    if nivel and nivel not in ["primaria", "secundaria", "media"]:
+        raise HTTPException(400, "Nivel inválido")
 
-    # SQLAlchemy mapea GradoDB a Grado (Pydantic)
-    return query.order_by(GradoDB.nombre_grado).all()
+    async def cargar():
+        query = select(GradoDB).filter(GradoDB.fecha_eliminacion.is_(None))
+        if nivel:
+            query = query.filter(GradoDB.nivel == nivel)
+        if nombre:
+            query = query.filter(GradoDB.nombre_grado.ilike(f"%{nombre}%"))
+        # SQLAlchemy mapea GradoDB a Grado (Pydantic)
+        return (await db.execute(query.order_by(GradoDB.nombre_grado))).scalars().all()
+
+    # En memoria y con ETag; se invalida al modificar `grado`
+    return await respuesta_catalogo_async(request, List[Grado], ("grado",), cargar)
 
 
 # ==================== OBTENER POR ID ====================
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
-from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.catalogo_cache import respuesta_catalogo_async
+from ..core.database import get_db, get_async_db
+from ..core.permissions import require_permission, require_permission_async
 from ..models.Jornada_model import Jornada as JornadaModel, JornadaCreate, JornadaUpdate
 from ..models.models import Jornada as JornadaDB, Grupo as GrupoDB
 
@@ -26,19 +29,21 @@ def _to_jornada_model(jornada_db: JornadaDB) -> JornadaModel:
 # LISTAR + BUSCADOR
 # ====================
 @router.get("/", response_model=List[JornadaModel])
-def listar_jornadas(
+async def listar_jornadas(
+    request: Request,
     nombre: Optional[str] = Query(None, description="Buscar por nombre"),
-    user=Depends(require_permission("/jornadas", "ver")),
-    db: Session = Depends(get_db)
+    user=Depends(require_permission_async("/jornadas", "ver")),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(JornadaDB).filter(JornadaDB.fecha_eliminacion.is_(None))
-
-    if nombre:
-        query = query.filter(JornadaDB.nombre.ilike(f"%{nombre}%"))
-
-    jornadas_db = query.order_by(JornadaDB.nombre).all()
-    # Aplicar conversión
-    return [_to_jornada_model(jornada) for jornada in jornadas_db]
+    async def cargar():
+        query = select(JornadaDB).filter(JornadaDB.fecha_eliminacion.is_(None))
+        if nombre:
+            query = query.filter(JornadaDB.nombre.ilike(f"%{nombre}%"))
+        jornadas_db = (await db.execute(query.order_by(JornadaDB.nombre))).scalars().all()
+        # Aplicar conversión
+        return [_to_jornada_model(jornada) for jornada in jornadas_db]
+
+    return await respuesta_catalogo_async(request, List[JornadaModel], ("jornada",), cargar)
 
 
 # ====================
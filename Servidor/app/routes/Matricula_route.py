@@ -1,11 +1,12 @@
 # routers/matricula_route.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from typing import List, Optional
 from datetime import date, datetime
 from ..core.database import get_db
 from ..core.permissions import require_permission # <-- PERMISOS AÑADIDOS
+from ..core.paginacion import ParametrosPagina, paginar, parametros_pagina
 # ASUMIDO: Importar los modelos DB necesarios de models.py
 from ..models.models import (
     Matricula as MatriculaDB, 
@@ -22,10 +23,12 @@ router = APIRouter(prefix="/matriculas", tags=["Matrículas"])
 # ==================== LISTAR + FILTROS ====================
 @router.get("/", response_model=List[Matricula])
 def listar_matriculas(
+    response: Response,
     persona_id: Optional[int] = Query(None),
     grupo_id: Optional[int] = Query(None),
     anio_lectivo_id: Optional[int] = Query(None),
     activo: Optional[bool] = Query(None),
+    pagina: ParametrosPagina = Depends(parametros_pagina),
     user = Depends(require_permission("/matriculas", "ver")), # <-- PERMISO DE LECTURA
     db: Session = Depends(get_db)
 ):
@@ -66,7 +69,8 @@ def listar_matriculas(
         query = query.filter(MatriculaDB.activo == activo)
 
     # Retorna la lista de objetos mapeados a Pydantic
-    return [Matricula(**row._asdict()) for row in query.all()]
+    filas = paginar(query, (MatriculaDB.id_matricula,), pagina, response)
+    return [Matricula(**row._asdict()) for row in filas]
 
 
 # ==================== OBTENER POR ID ====================
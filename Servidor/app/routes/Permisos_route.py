@@ -4,7 +4,7 @@ from typing import List, Optional
 from sqlalchemy.orm import Session, joinedload 
 
 from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.permissions import require_permission, invalidar_cache_permisos
 # Usamos el nuevo modelo de respuesta: PermisoResponse
 from ..models.Permisos_model import Permiso, PermisoCreate, PermisoUpdate, PermisoResponse 
 from ..models.models import Permiso as PermisoDB, Rol, Pagina # PermisoDB ya debe tener rol y pagina
@@ -93,6 +93,7 @@ def crear_permiso(
     )
     db.add(nuevo_permiso)
     db.commit()
+    invalidar_cache_permisos()
     
     # Después de crear, lo refrescamos y cargamos las relaciones para el response_model
     db.refresh(nuevo_permiso)
@@ -137,6 +138,7 @@ def actualizar_permiso(
         raise HTTPException(status_code=400, detail="No se proporcionaron datos válidos o no hay cambios para actualizar")
 
     db.commit()
+    invalidar_cache_permisos()
     db.refresh(permiso)
     
     # Cargar las relaciones antes de devolver
@@ -160,4 +162,5 @@ def eliminar_permiso(
         raise HTTPException(404, "Permiso no encontrado")
     db.delete(permiso)
     db.commit()
+    invalidar_cache_permisos()
     return {"mensaje": "Permiso eliminado"}
\ No newline at end of file
@@ -1,9 +1,10 @@
 # routers/rol_route.py
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
+from ..core.catalogo_cache import respuesta_catalogo
 from ..core.database import get_db
 from ..core.permissions import require_permission
 from ..models.Rol_model import Rol, RolCreate, RolUpdate
@@ -17,15 +18,19 @@ router = APIRouter(prefix="/roles", tags=["Roles"])
 # ====================
 @router.get("/", response_model=List[Rol])
 def listar_roles(
+    request: Request,
     nombre: Optional[str] = Query(None, description="Filtrar por nombre (parcial)"),
     user = Depends(require_permission("/roles", "ver")),
     db: Session = Depends(get_db)
 ):
     """Lista todos los roles activos, filtrando opcionalmente por nombre"""
-    query = db.query(RolDB).filter(RolDB.fecha_eliminacion.is_(None), RolDB.visible == True)
-    if nombre:
-        query = query.filter(RolDB.nombre_rol.ilike(f"%{nombre}%"))
-    return query.all()
+    def cargar():
+        query = db.query(RolDB).filter(RolDB.fecha_eliminacion.is_(None), RolDB.visible == True)
+        if nombre:
+            query = query.filter(RolDB.nombre_rol.ilike(f"%{nombre}%"))
+        return query.all()
+
+    return respuesta_catalogo(request, List[Rol], ("rol",), cargar)
 
 
 # ====================
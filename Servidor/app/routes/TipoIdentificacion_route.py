@@ -1,11 +1,14 @@
 # routers/tipo_identificacion_route.py
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.catalogo_cache import respuesta_catalogo_async
+from ..core.database import get_db, get_async_db
+from ..core.permissions import require_permission, require_permission_async
 from ..models.TipoIdentificacion_model import TipoIdentificacion, TipoIdentificacionCreate, TipoIdentificacionUpdate
 from ..models.models import TipoIdentificacion as TipoDB
 
@@ -15,15 +18,19 @@ router = APIRouter(prefix="/tipos-identificacion", tags=["Tipos de Identificaci
 # LISTAR + FILTROS
 # ====================
 @router.get("/", response_model=List[TipoIdentificacion])
-def listar_tipos(
+async def listar_tipos(
+    request: Request,
     nombre: Optional[str] = Query(None),
-    user = Depends(require_permission("/tipos-identificacion", "ver")),
-    db: Session = Depends(get_db)
+    user = Depends(require_permission_async("/tipos-identificacion", "ver")),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    query = db.query(TipoDB).filter(TipoDB.fecha_eliminacion.is_(None))
-    if nombre:
-        query = query.filter(TipoDB.nombre.ilike(f"%{nombre}%"))
-    return query.all()
+    async def cargar():
+        query = select(TipoDB).filter(TipoDB.fecha_eliminacion.is_(None))
+        if nombre:
+            query = query.filter(TipoDB.nombre.ilike(f"%{nombre}%"))
+        return (await db.execute(query)).scalars().all()
+
+    return await respuesta_catalogo_async(request, List[TipoIdentificacion], ("tipo_identificacion",), cargar)
 
 
 # ====================
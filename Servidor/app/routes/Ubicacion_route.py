@@ -1,16 +1,24 @@
 # routers/ubicacion_route.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from typing import List, Optional
 from datetime import datetime
+from ..core.catalogo_cache import respuesta_catalogo
 from ..core.database import get_db
 from ..core.permissions import require_permission
+from ..services.ubicacion_service import (
+    arbol_ubicaciones,
+    autocompletar_ciudades,
+    consulta_ciudades,
+    consulta_departamentos,
+    lugares_nacimiento,
+)
 from ..models.Ubicacion_model import (
     Pais, PaisCreate,
     Departamento, DepartamentoCreate,
     Ciudad, CiudadCreate,
-    LugarNacimiento
+    LugarNacimiento,
+    PaisArbol
 )
 from ..models.models import Pais as PaisDB, Departamento as DepartamentoDB, Ciudad as CiudadDB, Persona
 
@@ -22,14 +30,18 @@ router = APIRouter(prefix="/ubicacion", tags=["Ubicación"])
 # =======================
 @router.get("/paises", response_model=List[Pais])
 def listar_paises(
+    request: Request,
     nombre: Optional[str] = Query(None),
     user = Depends(require_permission("/ubicacion", "ver")),
     db: Session = Depends(get_db)
 ):
-    query = db.query(PaisDB).filter(PaisDB.fecha_eliminacion.is_(None))
-    if nombre:
-        query = query.filter(PaisDB.nombre.ilike(f"%{nombre}%"))
-    return query.all()
+    def cargar():
+        query = db.query(PaisDB).filter(PaisDB.fecha_eliminacion.is_(None))
+        if nombre:
+            query = query.filter(PaisDB.nombre.ilike(f"%{nombre}%"))
+        return query.all()
+
+    return respuesta_catalogo(request, List[Pais], ("pais",), cargar)
 
 
 @router.post("/paises", response_model=dict)
@@ -132,27 +144,22 @@ def eliminar_pais(
 # =======================
 @router.get("/departamentos", response_model=List[Departamento])
 def listar_departamentos(
+    request: Request,
     pais_id: Optional[int] = Query(None),
     nombre: Optional[str] = Query(None),
     user = Depends(require_permission("/ubicacion", "ver")),
     db: Session = Depends(get_db)
 ):
-    query = db.query(DepartamentoDB).join(PaisDB).filter(
-        DepartamentoDB.fecha_eliminacion.is_(None)
-    )
-    if pais_id:
-        query = query.filter(DepartamentoDB.id_pais == pais_id)
-    if nombre:
-        query = query.filter(DepartamentoDB.nombre.ilike(f"%{nombre}%"))
+    def cargar():
+        # Proyección plana: el nombre del país viene en la misma fila
+        query = consulta_departamentos()
+        if pais_id:
+            query = query.where(DepartamentoDB.id_pais == pais_id)
+        if nombre:
+            query = query.where(DepartamentoDB.nombre.ilike(f"%{nombre}%"))
+        return db.execute(query).mappings().all()
 
-    return [
-        Departamento(
-            id_departamento=d.id_departamento,
-            nombre=d.nombre,
-            id_pais=d.id_pais,
-            pais_nombre=d.pais.nombre
-        ) for d in query.all()
-    ]
+    return respuesta_catalogo(request, List[Departamento], ("departamento", "pais"), cargar)
 
 
 @router.post("/departamentos", response_model=dict)
@@ -188,19 +195,12 @@ def obtener_departamento(
     user = Depends(require_permission("/ubicacion", "ver")),
     db: Session = Depends(get_db)
 ):
-    depto = db.query(DepartamentoDB).join(PaisDB).filter(
-        DepartamentoDB.id_departamento == depto_id,
-        DepartamentoDB.fecha_eliminacion.is_(None)
-    ).first()
+    depto = db.execute(
+        consulta_departamentos().where(DepartamentoDB.id_departamento == depto_id)
+    ).mappings().first()
     if not depto:
         raise HTTPException(404, "Departamento no encontrado")
-
-    return Departamento(
-        id_departamento=depto.id_departamento,
-        nombre=depto.nombre,
-        id_pais=depto.id_pais,
-        pais_nombre=depto.pais.nombre
-    )
+    return depto
 
 
 @router.put("/departamentos/{depto_id}", response_model=dict)
@@ -266,28 +266,22 @@ def eliminar_departamento(
 # =======================
 @router.get("/ciudades", response_model=List[Ciudad])
 def listar_ciudades(
+    request: Request,
     depto_id: Optional[int] = Query(None),
     nombre: Optional[str] = Query(None),
     user = Depends(require_permission("/ubicacion", "ver")),
     db: Session = Depends(get_db)
 ):
-    query = db.query(CiudadDB).join(DepartamentoDB).join(PaisDB).filter(
-        CiudadDB.fecha_eliminacion.is_(None)
-    )
-    if depto_id:
-        query = query.filter(CiudadDB.id_departamento == depto_id)
-    if nombre:
-        query = query.filter(CiudadDB.nombre.ilike(f"%{nombre}%"))
-
-    return [
-        Ciudad(
-            id_ciudad=c.id_ciudad,
-            nombre=c.nombre,
-            id_departamento=c.id_departamento,
-            departamento_nombre=c.departamento.nombre,
-            pais_nombre=c.departamento.pais.nombre
-        ) for c in query.all()
-    ]
+    def cargar():
+        # Proyección plana: departamento y país en la misma fila (sin cargas perezosas)
+        query = consulta_ciudades()
+        if depto_id:
+            query = query.where(CiudadDB.id_departamento == depto_id)
+        if nombre:
+            query = query.where(CiudadDB.nombre.ilike(f"%{nombre}%"))
+        return db.execute(query).mappings().all()
+
+    return respuesta_catalogo(request, List[Ciudad], ("ciudad", "departamento", "pais"), cargar)
 
 
 @router.post("/ciudades", response_model=dict)
@@ -320,26 +314,29 @@ def crear_ciudad(
     return {"mensaje": "Ciudad creada con éxito"}
 
 
+@router.get("/ciudades/autocompletar", response_model=List[Ciudad])
+def autocompletar_ciudad(
+    q: str = Query(..., min_length=1, description="Inicio del nombre de la ciudad (sin importar tildes)"),
+    limite: int = Query(10, ge=1, le=50),
+    user = Depends(require_permission("/ubicacion", "ver")),
+    db: Session = Depends(get_db)
+):
+    # Índice ordenado en memoria; solo consulta la BD al reconstruirlo
+    return autocompletar_ciudades(db, q, limite)
+
+
 @router.get("/ciudades/{ciudad_id}", response_model=Ciudad)
 def obtener_ciudad(
     ciudad_id: int,
     user = Depends(require_permission("/ubicacion", "ver")),
     db: Session = Depends(get_db)
 ):
-    ciudad = db.query(CiudadDB).join(DepartamentoDB).join(PaisDB).filter(
-        CiudadDB.id_ciudad == ciudad_id,
-        CiudadDB.fecha_eliminacion.is_(None)
-    ).first()
+    ciudad = db.execute(
+        consulta_ciudades().where(CiudadDB.id_ciudad == ciudad_id)
+    ).mappings().first()
     if not ciudad:
         raise HTTPException(404, "Ciudad no encontrada")
-
-    return Ciudad(
-        id_ciudad=ciudad.id_ciudad,
-        nombre=ciudad.nombre,
-        id_departamento=ciudad.id_departamento,
-        departamento_nombre=ciudad.departamento.nombre,
-        pais_nombre=ciudad.departamento.pais.nombre
-    )
+    return ciudad
 
 
 @router.put("/ciudades/{ciudad_id}", response_model=dict)
@@ -408,21 +405,27 @@ def eliminar_ciudad(
 # =======================
 @router.get("/lugares-nacimiento", response_model=List[LugarNacimiento])
 def listar_lugares_nacimiento(
+    request: Request,
+    user = Depends(require_permission("/ubicacion", "ver")),
+    db: Session = Depends(get_db)
+):
+    # Depende también de persona.id_ciudad_nacimiento (ver catalogo_cache)
+    return respuesta_catalogo(
+        request, List[LugarNacimiento], ("persona", "ciudad", "departamento", "pais"),
+        lambda: lugares_nacimiento(db)
+    )
+
+
+# =======================
+# ÁRBOL PAÍS → DEPARTAMENTO → CIUDAD
+# =======================
+@router.get("/arbol", response_model=List[PaisArbol])
+def arbol_ubicacion(
+    request: Request,
     user = Depends(require_permission("/ubicacion", "ver")),
     db: Session = Depends(get_db)
 ):
-    query = text("""
-        SELECT DISTINCT
-            p.id_ciudad_nacimiento as id_ciudad,
-            CONCAT(c.nombre, ', ', d.nombre, ', ', pa.nombre) as nombre_completo
-        FROM persona p
-        JOIN ciudad c ON p.id_ciudad_nacimiento = c.id_ciudad
-        JOIN departamento d ON c.id_departamento = d.id_departamento
-        JOIN pais pa ON d.id_pais = pa.id_pais
-        WHERE p.id_ciudad_nacimiento IS NOT NULL
-          AND c.fecha_eliminacion IS NULL
-        ORDER BY nombre_completo
-    """)
-    resultados = db.execute(query).fetchall()
-
-    return [LugarNacimiento(id_ciudad=row.id_ciudad, nombre_completo=row.nombre_completo) for row in resultados]
\ No newline at end of file
+    """Todo el catálogo anidado en una respuesta; se arma con una consulta y queda en memoria con ETag."""
+    return respuesta_catalogo(
+        request, List[PaisArbol], ("pais", "departamento", "ciudad"), lambda: arbol_ubicaciones(db)
+    )
\ No newline at end of file
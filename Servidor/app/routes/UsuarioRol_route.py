@@ -4,7 +4,8 @@ from typing import List, Optional
 from datetime import datetime
 
 from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.permissions import require_permission, invalidar_cache_permisos
+from ..core.security import revocar_tokens_usuario
 # Mantenemos UsuarioRol (para el listado) y RolResponse
 from ..models.UsuarioRol_model import UsuarioRol, UsuarioRolCreate, RolResponse, UsuarioRolResponse 
 from ..models.models import Usuario, Rol, UsuarioRol as UsuarioRolDB
@@ -130,7 +131,9 @@ def asignar_rol_usuario(
     # 3. Asignar usando la relación de SQLAlchemy (método preferido)
     usuario_db.roles.append(rol_db)
     usuario_db.fecha_actualizacion = datetime.now()
+    revocar_tokens_usuario(db, usuario_db.id_usuario)
     db.commit()
+    invalidar_cache_permisos()
 
     return {"mensaje": "Rol asignado al usuario con éxito"}
 
@@ -161,6 +164,8 @@ def remover_rol_usuario(
     # 2. Eliminación Lógica (Soft Delete)
     registro.fecha_eliminacion = datetime.now()
     registro.fecha_actualizacion = datetime.now() 
+    revocar_tokens_usuario(db, id_usuario)
     db.commit()
+    invalidar_cache_permisos()
     
     return {"mensaje": "Rol removido del usuario con éxito"}
\ No newline at end of file
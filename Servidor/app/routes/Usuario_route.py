@@ -6,7 +6,7 @@ from datetime import datetime
 from ..core.database import get_db
 from ..models.models import Usuario as UsuarioDB, Persona, usuario_rol, Permiso, Pagina 
 from ..models.Usuario_model import Usuario, UsuarioCreate, UsuarioUpdate 
-from ..core.security import get_password_hash
+from ..core.security import get_password_hash, revocar_tokens_usuario
 from ..core.permissions import require_permission 
 
 router = APIRouter(prefix="/usuarios", tags=["Usuarios"])
@@ -184,6 +184,7 @@ def actualizar_usuario(
 
     if update.password is not None and update.password.lower() != "string":
         user_db.password = get_password_hash(update.password)
+        revocar_tokens_usuario(db, user_db.id_usuario)
 
     if update.es_docente is not None:
         user_db.es_docente = update.es_docente
@@ -218,5 +219,6 @@ def eliminar_usuario(
         raise HTTPException(400, "No se puede eliminar: tiene roles asignados")
 
     user_db.fecha_eliminacion = datetime.now()
+    revocar_tokens_usuario(db, user_db.id_usuario)
     db.commit()
     return {"mensaje": "Usuario eliminado (lógicamente)"}
\ No newline at end of file
@@ -1,21 +1,30 @@
 # routes/auth.py (Versión Reescrita y Optimizada)
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError
 from datetime import datetime, timedelta, UTC
 from pydantic import BaseModel, EmailStr
 import random
 
-from ..core.database import get_db
-from ..models.models import Usuario, RecuperacionContrasena, Permiso, Pagina, usuario_rol
+from ..core.database import get_db, get_async_db
+from ..models.models import Usuario, RecuperacionContrasena
 from ..models.Usuario_model import Usuario as UsuarioSchema
+from ..core.contrasenas import hashear_contrasena_async, verificar_contrasena_async
 from ..core.security import (
-    verify_password,
     create_access_token,
-    get_current_user,
-    get_password_hash
+    datos_token_usuario,
+    datos_token_usuario_async,
+    get_usuario_actual,
+    payload_valido,
+    oauth2_scheme,
+    get_password_hash,
+    revocar_tokens_usuario
 )
+from ..services.perfil_service import obtener_perfil
 from ..core.email import enviar_email_recuperacion as enviar_email_codigo
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
@@ -77,7 +86,7 @@ def solicitar_recuperacion(
     db.commit()
     db.refresh(recuperacion)
 
-    # Enviar email mediante SendGrid
+    # Encolar el correo (lo envía el trabajador de core/correo.py)
     background.add_task(enviar_email_codigo, data.email, codigo)
 
     return {"mensaje": "Se ha enviado un código de recuperación al correo."}
@@ -127,7 +136,9 @@ def cambiar_contrasena_olvidada(data: CambiarContrasenaOlvidada, db: Session = D
     if not recuperacion:
         raise HTTPException(status_code=400, detail="Código inválido o expirado.")
 
+    # get_password_hash espera al pool de procesos; el hilo no consume CPU
     persona.usuario.password = get_password_hash(data.nueva_contrasena)
+    revocar_tokens_usuario(db, persona.usuario.id_usuario)
     db.commit()
 
     return {"mensaje": "Contraseña cambiada con éxito."}
@@ -135,15 +146,17 @@ def cambiar_contrasena_olvidada(data: CambiarContrasenaOlvidada, db: Session = D
 
 # === 4. INICIO DE SESIÓN ===
 @router.post("/iniciar-sesion", response_model=Token)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     print(f"🔐 Intento de login para usuario: {form.username}")
     try:
         # Consultar directamente desde el modelo Usuario
         print(f"🔍 Consultando usuario en base de datos...")
-        user = db.query(Usuario).filter(
-            Usuario.username == form.username,
-            Usuario.fecha_eliminacion.is_(None)
-        ).first()
+        user = (await db.execute(
+            select(Usuario).where(
+                Usuario.username == form.username,
+                Usuario.fecha_eliminacion.is_(None)
+            )
+        )).scalars().first()
         print(f"✅ Consulta completada. Usuario encontrado: {user is not None}")
     except OperationalError as e:
         # Error de conexión a la base de datos
@@ -163,120 +176,50 @@ def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get
             detail=f"Error interno del servidor: {str(e)}"
         )
 
-    if not user or not verify_password(form.password, user.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Credenciales inválidas"
-        )
+    credenciales_invalidas = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Credenciales inválidas"
+    )
+    if not user:
+        raise credenciales_invalidas
 
-    token = create_access_token({"sub": user.username, "uid": user.id_usuario})
+    # bcrypt en el pool de procesos: no ocupa el event loop ni los hilos
+    valida, hash_nuevo = await verificar_contrasena_async(form.password, user.password or "")
+    if not valida:
+        raise credenciales_invalidas
+
+    if hash_nuevo:
+        # Cambió BCRYPT_ROUNDS: se guarda el hash con el costo actual
+        user.password = hash_nuevo
+        await db.commit()
+
+    token = create_access_token(await datos_token_usuario_async(db, user))
     return {"access_token": token, "token_type": "bearer"}
 
 
 # === 5. PERFIL DE USUARIO CON PERMISOS ===
 @router.get("/mi-perfil", response_model=UsuarioSchema)
-def mi_perfil(user=Depends(get_current_user), db: Session = Depends(get_db)):
-    from ..models.models import Rol, Grupo
-    
-    # 1. Obtener roles del usuario con sus nombres
-    roles = db.query(usuario_rol.c.id_rol).filter(
-        usuario_rol.c.id_usuario == user.id_usuario
-    ).all()
-    rol_ids = [r.id_rol for r in roles]
-    
-    # 2. Obtener nombres de roles (si tiene roles)
-    if rol_ids:
-        roles_names = db.query(Rol.nombre_rol).filter(Rol.id_rol.in_(rol_ids)).all()
-        role_names_list = [r.nombre_rol.lower() for r in roles_names]  # Convertir a minúsculas
-    else:
-        role_names_list = []  # Usuario sin roles
-
-    # 3. Obtener permisos asociados a esos roles
-    # Si es desarrollador, obtener TODAS las páginas (incluyendo invisible)
-    # Si no es desarrollador, solo páginas visibles (se filtra automáticamente por la relación)
-    es_desarrollador = 'desarrollador' in role_names_list
-    
-    if rol_ids:
-        # Usuario tiene roles, buscar sus permisos
-        if es_desarrollador:
-            # Desarrollador ve TODAS las páginas, sin filtrar por visible
-            permisos_db = db.query(Permiso).join(
-                Pagina, Permiso.id_pagina == Pagina.id_pagina
-            ).filter(Permiso.id_rol.in_(rol_ids)).all()
-        else:
-            # Usuarios normales solo ven páginas visibles
-            permisos_db = db.query(Permiso).join(
-                Pagina, Permiso.id_pagina == Pagina.id_pagina
-            ).filter(
-                Permiso.id_rol.in_(rol_ids),
-                Pagina.visible == True
-            ).all()
-    else:
-        # Usuario sin roles, no tiene permisos
-        permisos_db = []
-
-    # 4. Preparar lista de permisos para el esquema Pydantic
-    from ..models.Usuario_model import PermisoPagina
-    
-    permisos_listos = [
-        {
-            "pagina": {
-                "id_pagina": p.pagina.id_pagina,
-                "nombre": p.pagina.nombre,
-                "ruta": p.pagina.ruta
-            },
-            "puede_ver": p.puede_ver,
-            "puede_crear": p.puede_crear,
-            "puede_editar": p.puede_editar,
-            "puede_eliminar": p.puede_eliminar,
-        }
-        for p in permisos_db
-    ]
-
-    # 5. Convertir el usuario ORM a diccionario para poder agregar campos personalizados
-    from ..models.Usuario_model import Usuario as UsuarioSchema
-    
-    # Verificar si es director de grupo consultando la tabla grupo
-    es_director_grupo = db.query(Grupo).filter(
-        Grupo.id_usuario_director == user.id_usuario,
-        Grupo.fecha_eliminacion.is_(None)
-    ).first() is not None
-    
-    user_dict = {
-        "id_usuario": user.id_usuario,
-        "username": user.username,
-        "password": user.password,  # Incluir password para el esquema
-        "es_docente": user.es_docente,
-        "es_director_grupo": es_director_grupo,  # Verificado consultando tabla grupo
-        "id_persona": user.id_persona,
-        "permisos": permisos_listos,
-        "roles": role_names_list,  # Roles como lista de strings
-        "fecha_creacion": user.fecha_creacion,
-        "fecha_actualizacion": user.fecha_actualizacion,
-        "fecha_eliminacion": user.fecha_eliminacion
-    }
-    
-    # Si tiene persona asociada, agregarla
-    if user.persona:
-        user_dict["persona"] = {
-            "id_persona": user.persona.id_persona,
-            "nombre": user.persona.nombre,
-            "apellido": user.persona.apellido,
-            "email": user.persona.email,
-            "telefono": user.persona.telefono
-        }
-
-    # 6. Retornar usuario con permisos y roles
-    return UsuarioSchema(**user_dict)
+async def mi_perfil(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    # Armado en dos consultas y en cache por usuario (se invalida al cambiar
+    # permisos, roles, la cuenta o su persona)
+    return await obtener_perfil(db, payload_valido(token))
 
 
 # === 6. CAMBIAR CONTRASEÑA (CON SESIÓN ACTIVA) ===
 @router.post("/cambiar-contrasena")
-def cambiar_contrasena(data: CambiarContrasena, user=Depends(get_current_user), db: Session = Depends(get_db)):
-    if not verify_password(data.contrasena_actual, user.password):
+async def cambiar_contrasena(data: CambiarContrasena, user=Depends(get_usuario_actual), db: Session = Depends(get_db)):
+    valida, _ = await verificar_contrasena_async(data.contrasena_actual, user.password or "")
+    if not valida:
         raise HTTPException(status_code=400, detail="Contraseña actual incorrecta")
 
-    user.password = get_password_hash(data.contrasena_nueva)
-    db.commit()
+    hash_nuevo = await hashear_contrasena_async(data.contrasena_nueva)
+
+    def guardar():
+        user.password = hash_nuevo
+        revocar_tokens_usuario(db, user.id_usuario)
+        db.commit()
+        return datos_token_usuario(db, user)
 
-    return {"mensaje": "Contraseña actualizada con éxito."}
+    # Los tokens anteriores quedan revocados: se entrega uno nuevo para esta sesión
+    token = create_access_token(await run_in_threadpool(guardar))
+    return {"mensaje": "Contraseña actualizada con éxito.", "access_token": token, "token_type": "bearer"}
@@ -1,15 +1,36 @@
-from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.core.database import get_db
 from app.core.permissions import require_permission
-from app.services.boletin_service import generar_boletin_docx
+from app.core.trabajos import ESTADO_COMPLETADO
+from app.services.boletin_service import (
+    generar_boletin_docx,
+    generar_boletin_pdf_grupo,
+    generar_boletines_pdf_por_estudiante,
+    generar_boletines_zip_por_estudiante,
+)
+from app.services.boletin_lote_service import (
+    iniciar_lote_boletines,
+    obtener_lote,
+    resolver_grupos_lote,
+)
 
 
 router = APIRouter(prefix="/boletines", tags=["Boletines"])
 
 
+class LoteBoletinesRequest(BaseModel):
+    id_periodo: int
+    id_grado: Optional[int] = None
+    id_anio_lectivo: Optional[int] = None
+    grupos: Optional[List[int]] = None
+
+
 @router.get("/grupos/{grupo_id}/periodo/{periodo_id}/docx")
 def descargar_boletin_docx(
     grupo_id: int,
@@ -28,3 +49,87 @@ def descargar_boletin_docx(
     )
 
 
+@router.get("/grupos/{grupo_id}/periodo/{periodo_id}/zip")
+def descargar_boletines_por_estudiante(
+    grupo_id: int,
+    periodo_id: int,
+    db: Session = Depends(get_db),
+    user=Depends(require_permission("/boletin", "ver")),
+):
+    """Un boletín .docx por estudiante, empaquetados en un ZIP que se envía a medida que se genera."""
+    contenido, filename = generar_boletines_zip_por_estudiante(db, grupo_id, periodo_id)
+
+    return StreamingResponse(
+        contenido,
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=\"{filename}\""
+        },
+    )
+
+
+@router.get("/grupos/{grupo_id}/periodo/{periodo_id}/pdf")
+def descargar_boletin_pdf(
+    grupo_id: int,
+    periodo_id: int,
+    por_estudiante: bool = False,
+    db: Session = Depends(get_db),
+    user=Depends(require_permission("/boletin", "ver")),
+):
+    """PDF del grupo (un boletín por página) o, con `por_estudiante`, un ZIP con un PDF por estudiante."""
+    if por_estudiante:
+        contenido, filename = generar_boletines_pdf_por_estudiante(db, grupo_id, periodo_id)
+        media_type = "application/zip"
+    else:
+        contenido, filename = generar_boletin_pdf_grupo(db, grupo_id, periodo_id)
+        media_type = "application/pdf"
+
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=\"{filename}\""
+        },
+    )
+
+
+# === GENERACIÓN POR LOTES (grado, año lectivo o lista de grupos) ===
+@router.post("/lotes", status_code=status.HTTP_202_ACCEPTED)
+def crear_lote_boletines(
+    data: LoteBoletinesRequest,
+    db: Session = Depends(get_db),
+    user=Depends(require_permission("/boletin", "ver")),
+):
+    grupo_ids = resolver_grupos_lote(
+        db,
+        data.id_periodo,
+        id_grado=data.id_grado,
+        id_anio_lectivo=data.id_anio_lectivo,
+        grupos=data.grupos,
+    )
+    trabajo = iniciar_lote_boletines(data.id_periodo, grupo_ids)
+    return {"id_trabajo": trabajo.id_trabajo, "total_grupos": len(grupo_ids)}
+
+
+@router.get("/lotes/{id_trabajo}")
+def estado_lote_boletines(
+    id_trabajo: str,
+    user=Depends(require_permission("/boletin", "ver")),
+):
+    return obtener_lote(id_trabajo).to_dict()
+
+
+@router.get("/lotes/{id_trabajo}/zip")
+def descargar_lote_boletines(
+    id_trabajo: str,
+    user=Depends(require_permission("/boletin", "ver")),
+):
+    trabajo = obtener_lote(id_trabajo)
+    if trabajo.estado != ESTADO_COMPLETADO or not trabajo.resultado:
+        raise HTTPException(status_code=409, detail=f"El lote aún no está listo (estado: {trabajo.estado})")
+
+    return FileResponse(
+        trabajo.resultado,
+        media_type="application/zip",
+        filename=f"Boletines_lote_{id_trabajo}.zip",
+    )
@@ -1,10 +1,13 @@
 # routers/estado_aniolectivo_route.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime
-from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.catalogo_cache import respuesta_catalogo_async
+from ..core.database import get_db, get_async_db
+from ..core.permissions import require_permission, require_permission_async
 from ..models.EstadoAnioLectivo_model import (
     EstadoAnioLectivo,
     EstadoAnioLectivoCreate,
@@ -17,14 +20,17 @@ router = APIRouter(prefix="/estados-anio", tags=["Estados Año Lectivo"])
 
 # ==================== LISTAR ====================
 @router.get("/", response_model=List[EstadoAnioLectivo])
-def listar_estados(
-    user = Depends(require_permission("/estados-anio", "ver")),
-    db: Session = Depends(get_db)
+async def listar_estados(
+    request: Request,
+    user = Depends(require_permission_async("/estados-anio", "ver")),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    estados = db.query(EstadoAnioLectivoDB).filter(
-        EstadoAnioLectivoDB.fecha_eliminacion.is_(None)
-    ).all()
-    return estados
+    async def cargar():
+        return (await db.execute(select(EstadoAnioLectivoDB).filter(
+            EstadoAnioLectivoDB.fecha_eliminacion.is_(None)
+        ))).scalars().all()
+
+    return await respuesta_catalogo_async(request, List[EstadoAnioLectivo], ("estado_anio_lectivo",), cargar)
 
 
 # ==================== CREAR ====================
@@ -1,17 +1,26 @@
-import os
-import uuid
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+import math
+from email.utils import formatdate, parsedate_to_datetime
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status, Query, Request, Response
+from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from datetime import datetime
+from typing import Dict, Optional
 
+from app.core.catalogo_cache import coincide_etag
 from app.core.database import get_db
-from app.models.models import Imagen
-
-# --- Constantes ---
-# Directorio donde se guardarán las imágenes. Debe existir.
-UPLOAD_DIRECTORY = "static/images"
-os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+from app.core.permissions import require_permission
+from app.models.models import Imagen, Persona
+from app.services.imagen_service import (
+    TIPOS_CON_MINIATURA,
+    ArchivoImagen,
+    generar_miniaturas,
+    guardar_subida,
+    resolver_archivo,
+    url_archivo,
+    verificar_firma,
+)
 
 router = APIRouter(
     prefix="/imagenes",
@@ -27,10 +36,23 @@ class ImagenResponse(BaseModel):
     tamanio_kb: int
     mime_type: str
     fecha_creacion: datetime
+    # ancho en px → nombre del archivo de la miniatura (solo fotos y firmas)
+    miniaturas: Dict[int, str] = {}
+    # URLs firmadas de descarga (vencen, ver IMAGEN_URL_VIGENCIA)
+    url: str = ""
+    urls_miniaturas: Dict[int, str] = {}
 
     class Config:
         from_attributes = True
 
+
+def _respuesta_imagen(imagen: Imagen, miniaturas: Dict[int, str]) -> ImagenResponse:
+    return ImagenResponse.model_validate(imagen).model_copy(update={
+        "miniaturas": miniaturas,
+        "url": url_archivo(imagen.nombre_archivo),
+        "urls_miniaturas": {ancho: url_archivo(imagen.nombre_archivo, ancho) for ancho in miniaturas},
+    })
+
 # --- Endpoints ---
 
 @router.post("/subir", response_model=ImagenResponse, status_code=status.HTTP_201_CREATED, summary="Subir un archivo de imagen")
@@ -39,7 +61,8 @@ async def subir_imagen(
     id_entidad: int,
     tipo_imagen: str = "foto_persona",
     file: UploadFile = File(...), 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    user = Depends(require_permission("/personas", "editar"))
 ):
     """
     Sube un archivo de imagen al servidor.
@@ -48,52 +71,150 @@ async def subir_imagen(
     - **id_entidad**: El ID de la entidad a la que se asocia la imagen (ej: el id_persona).
     - **tipo_imagen**: El uso de la imagen (ej: 'foto_persona', 'firma', 'logo_institucion').
     - **file**: El archivo de imagen a subir.
+
+    El archivo se guarda como `<sha256>.<ext>`: subir la misma imagen otra
+    vez no ocupa más disco. Fotos y firmas de persona quedan con miniaturas
+    y su nombre se asigna a `persona.foto` / `persona.firma`.
     """
-    # 1. Validar que sea un tipo de imagen permitido (opcional pero recomendado)
-    if not file.content_type.startswith("image/"):
+    # 1. Validar que sea un tipo de imagen permitido (el contenido se valida al guardar)
+    if not (file.content_type or "").startswith("image/"):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo no es una imagen.")
 
-    # 2. Generar un nombre de archivo único para evitar colisiones
-    extension = os.path.splitext(file.filename)[1]
-    nombre_unico = f"{uuid.uuid4()}{extension}"
-    ruta_completa = os.path.join(UPLOAD_DIRECTORY, nombre_unico)
+    # La foto o firma va a una persona existente: se verifica antes de escribir en disco
+    asigna_persona = tipo_entidad == "persona" and tipo_imagen in TIPOS_CON_MINIATURA
+    if asigna_persona and not await run_in_threadpool(_persona_vigente, db, id_entidad):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Persona no encontrada.")
+
+    # 2. Guardar en disco por bloques, con nombre por contenido
+    nombre, ruta, tamanio, mime = await guardar_subida(file)
 
-    # 3. Guardar el archivo en el disco
-    try:
-        with open(ruta_completa, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"No se pudo guardar el archivo: {e}")
+    # 3. Miniaturas de fotos y firmas (listados y boletines no cargan el original)
+    miniaturas = {}
+    if tipo_imagen in TIPOS_CON_MINIATURA:
+        miniaturas = await run_in_threadpool(generar_miniaturas, nombre)
 
     # 4. Crear el registro en la base de datos
-    tamanio_kb = len(content) / 1024
-    
-    nueva_imagen = Imagen(
-        nombre_archivo=nombre_unico,
-        ruta_archivo=ruta_completa,
-        tipo=tipo_imagen,
-        tamanio_kb=tamanio_kb,
-        mime_type=file.content_type,
-        id_entidad=id_entidad,
-        tipo_entidad=tipo_entidad,
-        fecha_creacion=datetime.utcnow()
+    imagen = await run_in_threadpool(
+        _registrar_imagen, db, nombre, str(ruta), tamanio, mime, tipo_imagen, tipo_entidad, id_entidad
     )
-    db.add(nueva_imagen)
-    db.commit()
-    db.refresh(nueva_imagen)
+    return _respuesta_imagen(imagen, miniaturas)
 
-    return nueva_imagen
+
+def _persona_vigente(db: Session, id_persona: int) -> bool:
+    return db.query(Persona.id_persona).filter(
+        Persona.id_persona == id_persona,
+        Persona.fecha_eliminacion == None
+    ).first() is not None
+
+
+def _registrar_imagen(
+    db: Session, nombre: str, ruta: str, tamanio: int, mime: str,
+    tipo_imagen: str, tipo_entidad: str, id_entidad: int
+) -> Imagen:
+    # La misma imagen ya asociada a la misma entidad: no se duplica el registro
+    imagen = db.query(Imagen).filter(
+        Imagen.nombre_archivo == nombre,
+        Imagen.tipo == tipo_imagen,
+        Imagen.tipo_entidad == tipo_entidad,
+        Imagen.id_entidad == id_entidad,
+        Imagen.fecha_eliminacion == None
+    ).first()
+    if imagen is None:
+        imagen = Imagen(
+            nombre_archivo=nombre,
+            ruta_archivo=ruta,
+            tipo=tipo_imagen,
+            tamanio_kb=math.ceil(tamanio / 1024),
+            mime_type=mime,
+            id_entidad=id_entidad,
+            tipo_entidad=tipo_entidad,
+            fecha_creacion=datetime.utcnow()
+        )
+        db.add(imagen)
+
+    if tipo_entidad == "persona" and tipo_imagen in TIPOS_CON_MINIATURA:
+        persona = db.get(Persona, id_entidad)
+        if persona is None or persona.fecha_eliminacion is not None:
+            # Eliminada mientras se guardaba el archivo
+            db.rollback()
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Persona no encontrada.")
+        # Se guarda el nombre por contenido (no la ruta en disco): los listados
+        # lo convierten en la URL firmada de la miniatura (url_miniatura)
+        if tipo_imagen == "firma":
+            persona.firma = nombre
+        else:
+            persona.foto = nombre
+
+    db.commit()
+    db.refresh(imagen)
+    return imagen
 
 
 @router.get("/{id_imagen}", response_model=ImagenResponse, summary="Obtener información de una imagen por ID")
-def obtener_imagen(id_imagen: int, db: Session = Depends(get_db)):
+def obtener_imagen(
+    id_imagen: int,
+    db: Session = Depends(get_db),
+    user = Depends(require_permission("/personas", "ver"))
+):
     """
     Obtiene los metadatos de una imagen específica desde la base de datos.
-    No devuelve el archivo, solo la información.
+    No devuelve el archivo, solo la información y las URLs firmadas para descargarlo.
     """
     imagen = db.query(Imagen).filter(Imagen.id_imagen == id_imagen, Imagen.fecha_eliminacion == None).first()
     if not imagen:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Imagen no encontrada.")
-    
-    return imagen
+
+    miniaturas = {}
+    if imagen.tipo in TIPOS_CON_MINIATURA:
+        miniaturas = generar_miniaturas(imagen.nombre_archivo)
+    return _respuesta_imagen(imagen, miniaturas)
+
+
+
+# Nombres por contenido: el archivo nunca cambia. `private` porque son fotos de
+# estudiantes: que las guarde el navegador, no un proxy compartido
+_CACHE_INMUTABLE = "private, max-age=31536000, immutable"
+_CACHE_REVALIDAR = "private, no-cache"
+
+
+def _no_modificado(request: Request, archivo: ArchivoImagen) -> bool:
+    si_no_coincide = request.headers.get("if-none-match")
+    if si_no_coincide is not None:
+        return coincide_etag(si_no_coincide, archivo.etag)
+    si_modificado = request.headers.get("if-modified-since")
+    if si_modificado:
+        try:
+            return int(archivo.estado.st_mtime) <= parsedate_to_datetime(si_modificado).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+@router.get("/archivo/{nombre_archivo}", summary="Descargar una imagen (o su versión reducida con ?w=)")
+async def descargar_imagen(
+    request: Request,
+    nombre_archivo: str,
+    w: Optional[int] = Query(None, description="Ancho en px de la versión reducida (ver IMAGEN_ANCHOS_VARIANTE)"),
+    vence: Optional[int] = Query(None, description="Vencimiento de la URL firmada (epoch)"),
+    firma: Optional[str] = Query(None, description="Firma HMAC de la URL"),
+):
+    """
+    Sirve el archivo con soporte de Range / If-Range y respuestas 304 por
+    ETag o Last-Modified. La versión `?w=` se genera una vez y queda en disco.
+    Sin token, para que sirva en `<img>`, pero solo con la URL firmada que
+    entregan /imagenes/subir, /imagenes/{id_imagen} y los listados de
+    personas y estudiantes (`foto_miniatura`, ver url_miniatura).
+    """
+    verificar_firma(nombre_archivo, w, vence, firma)
+    archivo = await run_in_threadpool(resolver_archivo, nombre_archivo, w)
+    cabeceras = {
+        "ETag": archivo.etag,
+        "Cache-Control": _CACHE_INMUTABLE if archivo.inmutable else _CACHE_REVALIDAR,
+    }
+    if _no_modificado(request, archivo):
+        cabeceras["Last-Modified"] = formatdate(archivo.estado.st_mtime, usegmt=True)
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cabeceras)
+
+    # FileResponse: con uvicorn el archivo se lee y envía por bloques (no hay
+    # sendfile); servidores con http.response.pathsend lo delegan al SO
+    return FileResponse(archivo.ruta, media_type=archivo.mime, headers=cabeceras, stat_result=archivo.estado)
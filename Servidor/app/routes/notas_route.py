@@ -1,11 +1,13 @@
 # routers/notas_route.py
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import and_, func, insert, literal, or_, select, text
+from typing import List, Optional
 from datetime import datetime, date
-from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.database import get_db, get_async_db
+from ..core.permissions import require_permission, require_permission_async
+from ..core.bulk import upsert
 from ..models.models import (
     DocenteAsignatura, Grupo, Asignatura, AnioLectivo, PeriodoAcademico,
     Matricula, Persona, Calificacion, Falla, Grado, Usuario
@@ -13,10 +15,15 @@ from ..models.models import (
 from ..models.notas_schemas import (
     DocenteClaseSchema, EstudianteNotaSchema, DashboardDocenteSchema
 )
+from ..services.boletin_contexto_service import invalidar_contexto_boletin
+from ..services.imagen_service import url_miniatura
+from ..core.excel import HojaStreaming, respuesta_xlsx
 from io import BytesIO
-import pandas as pd
-import openpyxl
 from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/notas", tags=["Notas, Boletines y Asistencia"])
 
@@ -27,58 +34,144 @@ router = APIRouter(prefix="/notas", tags=["Notas, Boletines y Asistencia"])
 @router.get("/dashboard", response_model=DashboardDocenteSchema)
 def dashboard_docente(
     id_usuario: int = Query(..., description="ID del docente"),
+    id_periodo: Optional[int] = Query(None, description="Período para los contadores (por defecto, el activo de cada año)"),
     db: Session = Depends(get_db),
     user = Depends(require_permission("/nota", "ver"))
 ):
-    asignaturas = db.query(DocenteAsignatura).filter(
-        DocenteAsignatura.id_usuario_docente == id_usuario,
-        DocenteAsignatura.fecha_eliminacion.is_(None)
-    ).join(Grupo).join(Asignatura).join(AnioLectivo).join(Grado).all()
-
-    clases = [
-        DocenteClaseSchema(
-            id_docente_asignatura=c.id_docente_asignatura,
-            id_asignatura=c.id_asignatura,
-            nombre_asignatura=c.asignatura.nombre_asignatura,
-            id_grupo=c.id_grupo,
-            codigo_grupo=c.grupo.codigo_grupo,
-            nombre_grado=c.grupo.grado.nombre_grado,
-            id_anio_lectivo=c.id_anio_lectivo,
-            anio=c.anio_lectivo.anio
-        ) for c in asignaturas
-    ]
-
-    grupos_dirigidos = db.query(Grupo).filter(
-        Grupo.id_usuario_director == id_usuario,
-        Grupo.fecha_eliminacion.is_(None)
-    ).join(Grado).join(AnioLectivo).all()
+    # DocenteAsignatura referencia a la persona del docente, no a su usuario
+    id_persona = db.query(Usuario.id_persona).filter(Usuario.id_usuario == id_usuario).scalar()
+
+    clases = []
+    if id_persona is not None:
+        clases = [
+            DocenteClaseSchema(
+                id_docente_asignatura=c.id_docente_asignatura,
+                id_asignatura=c.id_asignatura,
+                nombre_asignatura=c.nombre_asignatura,
+                id_grupo=c.id_grupo,
+                codigo_grupo=c.codigo_grupo or "Todos los grupos",
+                nombre_grado=c.nombre_grado or "",
+                id_anio_lectivo=c.id_anio_lectivo,
+                anio=c.anio,
+                id_periodo=c.id_periodo,
+                nombre_periodo=c.nombre_periodo,
+                estudiantes_matriculados=c.matriculados,
+                notas_registradas=c.notas,
+                notas_pendientes=max(c.matriculados - c.notas, 0),
+            ) for c in db.execute(_consulta_clases_docente(id_persona, id_periodo))
+        ]
 
     director = [
         {
             "id_grupo": g.id_grupo,
             "codigo_grupo": g.codigo_grupo,
-            "nombre_grado": g.grado.nombre_grado,
-            "anio": g.anio_lectivo.anio
-        } for g in grupos_dirigidos
+            "nombre_grado": g.nombre_grado,
+            "anio": g.anio
+        } for g in db.query(
+            Grupo.id_grupo, Grupo.codigo_grupo, Grado.nombre_grado, AnioLectivo.anio
+        ).join(Grado, Grado.id_grado == Grupo.id_grado).join(
+            AnioLectivo, AnioLectivo.id_anio_lectivo == Grupo.id_anio_lectivo
+        ).filter(
+            Grupo.id_usuario_director == id_usuario,
+            Grupo.fecha_eliminacion.is_(None)
+        )
     ]
 
     return DashboardDocenteSchema(asignaturas=clases, director_de_grupo=director)
 
 
+def _consulta_clases_docente(id_persona: int, id_periodo: Optional[int]):
+    """
+    Una sola consulta: asignaciones del docente con nombres y, por clase,
+    matriculados activos y notas registradas en el período (subconsultas
+    correlacionadas). Las asignaciones sin grupo cuentan todo el grado.
+    """
+    DA = DocenteAsignatura
+    if id_periodo is not None:
+        periodo = literal(id_periodo)
+    else:
+        periodo = select(func.min(PeriodoAcademico.id_periodo)).where(
+            PeriodoAcademico.id_anio_lectivo == DA.id_anio_lectivo,
+            PeriodoAcademico.estado == "activo",
+            PeriodoAcademico.fecha_eliminacion.is_(None),
+        ).correlate(DA).scalar_subquery()
+
+    asignaciones = select(
+        DA.id_docente_asignatura, DA.id_asignatura, DA.id_grado, DA.id_grupo,
+        DA.id_anio_lectivo, periodo.label("id_periodo"),
+    ).where(
+        DA.id_persona_docente == id_persona,
+        DA.fecha_eliminacion.is_(None),
+        DA.id_anio_lectivo.is_not(None),
+    ).subquery("asignaciones")
+
+    GrupoMatricula = aliased(Grupo)
+    matriculas_clase = and_(
+        Matricula.id_anio_lectivo == asignaciones.c.id_anio_lectivo,
+        Matricula.activo == True,
+        Matricula.fecha_eliminacion.is_(None),
+        or_(
+            Matricula.id_grupo == asignaciones.c.id_grupo,
+            and_(
+                asignaciones.c.id_grupo.is_(None),
+                GrupoMatricula.id_grado == asignaciones.c.id_grado,
+                GrupoMatricula.fecha_eliminacion.is_(None),
+            ),
+        ),
+    )
+    matriculados = select(func.count(Matricula.id_matricula)).join(
+        GrupoMatricula, GrupoMatricula.id_grupo == Matricula.id_grupo
+    ).where(matriculas_clase).correlate(asignaciones).scalar_subquery()
+
+    notas = select(func.count(Calificacion.id_calificacion)).select_from(Matricula).join(
+        GrupoMatricula, GrupoMatricula.id_grupo == Matricula.id_grupo
+    ).join(Calificacion, and_(
+        Calificacion.id_persona == Matricula.id_persona,
+        Calificacion.id_asignatura == asignaciones.c.id_asignatura,
+        Calificacion.id_periodo == asignaciones.c.id_periodo,
+        Calificacion.id_anio_lectivo == asignaciones.c.id_anio_lectivo,
+        Calificacion.fecha_eliminacion.is_(None),
+    )).where(matriculas_clase).correlate(asignaciones).scalar_subquery()
+
+    GrupoClase = aliased(Grupo)
+    return (
+        select(
+            asignaciones.c.id_docente_asignatura,
+            asignaciones.c.id_asignatura,
+            asignaciones.c.id_grupo,
+            asignaciones.c.id_anio_lectivo,
+            asignaciones.c.id_periodo,
+            Asignatura.nombre_asignatura,
+            GrupoClase.codigo_grupo,
+            Grado.nombre_grado,
+            AnioLectivo.anio,
+            PeriodoAcademico.nombre_periodo,
+            matriculados.label("matriculados"),
+            notas.label("notas"),
+        )
+        .join(Asignatura, Asignatura.id_asignatura == asignaciones.c.id_asignatura)
+        .join(AnioLectivo, AnioLectivo.id_anio_lectivo == asignaciones.c.id_anio_lectivo)
+        .outerjoin(GrupoClase, GrupoClase.id_grupo == asignaciones.c.id_grupo)
+        .outerjoin(Grado, Grado.id_grado == func.coalesce(GrupoClase.id_grado, asignaciones.c.id_grado))
+        .outerjoin(PeriodoAcademico, PeriodoAcademico.id_periodo == asignaciones.c.id_periodo)
+        .order_by(AnioLectivo.anio.desc(), Grado.nombre_grado, GrupoClase.codigo_grupo, Asignatura.nombre_asignatura)
+    )
+
+
 # =======================
 # 2. ESTUDIANTES + NOTAS + FALLAS
 # =======================
 @router.get("/clase/{id_docente_asignatura}/periodo/{id_periodo}", response_model=List[EstudianteNotaSchema])
-def estudiantes_con_nota_periodo(
+async def estudiantes_con_nota_periodo(
     id_docente_asignatura: int,
     id_periodo: int,
-    db: Session = Depends(get_db),
-    user = Depends(require_permission("/nota", "ver"))
+    db: AsyncSession = Depends(get_async_db),
+    user = Depends(require_permission_async("/nota", "ver"))
 ):
-    da = db.get(DocenteAsignatura, id_docente_asignatura)
+    da = await db.get(DocenteAsignatura, id_docente_asignatura)
     if not da or da.fecha_eliminacion: raise HTTPException(404, "Asignación no encontrada")
 
-    periodo = db.get(PeriodoAcademico, id_periodo)
+    periodo = await db.get(PeriodoAcademico, id_periodo)
     if not periodo or periodo.id_anio_lectivo != da.id_anio_lectivo:
         raise HTTPException(400, "Período inválido")
 
@@ -101,10 +194,10 @@ def estudiantes_con_nota_periodo(
         GROUP BY p.id_persona, p.nombre, p.apellido, p.foto, c.calificacion_numerica
     """)
 
-    result = db.execute(query, {
+    result = (await db.execute(query, {
         "asig": da.id_asignatura, "periodo": id_periodo,
         "anio": da.id_anio_lectivo, "grupo": da.id_grupo
-    }).fetchall()
+    })).fetchall()
 
     return [
         EstudianteNotaSchema(
@@ -112,6 +205,7 @@ def estudiantes_con_nota_periodo(
             nombre=r.nombre,
             apellido=r.apellido,
             foto=r.foto,
+            foto_miniatura=url_miniatura(r.foto),
             nota_existente=float(r.calificacion_numerica) if r.calificacion_numerica else None,
             total_fallas=r.total_fallas,
             fallas_justificadas=r.justificadas,
@@ -158,7 +252,7 @@ def exportar_plantilla_excel(
         """), {
             "asig": da.id_asignatura, "periodo": id_periodo,
             "anio": da.id_anio_lectivo, "grupos": tuple(grupos_ids)
-        }).fetchall()
+        })
     else:
         estudiantes = db.execute(text("""
             SELECT p.apellido, p.nombre, p.numero_identificacion, c.calificacion_numerica
@@ -172,37 +266,47 @@ def exportar_plantilla_excel(
         """), {
             "asig": da.id_asignatura, "periodo": id_periodo,
             "anio": da.id_anio_lectivo, "grupo": da.id_grupo
-        }).fetchall()
-
-    data = []
-    for i, est in enumerate(estudiantes):
-        data.append({
-            "N°": i + 1,
-            "Cédula": est.numero_identificacion or "",
-            "Apellido": est.apellido,
-            "Nombre": est.nombre,
-            "Nota": est.calificacion_numerica or ""
         })
 
-    df = pd.DataFrame(data)
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Notas')
-        ws = writer.sheets['Notas']
-        for col in ['A', 'B', 'C', 'D', 'E']:
-            ws.column_dimensions[col].width = 18
-
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=Notas_{da.asignatura.nombre_asignatura}_{periodo.nombre_periodo}.xlsx"}
+    # === HOJA EN MODO STREAMING (filas directo desde el cursor) ===
+    hoja = HojaStreaming("Notas", anchos={col: 18 for col in "ABCDE"})
+    hoja.encabezados(["N°", "Cédula", "Apellido", "Nombre", "Nota"])
+    hoja.filas(
+        [i + 1, est.numero_identificacion or "", est.apellido, est.nombre, est.calificacion_numerica]
+        for i, est in enumerate(estudiantes)
     )
 
+    return respuesta_xlsx(hoja, f"Notas_{da.asignatura.nombre_asignatura}_{periodo.nombre_periodo}.xlsx")
+
 
 # =======================
 # 4. IMPORTAR NOTAS (CON CÉDULA)
 # =======================
+def _matriculados_asignacion(db: Session, da: DocenteAsignatura):
+    """Query de personas matriculadas en el grupo de la asignación (o en todo el grado si no tiene grupo)."""
+    query = db.query(Persona).join(Matricula).filter(
+        Matricula.id_anio_lectivo == da.id_anio_lectivo,
+        Matricula.activo == True
+    )
+    if da.id_grupo is not None:
+        return query.filter(Matricula.id_grupo == da.id_grupo)
+    return query.join(Grupo, Grupo.id_grupo == Matricula.id_grupo).filter(
+        Grupo.id_grado == da.id_grado,
+        Grupo.fecha_eliminacion.is_(None)
+    )
+
+
+def _usuario_docente(db: Session, da: DocenteAsignatura, user) -> int:
+    """Usuario del docente de la asignación; si no tiene cuenta, quien hace la importación."""
+    if da.id_persona_docente is not None:
+        id_usuario = db.query(Usuario.id_usuario).filter(
+            Usuario.id_persona == da.id_persona_docente
+        ).scalar()
+        if id_usuario is not None:
+            return id_usuario
+    return user.id_usuario
+
+
 @router.post("/importar-notas")
 async def importar_notas(
     file: UploadFile = File(...),
@@ -214,63 +318,95 @@ async def importar_notas(
     da = db.get(DocenteAsignatura, id_docente_asignatura)
     if not da: raise HTTPException(404, "No encontrada")
 
+    import pandas as pd  # solo se carga al importar archivos
+
     contents = await file.read()
     df = pd.read_excel(BytesIO(contents))
 
-    resultados = []
+    # === 1. VALIDAR FILAS (sin tocar la BD) ===
+    filas = []
     for _, row in df.iterrows():
-        cedula = str(row.get("Cédula", "")).strip()
-        apellido = str(row.get("Apellido", "")).strip()
-        nombre = str(row.get("Nombre", "")).strip()
+        filas.append((
+            str(row.get("Cédula", "")).strip(),
+            str(row.get("Apellido", "")).strip(),
+            str(row.get("Nombre", "")).strip(),
+            row.get("Nota"),
+        ))
+
+    # === 2. RESOLVER TODAS LAS CÉDULAS EN UNA CONSULTA ===
+    cedulas = {cedula for cedula, _, _, _ in filas if cedula}
+    personas_por_cedula = {}
+    if cedulas:
+        personas_por_cedula = dict(
+            _matriculados_asignacion(db, da)
+            .filter(Persona.numero_identificacion.in_(cedulas))
+            .with_entities(Persona.numero_identificacion, Persona.id_persona)
+            .all()
+        )
+
+    # === 3. NOTAS EXISTENTES EN UNA CONSULTA ===
+    notas_existentes = {}
+    if personas_por_cedula:
+        notas_existentes = dict(
+            db.query(Calificacion.id_persona, Calificacion.calificacion_numerica)
+            .filter(
+                Calificacion.id_persona.in_(personas_por_cedula.values()),
+                Calificacion.id_asignatura == da.id_asignatura,
+                Calificacion.id_periodo == id_periodo,
+                Calificacion.id_anio_lectivo == da.id_anio_lectivo
+            )
+            .all()
+        )
+
+    id_usuario_docente = _usuario_docente(db, da, user)
+    ahora = datetime.now()
 
+    resultados = []
+    por_guardar = {}
+    for cedula, apellido, nombre, valor_nota in filas:
         if not cedula:
             resultados.append({"error": f"Cédula faltante: {apellido} {nombre}"})
             continue
 
-        persona = db.query(Persona).join(Matricula).filter(
-            Persona.numero_identificacion == cedula,
-            Matricula.id_grupo == da.id_grupo,
-            Matricula.id_anio_lectivo == da.id_anio_lectivo,
-            Matricula.activo == True
-        ).first()
-
-        if not persona:
+        id_persona = personas_por_cedula.get(cedula)
+        if id_persona is None:
             resultados.append({"error": f"No encontrado: {cedula}"})
             continue
 
-        if pd.notna(row.get("Nota")):
+        if pd.notna(valor_nota):
             try:
-                nota = float(row["Nota"])
-                if not 0.0 <= nota <= 5.0:
-                    resultados.append({"error": f"Nota inválida: {nota}"})
-                    continue
-
-                cal = db.query(Calificacion).filter(
-                    Calificacion.id_persona == persona.id_persona,
-                    Calificacion.id_asignatura == da.id_asignatura,
-                    Calificacion.id_periodo == id_periodo,
-                    Calificacion.id_anio_lectivo == da.id_anio_lectivo
-                ).first()
-
-                if cal:
-                    cal.calificacion_numerica = nota
-                    cal.fecha_actualizacion = datetime.now()
-                else:
-                    cal = Calificacion(
-                        id_persona=persona.id_persona,
-                        id_asignatura=da.id_asignatura,
-                        id_periodo=id_periodo,
-                        id_anio_lectivo=da.id_anio_lectivo,
-                        id_usuario=da.id_usuario_docente,
-                        calificacion_numerica=nota
-                    )
-                    db.add(cal)
-            except:
-                resultados.append({"error": f"Nota no numérica: {row.get('Nota')}"})
+                nota = float(valor_nota)
+            except (TypeError, ValueError):
+                resultados.append({"error": f"Nota no numérica: {valor_nota}"})
+                continue
+            if not 0.0 <= nota <= 5.0:
+                resultados.append({"error": f"Nota inválida: {nota}"})
                 continue
 
+            # Solo se escriben las notas nuevas o que cambiaron (la última fila gana si se repite)
+            existente = notas_existentes.get(id_persona)
+            if existente is None or float(existente) != nota or id_persona in por_guardar:
+                por_guardar[id_persona] = {
+                    "id_persona": id_persona,
+                    "id_asignatura": da.id_asignatura,
+                    "id_periodo": id_periodo,
+                    "id_anio_lectivo": da.id_anio_lectivo,
+                    "id_usuario": id_usuario_docente,
+                    "calificacion_numerica": nota,
+                    "fecha_actualizacion": ahora,
+                }
+
         resultados.append({"estudiante": f"{cedula} - {apellido} {nombre}", "status": "OK"})
 
+    # === 4. UN SOLO UPSERT CONTRA uk_calificacion ===
+    if por_guardar:
+        upsert(
+            db, Calificacion, list(por_guardar.values()),
+            claves=("id_persona", "id_asignatura", "id_periodo", "id_anio_lectivo"),
+            actualizar=("calificacion_numerica", "fecha_actualizacion"),
+        )
+        invalidar_contexto_boletin(db, personas=por_guardar.keys(), id_periodo=id_periodo)
+
     db.commit()
     return {"resultados": resultados}
 
@@ -291,7 +427,7 @@ def exportar_asistencia(
     if not da: raise HTTPException(404, "No encontrada")
     if not 1 <= mes <= 12: raise HTTPException(400, "Mes inválido")
 
-    docente = db.get(Usuario, da.id_usuario_docente)
+    docente = db.get(Persona, da.id_persona_docente) if da.id_persona_docente else None
     if not docente: raise HTTPException(404, "Docente no encontrado")
 
     estudiantes = db.execute(text("""
@@ -300,54 +436,53 @@ def exportar_asistencia(
         JOIN matricula m ON m.id_persona = p.id_persona
         WHERE m.id_grupo = :grupo AND m.id_anio_lectivo = :anio_lectivo AND m.activo = TRUE
         ORDER BY p.apellido, p.nombre
-    """), {"grupo": da.id_grupo, "anio_lectivo": da.id_anio_lectivo}).fetchall()
-
-    # === CREAR DATAFRAME SIN TÍTULOS ===
-    data = []
-    for i, est in enumerate(estudiantes):
-        row = [i + 1, f"{est.apellido} {est.nombre}"] + [""] * 31
-        data.append(row)
-
-    df = pd.DataFrame(data, columns=["N°", "NOMBRE COMPLETO"] + [str(d) for d in range(1, 32)])
-    output = BytesIO()
-
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # Escribir sin encabezado
-        df.to_excel(writer, index=False, sheet_name='Asistencia', header=False, startrow=3)
-
-        worksheet = writer.sheets['Asistencia']
-
-        # === TÍTULOS MANUALES ===
-        worksheet['A1'] = f"JORNADA: Mañana - Grado: {da.grupo.grado.nombre_grado} - Docente: {docente.persona.nombre} {docente.persona.apellido}"
-        worksheet.merge_cells('A1:AH1')
-        worksheet['A1'].font = Font(bold=True, size=12)
-
-        worksheet['A2'] = f"MES: {mes:02d}/{anio}"
-        worksheet.merge_cells('A2:AH2')
-        worksheet['A2'].font = Font(bold=True)
-
-        # === ENCABEZADOS DE COLUMNAS (día 1 a 31) ===
-        for dia in range(1, 32):
-            col_letter = openpyxl.utils.get_column_letter(dia + 2)  # A=1, B=2 → C=3
-            worksheet[f"{col_letter}3"] = str(dia)
-            worksheet[f"{col_letter}3"].font = Font(bold=True)
-
-        # === ANCHOS ===
-        worksheet.column_dimensions['A'].width = 5
-        worksheet.column_dimensions['B'].width = 28
-        for col in range(3, 34):
-            worksheet.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 3.5
-
-    output.seek(0)
-    return Response(
-        output.getvalue(),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=Asistencia_{da.asignatura.nombre_asignatura}_{mes:02d}_{anio}.xlsx"}
-    )
+    """), {"grupo": da.id_grupo, "anio_lectivo": da.id_anio_lectivo})
+
+    # === ANCHOS (se declaran antes de escribir filas) ===
+    anchos = {'A': 5, 'B': 28}
+    for col in range(3, 34):
+        anchos[get_column_letter(col)] = 3.5
+    hoja = HojaStreaming("Asistencia", anchos=anchos)
+
+    # === TÍTULOS MANUALES ===
+    hoja.fila([hoja.celda(
+        f"JORNADA: Mañana - Grado: {da.grupo.grado.nombre_grado} - Docente: {docente.nombre} {docente.apellido}",
+        font=Font(bold=True, size=12)
+    )])
+    hoja.combinar('A1:AH1')
+
+    hoja.fila([hoja.celda(f"MES: {mes:02d}/{anio}", font=Font(bold=True))])
+    hoja.combinar('A2:AH2')
+
+    # === ENCABEZADOS DE COLUMNAS (día 1 a 31) ===
+    hoja.fila([None, None] + [hoja.celda(str(dia), font=Font(bold=True)) for dia in range(1, 32)])
+
+    # === ESTUDIANTES (desde la fila 4) ===
+    hoja.filas([i + 1, f"{est.apellido} {est.nombre}"] for i, est in enumerate(estudiantes))
+
+    return respuesta_xlsx(hoja, f"Asistencia_{da.asignatura.nombre_asignatura}_{mes:02d}_{anio}.xlsx")
 
 # =======================
 # 6. IMPORTAR ASISTENCIA (100% FUNCIONAL)
 # =======================
+def _buscar_en_lista(roster, por_nombre_completo, partes):
+    """
+    Empareja "APELLIDO NOMBRE" contra la lista del grupo: primero el nombre
+    completo exacto (como lo exporta la plantilla); si no, la regla anterior:
+    primer término igual al apellido y el resto contenido en el nombre.
+    """
+    exacto = por_nombre_completo.get(" ".join(partes).casefold())
+    if exacto is not None:
+        return exacto
+
+    apellido = partes[0].casefold()
+    nombre = " ".join(partes[1:]).casefold()
+    for est in roster:
+        if (est.apellido or "").casefold() == apellido and nombre in (est.nombre or "").casefold():
+            return est.id_persona
+    return None
+
+
 @router.post("/importar-asistencia")
 async def importar_asistencia(
     file: UploadFile = File(...),
@@ -360,21 +495,49 @@ async def importar_asistencia(
     da = db.get(DocenteAsignatura, id_docente_asignatura)
     if not da: raise HTTPException(404, "No encontrada")
 
+    import pandas as pd  # solo se carga al importar archivos
+
     contents = await file.read()
 
     # === LEER SIN ENCABEZADOS + SALTAR FILAS 1 y 2 ===
     try:
         df = pd.read_excel(BytesIO(contents), header=None, skiprows=3)
-        print("FILAS LEÍDAS:", len(df))
-        print("PRIMERA FILA:", df.iloc[0].to_dict())
+        logger.debug("Importar asistencia: %s filas leídas", len(df))
     except Exception as e:
         raise HTTPException(400, f"Error leyendo Excel: {str(e)}")
 
     if df.empty:
         raise HTTPException(400, "El archivo está vacío o mal formado")
 
+    try:
+        inicio_mes = date(anio, mes, 1)
+        fin_mes = date(anio + 1, 1, 1) if mes == 12 else date(anio, mes + 1, 1)
+    except ValueError:
+        raise HTTPException(400, "Mes inválido")
+
+    # === LISTA DEL GRUPO (una consulta) ===
+    roster = (
+        _matriculados_asignacion(db, da)
+        .with_entities(Persona.id_persona, Persona.apellido, Persona.nombre)
+        .order_by(Persona.id_persona)
+        .all()
+    )
+    por_nombre_completo = {}
+    for est in roster:
+        por_nombre_completo.setdefault(f"{est.apellido} {est.nombre}".strip().casefold(), est.id_persona)
+
+    # === FALLAS YA REGISTRADAS EN EL MES (una consulta) ===
+    existentes = set(
+        db.query(Falla.id_persona, Falla.fecha_falla).filter(
+            Falla.id_persona.in_([est.id_persona for est in roster]),
+            Falla.id_asignatura == da.id_asignatura,
+            Falla.fecha_falla >= inicio_mes,
+            Falla.fecha_falla < fin_mes
+        ).all()
+    ) if roster else set()
+
     resultados = []
-    fallas_agregadas = 0
+    nuevas = []
 
     for _, row in df.iterrows():
         # === COLUMNA 0 = N° | COLUMNA 1 = NOMBRE COMPLETO ===
@@ -387,40 +550,29 @@ async def importar_asistencia(
         if pd.isna(numero) or pd.isna(nombre_completo) or nombre_completo.lower() == "nan":
             continue
 
-        print(f"PROCESANDO: {nombre_completo}")
-
-        # === BUSCAR ESTUDIANTE ===
+        # === BUSCAR ESTUDIANTE (en memoria) ===
         partes = nombre_completo.split()
         if len(partes) < 2:
             resultados.append({"error": f"Nombre inválido: {nombre_completo}"})
             continue
 
-        apellido = partes[0]
-        nombre = " ".join(partes[1:])
-
-        persona = db.query(Persona).join(Matricula).filter(
-            Persona.apellido.ilike(apellido),
-            Persona.nombre.ilike(f"%{nombre}%"),
-            Matricula.id_grupo == da.id_grupo,
-            Matricula.id_anio_lectivo == da.id_anio_lectivo,
-            Matricula.activo == True
-        ).first()
-
-        if not persona:
+        id_persona = _buscar_en_lista(roster, por_nombre_completo, partes)
+        if id_persona is None:
             resultados.append({"error": f"No encontrado: {nombre_completo}"})
             continue
 
         # === PROCESAR DÍAS (columnas 2 en adelante) ===
         for dia_idx in range(2, len(row)):
-            if dia_idx >= len(row) or pd.isna(row.iloc[dia_idx]):
+            if pd.isna(row.iloc[dia_idx]):
                 continue
 
             marca_raw = str(row.iloc[dia_idx]).strip().upper()
-            
+
             # CORREGIR 'N' → 'F'
             marca = 'F' if marca_raw == 'N' else marca_raw
 
-            if marca not in ['S', 'F', 'J']:
+            # GUARDAR SOLO SI ES F O J
+            if marca not in ['F', 'J']:
                 continue
 
             dia = dia_idx - 1  # columna 2 = día 1
@@ -429,30 +581,32 @@ async def importar_asistencia(
             except ValueError:
                 continue
 
-            # GUARDAR SOLO SI ES F O J
-            if marca in ['F', 'J']:
-                existe = db.query(Falla).filter(
-                    Falla.id_persona == persona.id_persona,
-                    Falla.id_asignatura == da.id_asignatura,
-                    Falla.fecha_falla == fecha
-                ).first()
-
-                if not existe:
-                    db.add(Falla(
-                        id_persona=persona.id_persona,
-                        id_asignatura=da.id_asignatura,
-                        fecha_falla=fecha,
-                        es_justificada=(marca == 'J')
-                    ))
-                    fallas_agregadas += 1
+            if (id_persona, fecha) in existentes:
+                continue
+            existentes.add((id_persona, fecha))
+            nuevas.append({
+                "id_persona": id_persona,
+                "id_asignatura": da.id_asignatura,
+                "fecha_falla": fecha,
+                "es_justificada": marca == 'J',
+            })
 
         resultados.append({"estudiante": nombre_completo, "status": "OK"})
 
+    # === INSERCIÓN MASIVA SOLO DE LAS FALLAS NUEVAS ===
+    if nuevas:
+        db.execute(insert(Falla), nuevas)
+        invalidar_contexto_boletin(db, personas={f["id_persona"] for f in nuevas})
+
     db.commit()
+    logger.info(
+        "Asistencia importada (asignación %s, %02d/%s): %s estudiantes, %s fallas nuevas",
+        id_docente_asignatura, mes, anio, len(resultados), len(nuevas)
+    )
 
     return {
         "resultados": resultados,
-        "total_fallas_registradas": fallas_agregadas,
+        "total_fallas_registradas": len(nuevas),
         "mensaje": f"Se procesaron {len(resultados)} estudiantes"
     }
 
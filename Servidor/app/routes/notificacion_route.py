@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
-from app.core.database import get_db
-from app.models.models import Notificacion
-from app.core.dependencies import get_current_user # Suponiendo que tienes un sistema de autenticación
+from app.core.config import get_settings
+from app.core.database import get_db, sesion_async
+from app.core.paginacion import ParametrosPagina, paginar, parametros_pagina
+from app.core.permissions import require_permission
+from app.core.security import credenciales_invalidas, get_current_user, payload_valido, version_token_usuario_async
+from app.models.models import Notificacion, Usuario
+from app.services import notificacion_service
+from app.services.notificacion_difusion_service import iniciar_difusion, obtener_difusion, resolver_destinatarios
 
 router = APIRouter(
     prefix="/notificaciones",
@@ -26,42 +34,73 @@ class NotificacionResponse(BaseModel):
     class Config:
         from_attributes = True
 
+
+class ContadorResponse(BaseModel):
+    no_leidas: int
+
+
+class DifusionRequest(BaseModel):
+    tipo: str = Field(..., max_length=50)
+    titulo: str = Field(..., max_length=200)
+    mensaje: str
+    prioridad: str = Field("normal", max_length=20)
+    # Alcance por grupos (ids, grados y/o año lectivo)...
+    grupos: Optional[List[int]] = None
+    grados: Optional[List[int]] = None
+    id_anio_lectivo: Optional[int] = None
+    # ...y a quiénes de esos grupos se notifica
+    estudiantes: bool = True
+    docentes: bool = False
+    directores: bool = False
+    # Usuarios con alguno de estos roles (independiente de los grupos)
+    roles: Optional[List[int]] = None
+
 # --- Endpoints ---
 
 @router.get("/", response_model=List[NotificacionResponse], summary="Obtener notificaciones del usuario actual")
 def obtener_notificaciones_usuario(
-    db: Session = Depends(get_db), 
-    current_user: dict = Depends(get_current_user) # Obtiene el usuario logueado
+    response: Response,
+    solo_no_leidas: bool = Query(False, description="Solo las notificaciones sin leer"),
+    pagina: ParametrosPagina = Depends(parametros_pagina),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user) # Obtiene el usuario logueado
 ):
     """
-    Devuelve todas las notificaciones (leídas y no leídas) para el usuario
-    que ha iniciado sesión, ordenadas por fecha de creación.
+    Notificaciones del usuario que ha iniciado sesión, de la más reciente a la
+    más antigua. Con limit se pagina por cursor (header X-Cursor-Siguiente).
     """
-    id_usuario = current_user.get("id_usuario")
-    
-    notificaciones = db.query(Notificacion).filter(
-        Notificacion.id_usuario_destino == id_usuario
-    ).order_by(Notificacion.fecha_creacion.desc()).all()
-    
-    return notificaciones
+    query = db.query(Notificacion).filter(
+        Notificacion.id_usuario_destino == current_user.id_usuario
+    )
+    if solo_no_leidas:
+        query = query.filter(notificacion_service.filtro_no_leidas())
+
+    return paginar(query, (Notificacion.id_notificacion,), pagina, response, descendente=True)
+
+
+@router.get("/no-leidas", response_model=ContadorResponse, summary="Cantidad de notificaciones sin leer")
+def contar_notificaciones_no_leidas(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Lee el contador mantenido al crear y marcar notificaciones (no recorre la bandeja)."""
+    return {"no_leidas": notificacion_service.contar_no_leidas(db, current_user.id_usuario)}
 
 
 @router.post("/{id_notificacion}/marcar-leida", status_code=status.HTTP_204_NO_CONTENT, summary="Marcar una notificación como leída")
 def marcar_notificacion_leida(
     id_notificacion: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user = Depends(get_current_user)
 ):
     """
     Cambia el estado de una notificación a 'leída'.
     Un usuario solo puede marcar sus propias notificaciones.
     """
-    id_usuario = current_user.get("id_usuario")
-
     # 1. Buscar la notificación
     notificacion = db.query(Notificacion).filter(
         Notificacion.id_notificacion == id_notificacion,
-        Notificacion.id_usuario_destino == id_usuario
+        Notificacion.id_usuario_destino == current_user.id_usuario
     ).first()
 
     if not notificacion:
@@ -70,7 +109,7 @@ def marcar_notificacion_leida(
             detail="Notificación no encontrada o no tienes permiso para modificarla."
         )
 
-    # 2. Si no está leída, actualizarla
+    # 2. Si no está leída, actualizarla (el contador se descuenta en el mismo commit)
     if not notificacion.leida:
         notificacion.leida = True
         notificacion.fecha_leida = datetime.utcnow()
@@ -79,6 +118,143 @@ def marcar_notificacion_leida(
     # Se devuelve 204 No Content, que no lleva cuerpo de respuesta.
     return
 
+
+@router.post("/marcar-todas-leidas", response_model=ContadorResponse, summary="Marcar todas las notificaciones como leídas")
+def marcar_todas_leidas(
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Un solo UPDATE sobre la bandeja del usuario; el contador se descuenta en el mismo commit."""
+    notificacion_service.marcar_todas_leidas(db, current_user.id_usuario)
+    db.commit()
+    return {"no_leidas": notificacion_service.contar_no_leidas(db, current_user.id_usuario)}
+
+
+# --- Difusión a grupos, grados o roles ---
+
+@router.post("/difusion", status_code=status.HTTP_202_ACCEPTED, summary="Notificar a grupos, grados o roles")
+def crear_difusion(
+    data: DifusionRequest,
+    db: Session = Depends(get_db),
+    current_user = Depends(require_permission("/notificaciones", "crear"))
+):
+    """
+    Resuelve los destinatarios en una consulta y crea las notificaciones en
+    segundo plano, por lotes. El avance se consulta en /difusion/{id_trabajo}.
+    """
+    destinatarios = resolver_destinatarios(
+        db,
+        grupos=data.grupos,
+        grados=data.grados,
+        id_anio_lectivo=data.id_anio_lectivo,
+        roles=data.roles,
+        estudiantes=data.estudiantes,
+        docentes=data.docentes,
+        directores=data.directores,
+    )
+    trabajo = iniciar_difusion(destinatarios, {
+        "tipo": data.tipo,
+        "titulo": data.titulo,
+        "mensaje": data.mensaje,
+        "prioridad": data.prioridad,
+        "id_usuario_origen": current_user.id_usuario,
+        "leida": False,
+    })
+    return {"id_trabajo": trabajo.id_trabajo, "total_destinatarios": len(destinatarios)}
+
+
+@router.get("/difusion/{id_trabajo}", summary="Avance de una difusión")
+def estado_difusion(
+    id_trabajo: str,
+    current_user = Depends(require_permission("/notificaciones", "crear"))
+):
+    return obtener_difusion(id_trabajo).to_dict()
+
+
+# --- Tiempo real (Server-Sent Events) ---
+
+async def _usuario_stream(request: Request, token: Optional[str]) -> int:
+    """
+    EventSource no permite enviar headers: el token puede venir en
+    Authorization o en ?token=. Se valida una sola vez al abrir la conexión.
+    """
+    autorizacion = request.headers.get("authorization", "")
+    if autorizacion.lower().startswith("bearer "):
+        token = autorizacion[7:]
+    if not token:
+        raise credenciales_invalidas()
+    payload = payload_valido(token)
+
+    async with sesion_async() as db:
+        if "ver" in payload:
+            if payload["ver"] != await version_token_usuario_async(db, payload["uid"]):
+                raise credenciales_invalidas()
+        else:
+            existe = (await db.execute(
+                select(Usuario.id_usuario).where(
+                    Usuario.id_usuario == payload["uid"],
+                    Usuario.username == payload["sub"],
+                    Usuario.fecha_eliminacion.is_(None),
+                )
+            )).first()
+            if existe is None:
+                raise credenciales_invalidas()
+    return payload["uid"]
+
+
+def _evento_sse(nombre: str, datos) -> str:
+    return f"event: {nombre}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+async def _leer_contador(id_usuario: int) -> int:
+    # Sesión corta por lectura: la conexión SSE no retiene una conexión del pool
+    async with sesion_async() as db:
+        return await notificacion_service.contar_no_leidas_async(db, id_usuario)
+
+
+@router.get("/stream", summary="Notificaciones nuevas y contador en tiempo real (SSE)")
+async def stream_notificaciones(
+    request: Request,
+    token: Optional[str] = Query(None, description="Token JWT (para EventSource, que no envía headers)"),
+):
+    """
+    Mantiene abierta una respuesta text/event-stream con los eventos
+    `notificacion` (cada notificación nueva) y `contador` ({"no_leidas": n}).
+    Cada NOTIFICACIONES_SSE_PING segundos se vuelve a leer el contador, lo que
+    también mantiene viva la conexión a través de proxies.
+    """
+    id_usuario = await _usuario_stream(request, token)
+    suscripcion = notificacion_service.suscribir(id_usuario)
+
+    async def eventos():
+        try:
+            no_leidas = await _leer_contador(id_usuario)
+            yield "retry: 5000\n\n"
+            yield _evento_sse("contador", {"no_leidas": no_leidas})
+            while not await request.is_disconnected():
+                evento = await notificacion_service.siguiente_evento(
+                    suscripcion, get_settings().NOTIFICACIONES_SSE_PING
+                )
+                if evento is None:
+                    # Ping: corrige cambios hechos desde otros procesos
+                    no_leidas = await _leer_contador(id_usuario)
+                    yield _evento_sse("contador", {"no_leidas": no_leidas})
+                    continue
+                tipo, datos = evento
+                if tipo == "notificacion":
+                    yield _evento_sse("notificacion", datos)
+                    continue
+                no_leidas = max(no_leidas + datos, 0) if tipo == "delta" else await _leer_contador(id_usuario)
+                yield _evento_sse("contador", {"no_leidas": no_leidas})
+        finally:
+            notificacion_service.cancelar(suscripcion)
+
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # --- Función de utilidad (para ser usada en otras partes del código) ---
 
 def crear_notificacion(
@@ -92,10 +268,11 @@ def crear_notificacion(
 ):
     """
     Función helper para crear una notificación desde cualquier parte del backend.
+    El contador de no leídas y el aviso por SSE se actualizan al hacer commit.
     Ejemplo de uso desde otra ruta:
-    
+
     from app.routes.notificacion_route import crear_notificacion
-    
+
     crear_notificacion(
         db=db,
         id_usuario_destino=1,
@@ -1,10 +1,11 @@
 # routes/pagina_route.py
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
+from ..core.catalogo_cache import respuesta_catalogo
 from ..core.database import get_db
-from ..core.permissions import require_permission
+from ..core.permissions import require_permission, invalidar_cache_permisos
 from ..models.Pagina_model import Pagina, PaginaCreate, PaginaUpdate
 from ..models.models import Pagina as PaginaDB
 
@@ -12,17 +13,21 @@ router = APIRouter(prefix="/paginas", tags=["Páginas"])
 
 @router.get("/", response_model=List[Pagina])
 def listar_paginas(
+    request: Request,
     nombre: Optional[str] = Query(None),
     ruta: Optional[str] = Query(None),
     user = Depends(require_permission("/paginas", "ver")),
     db: Session = Depends(get_db)
 ):
-    query = db.query(PaginaDB).filter(PaginaDB.visible == True)
-    if nombre:
-        query = query.filter(PaginaDB.nombre.ilike(f"%{nombre.strip()}%"))
-    if ruta:
-        query = query.filter(PaginaDB.ruta.ilike(f"%{ruta.strip()}%"))
-    return query.all()
+    def cargar():
+        query = db.query(PaginaDB).filter(PaginaDB.visible == True)
+        if nombre:
+            query = query.filter(PaginaDB.nombre.ilike(f"%{nombre.strip()}%"))
+        if ruta:
+            query = query.filter(PaginaDB.ruta.ilike(f"%{ruta.strip()}%"))
+        return query.all()
+
+    return respuesta_catalogo(request, List[Pagina], ("paginas",), cargar)
 
 @router.get("/{id_pagina}", response_model=Pagina)
 def obtener_pagina(
@@ -48,6 +53,7 @@ def crear_pagina(
     nueva = PaginaDB(nombre=pagina.nombre.strip(), ruta=pagina.ruta.strip(), visible=pagina.visible)
     db.add(nueva)
     db.commit()
+    invalidar_cache_permisos()
     db.refresh(nueva)
     return nueva
 
@@ -79,6 +85,7 @@ def actualizar_pagina(
         raise HTTPException(400, "No se enviaron datos para actualizar")
 
     db.commit()
+    invalidar_cache_permisos()
     db.refresh(pagina)
     return pagina
 
@@ -94,4 +101,5 @@ def eliminar_pagina(
 
     db.delete(pagina)
     db.commit()
+    invalidar_cache_permisos()
     return {"mensaje": "Página eliminada"}
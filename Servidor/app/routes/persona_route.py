@@ -1,13 +1,22 @@
 # routers/persona_route.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime
 from ..core.database import get_db
 from ..core.permissions import require_permission
+from ..core.paginacion import ParametrosPagina, paginar, parametros_pagina
+from ..services.persona_busqueda_service import (
+    condicion_busqueda,
+    normalizar,
+    rango_busqueda,
+    reindexar,
+)
+from ..services.imagen_service import url_miniatura
 from ..models.Persona_model import Persona, PersonaCreate, PersonaUpdate
 from ..models.models import (
     Persona as PersonaDB,
+    PersonaBusqueda,
     TipoIdentificacion,
     Ciudad,
     Matricula
@@ -18,10 +27,12 @@ router = APIRouter(prefix="/personas", tags=["Personas"])
 
 @router.get("/", response_model=List[Persona])
 def listar_personas(
+    response: Response,
     tipo_id: Optional[int] = Query(None),
     ciudad_id: Optional[int] = Query(None),
     genero: Optional[str] = Query(None),
     buscar: Optional[str] = Query(None, description="Buscar por nombre, apellido o número de identificación"),
+    pagina: ParametrosPagina = Depends(parametros_pagina),
     user = Depends(require_permission("/personas", "ver")),
     db: Session = Depends(get_db)
 ):
@@ -45,8 +56,56 @@ def listar_personas(
             )
         )
 
-    # Ordenar resultados para mejor experiencia
-    return query.order_by(PersonaDB.nombre, PersonaDB.apellido).all()
+    # Ordenar resultados para mejor experiencia (id_persona desempata el cursor)
+    filas = paginar(query, (PersonaDB.nombre, PersonaDB.apellido, PersonaDB.id_persona), pagina, response)
+    return [_con_miniaturas(persona) for persona in filas]
+
+
+def _con_miniaturas(persona: PersonaDB) -> Persona:
+    return Persona.model_validate(persona).model_copy(update={
+        "foto_miniatura": url_miniatura(persona.foto),
+        "firma_miniatura": url_miniatura(persona.firma),
+    })
+
+
+# ==================== BÚSQUEDA NORMALIZADA ====================
+@router.get("/buscar", response_model=List[Persona])
+def buscar_personas(
+    response: Response,
+    q: str = Query(..., min_length=1, description="Nombre, apellido o identificación (sin importar tildes)"),
+    pagina: ParametrosPagina = Depends(parametros_pagina),
+    user = Depends(require_permission("/personas", "ver")),
+    db: Session = Depends(get_db)
+):
+    if not normalizar(q):
+        raise HTTPException(400, "El término de búsqueda debe tener letras o números")
+
+    dialecto = db.get_bind().dialect.name
+    rango = rango_busqueda(q, dialecto)
+
+    query = (
+        db.query(PersonaDB, rango.label("rango"))
+        .join(PersonaBusqueda, PersonaBusqueda.id_persona == PersonaDB.id_persona)
+        .filter(PersonaDB.fecha_eliminacion.is_(None))
+        .filter(condicion_busqueda(q, dialecto))
+    )
+
+    # Más relevantes primero; a igual rango, orden alfabético
+    filas = paginar(
+        query, (rango, PersonaDB.apellido, PersonaDB.nombre, PersonaDB.id_persona), pagina, response,
+        valores=lambda fila: (fila.rango, fila[0].apellido, fila[0].nombre, fila[0].id_persona),
+    )
+    return [_con_miniaturas(persona) for persona, _ in filas]
+
+
+@router.post("/buscar/reindexar", response_model=dict)
+def reindexar_busqueda(
+    user = Depends(require_permission("/personas", "editar")),
+    db: Session = Depends(get_db)
+):
+    """Reconstruye persona_busqueda (necesario una vez tras crear la tabla o cargar datos por SQL)."""
+    total = reindexar(db)
+    return {"mensaje": "Índice de búsqueda reconstruido", "total": total}
 
 
 @router.get("/{id_persona}", response_model=Persona)
@@ -61,7 +120,7 @@ def obtener_persona(
     ).first()
     if not persona:
         raise HTTPException(404, "Persona no encontrada")
-    return persona
+    return _con_miniaturas(persona)
 
 
 @router.post("/", response_model=dict)
@@ -7,7 +7,7 @@ from datetime import datetime, timedelta
 
 from app.core.database import get_db
 from app.models.models import Usuario, RecuperacionContrasena, Persona
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, revocar_tokens_usuario
 
 router = APIRouter(
     prefix="/recuperacion-contrasena",
@@ -89,6 +89,7 @@ def reiniciar_password(request: ResetPasswordSchema, db: Session = Depends(get_d
 
     # 3. Actualizar la contraseña del usuario
     usuario.password = get_password_hash(request.nueva_password)
+    revocar_tokens_usuario(db, usuario.id_usuario)
     
     # 4. Marcar el código como usado
     registro.usado = True
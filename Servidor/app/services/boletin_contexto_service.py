@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import event, inspect, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.models import (
+    AnioLectivo,
+    Asignatura,
+    BoletinContexto,
+    Calificacion,
+    DocenteAsignatura,
+    Falla,
+    Grado,
+    GradoAsignatura,
+    Grupo,
+    Jornada,
+    Matricula,
+    PeriodoAcademico,
+    Persona,
+    Usuario,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# === LECTURA / ESCRITURA DEL SNAPSHOT ===
+def _crear_marcador(db: Session, grupo_id: int, periodo_id: int) -> int:
+    """
+    Fila vacía (contexto=None, version=0) antes de calcular el primer
+    contexto: así una invalidación que llegue durante el cálculo encuentra la
+    fila, sube la versión y el guardado condicionado no guarda una foto vieja.
+    """
+    try:
+        db.add(BoletinContexto(
+            id_grupo=grupo_id,
+            id_periodo=periodo_id,
+            version=0,
+            contexto=None,
+            fecha_actualizacion=datetime.now(),
+        ))
+        db.commit()
+        return 0
+    except IntegrityError:
+        # Otra petición creó la fila al mismo tiempo: se usa su versión
+        db.rollback()
+        return db.execute(
+            select(BoletinContexto.version).where(
+                BoletinContexto.id_grupo == grupo_id,
+                BoletinContexto.id_periodo == periodo_id,
+            )
+        ).scalar_one()
+
+
+def leer_snapshot(db: Session, grupo_id: int, periodo_id: int) -> tuple[Optional[Dict], int]:
+    """
+    Devuelve (contexto, version). El contexto es None si no existe o fue
+    invalidado; si la fila no existía se crea vacía para fijar la versión.
+    """
+    fila = db.execute(
+        select(BoletinContexto.contexto, BoletinContexto.version).where(
+            BoletinContexto.id_grupo == grupo_id,
+            BoletinContexto.id_periodo == periodo_id,
+        )
+    ).first()
+    if fila is None:
+        return None, _crear_marcador(db, grupo_id, periodo_id)
+    if fila.contexto is None:
+        return None, fila.version
+    return json.loads(fila.contexto), fila.version
+
+
+def guardar_snapshot(db: Session, grupo_id: int, periodo_id: int, version: int, context: Dict):
+    """
+    Guarda el contexto solo si nadie lo invalidó mientras se calculaba: la
+    actualización se condiciona a la versión leída antes de consultar.
+    """
+    contenido = json.dumps(context, ensure_ascii=False, default=str)
+    db.execute(
+        update(BoletinContexto)
+        .where(
+            BoletinContexto.id_grupo == grupo_id,
+            BoletinContexto.id_periodo == periodo_id,
+            BoletinContexto.version == version,
+        )
+        .values(contexto=contenido, fecha_actualizacion=datetime.now())
+    )
+    db.commit()
+
+
+# === INVALIDACIÓN ===
+class _Afectados:
+    """Criterios acumulados en un flush para invalidar snapshots en una sola sentencia."""
+
+    def __init__(self):
+        self.todo = False
+        self.grupos: Set[int] = set()
+        self.grados: Set[int] = set()
+        self.jornadas: Set[int] = set()
+        self.anios: Set[int] = set()
+        self.periodos: Set[int] = set()
+        self.personas: Set[int] = set()
+        self.personas_periodo: Dict[int, Set[int]] = {}
+
+    def vacio(self) -> bool:
+        return not (self.todo or self.grupos or self.grados or self.jornadas or self.anios
+                    or self.periodos or self.personas or self.personas_periodo)
+
+    def condicion(self):
+        if self.todo:
+            return None
+
+        condiciones = []
+        if self.grupos:
+            condiciones.append(BoletinContexto.id_grupo.in_(self.grupos))
+        if self.grados:
+            condiciones.append(BoletinContexto.id_grupo.in_(
+                select(Grupo.id_grupo).where(Grupo.id_grado.in_(self.grados))
+            ))
+        if self.jornadas:
+            condiciones.append(BoletinContexto.id_grupo.in_(
+                select(Grupo.id_grupo).where(Grupo.id_jornada.in_(self.jornadas))
+            ))
+        if self.anios:
+            condiciones.append(BoletinContexto.id_grupo.in_(
+                select(Grupo.id_grupo).where(Grupo.id_anio_lectivo.in_(self.anios))
+            ))
+        if self.periodos:
+            condiciones.append(BoletinContexto.id_periodo.in_(self.periodos))
+        if self.personas:
+            condiciones.append(BoletinContexto.id_grupo.in_(_grupos_de_personas(self.personas)))
+        for periodo_id, personas in self.personas_periodo.items():
+            condiciones.append(
+                (BoletinContexto.id_periodo == periodo_id)
+                & BoletinContexto.id_grupo.in_(_grupos_de_personas(personas))
+            )
+        return or_(*condiciones)
+
+
+def _grupos_de_personas(personas: Iterable[int]):
+    """Grupos donde la persona está matriculada o es director (su nombre sale en el boletín)."""
+    return (
+        select(Matricula.id_grupo).where(Matricula.id_persona.in_(personas))
+        .union(
+            select(Grupo.id_grupo)
+            .join(Usuario, Usuario.id_usuario == Grupo.id_usuario_director)
+            .where(Usuario.id_persona.in_(personas))
+        )
+    )
+
+
+def _valores(obj, atributo: str) -> Set[int]:
+    """Valor actual y anterior de una columna (un cambio de grupo afecta a ambos)."""
+    historial = inspect(obj).attrs[atributo].history
+    valores = set(historial.added) | set(historial.unchanged) | set(historial.deleted)
+    if not valores:
+        valores = {getattr(obj, atributo)}
+    return {v for v in valores if v is not None}
+
+
+def _registrar(afectados: _Afectados, obj):
+    if isinstance(obj, Calificacion):
+        for periodo_id in _valores(obj, "id_periodo"):
+            afectados.personas_periodo.setdefault(periodo_id, set()).update(_valores(obj, "id_persona"))
+    elif isinstance(obj, (Falla, Persona)):
+        afectados.personas.update(_valores(obj, "id_persona"))
+    elif isinstance(obj, (Matricula, Grupo)):
+        afectados.grupos.update(_valores(obj, "id_grupo"))
+    elif isinstance(obj, DocenteAsignatura):
+        grupos = _valores(obj, "id_grupo")
+        if grupos:
+            afectados.grupos.update(grupos)
+        else:
+            afectados.grados.update(_valores(obj, "id_grado"))
+    elif isinstance(obj, (Grado, GradoAsignatura)):
+        afectados.grados.update(_valores(obj, "id_grado"))
+    elif isinstance(obj, Jornada):
+        afectados.jornadas.update(_valores(obj, "id_jornada"))
+    elif isinstance(obj, AnioLectivo):
+        afectados.anios.update(_valores(obj, "id_anio_lectivo"))
+    elif isinstance(obj, PeriodoAcademico):
+        afectados.periodos.update(_valores(obj, "id_periodo"))
+    elif isinstance(obj, Asignatura):
+        afectados.todo = True
+
+
+def _aplicar_invalidacion(conexion_o_sesion, afectados: _Afectados):
+    if afectados.vacio():
+        return
+    sentencia = update(BoletinContexto).values(
+        version=BoletinContexto.version + 1,
+        contexto=None,
+        fecha_actualizacion=datetime.now(),
+    )
+    condicion = afectados.condicion()
+    if condicion is not None:
+        sentencia = sentencia.where(condicion)
+    conexion_o_sesion.execute(sentencia)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidar_tras_flush(session: Session, flush_context):
+    afectados = _Afectados()
+    for obj in session.new:
+        _registrar(afectados, obj)
+    for obj in session.deleted:
+        _registrar(afectados, obj)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            _registrar(afectados, obj)
+
+    # En la misma transacción que el cambio: si se revierte, el snapshot sigue vigente
+    _aplicar_invalidacion(session.connection(), afectados)
+
+
+def invalidar_contexto_boletin(
+    db: Session,
+    grupos: Iterable[int] = (),
+    grados: Iterable[int] = (),
+    periodos: Iterable[int] = (),
+    personas: Iterable[int] = (),
+    id_periodo: Optional[int] = None,
+    todo: bool = False,
+):
+    """
+    Invalidación explícita para escrituras que no pasan por el flush del ORM
+    (inserts/updates masivos con `insert()`/`update()` o `bulk_*`). No hace commit.
+    Con `id_periodo`, las `personas` solo invalidan ese período.
+    """
+    afectados = _Afectados()
+    afectados.todo = todo
+    afectados.grupos.update(grupos)
+    afectados.grados.update(grados)
+    afectados.periodos.update(periodos)
+    if id_periodo is not None:
+        afectados.personas_periodo[id_periodo] = set(personas)
+    else:
+        afectados.personas.update(personas)
+    _aplicar_invalidacion(db, afectados)
@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import logging
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.core.trabajos import Trabajo, registro_trabajos
+from app.models.models import Grupo, PeriodoAcademico
+from app.services.boletin_service import (
+    get_template_path,
+    nombre_archivo_boletin,
+    obtener_contexto_vigente,
+    renderizar_docx,
+)
+
+logger = logging.getLogger(__name__)
+
+TIPO_TRABAJO = "boletines_lote"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    """Pool de procesos compartido por todos los lotes de este proceso."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            settings = get_settings()
+            _pool = ProcessPoolExecutor(max_workers=max(1, settings.BOLETIN_LOTE_WORKERS))
+        return _pool
+
+
+def _directorio_lotes() -> Path:
+    directorio = Path(get_settings().BOLETIN_LOTE_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _eliminar_zip(trabajo: Trabajo):
+    if trabajo.resultado:
+        Path(trabajo.resultado).unlink(missing_ok=True)
+
+
+def resolver_grupos_lote(
+    db: Session,
+    periodo_id: int,
+    id_grado: Optional[int] = None,
+    id_anio_lectivo: Optional[int] = None,
+    grupos: Optional[List[int]] = None,
+) -> List[int]:
+    """
+    Determina los grupos del lote: una lista explícita, todos los grupos de un
+    grado o todos los grupos del año lectivo del período (colegio completo).
+    """
+    periodo: PeriodoAcademico | None = db.get(PeriodoAcademico, periodo_id)
+    if not periodo or periodo.fecha_eliminacion is not None:
+        raise HTTPException(status_code=404, detail="Período no encontrado")
+
+    if id_anio_lectivo is not None and id_anio_lectivo != periodo.id_anio_lectivo:
+        raise HTTPException(status_code=400, detail="El período seleccionado no pertenece al año lectivo indicado")
+
+    query = db.query(Grupo.id_grupo).filter(
+        Grupo.id_anio_lectivo == periodo.id_anio_lectivo,
+        Grupo.fecha_eliminacion.is_(None)
+    )
+    if grupos:
+        query = query.filter(Grupo.id_grupo.in_(grupos))
+    elif id_grado is not None:
+        query = query.filter(Grupo.id_grado == id_grado)
+
+    grupo_ids = [g.id_grupo for g in query.order_by(Grupo.codigo_grupo).all()]
+
+    if grupos:
+        faltantes = set(grupos) - set(grupo_ids)
+        if faltantes:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Grupos no encontrados o de otro año lectivo: {sorted(faltantes)}"
+            )
+
+    if not grupo_ids:
+        raise HTTPException(status_code=400, detail="No hay grupos para generar boletines con los filtros indicados")
+
+    return grupo_ids
+
+
+def _ejecutar_lote(trabajo: Trabajo, periodo_id: int, grupo_ids: List[int], template_path: str):
+    destino = _directorio_lotes() / f"{trabajo.id_trabajo}.zip"
+    parcial = destino.with_suffix(".zip.parcial")
+    pool = _obtener_pool()
+
+    # Los contextos se arman aquí (una sesión por lote); el render va al pool
+    futuros: Dict = {}
+    db = SessionLocal()
+    try:
+        for grupo_id in grupo_ids:
+            try:
+                context = obtener_contexto_vigente(db, grupo_id, periodo_id)
+            except HTTPException as e:
+                trabajo.avanzar(error=f"Grupo {grupo_id}: {e.detail}")
+                continue
+            futuro = pool.submit(renderizar_docx, template_path, context)
+            futuros[futuro] = (grupo_id, nombre_archivo_boletin(context))
+    finally:
+        db.close()
+
+    generados = 0
+    with zipfile.ZipFile(parcial, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for futuro in as_completed(futuros):
+            grupo_id, filename = futuros[futuro]
+            try:
+                zf.writestr(filename, futuro.result())
+                generados += 1
+                trabajo.avanzar()
+            except Exception as e:
+                logger.exception(f"Error renderizando boletines del grupo {grupo_id}")
+                trabajo.avanzar(error=f"Grupo {grupo_id}: {e}")
+
+    if not generados:
+        parcial.unlink(missing_ok=True)
+        trabajo.finalizar(error="No se generó ningún boletín")
+        return
+
+    shutil.move(str(parcial), str(destino))
+    trabajo.finalizar(str(destino))
+
+
+def iniciar_lote_boletines(periodo_id: int, grupo_ids: List[int]) -> Trabajo:
+    template_path = str(get_template_path())
+
+    registro_trabajos.purgar(_eliminar_zip, tipo=TIPO_TRABAJO)
+    trabajo = registro_trabajos.crear(TIPO_TRABAJO, total=len(grupo_ids))
+    registro_trabajos.lanzar(trabajo, _ejecutar_lote, periodo_id, grupo_ids, template_path)
+    return trabajo
+
+
+def obtener_lote(id_trabajo: str) -> Trabajo:
+    trabajo = registro_trabajos.obtener(id_trabajo)
+    if not trabajo or trabajo.tipo != TIPO_TRABAJO:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return trabajo
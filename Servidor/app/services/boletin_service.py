@@ -1,16 +1,19 @@
 from __future__ import annotations
 
+import re
+import zipfile
 from datetime import datetime
 from io import BytesIO
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
 
-from docxtpl import DocxTemplate
 from fastapi import HTTPException, status
 from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
 from app.core.config import get_settings
+from app.core.pdf import datos_pdf_estudiante, generar_boletin_pdf, generar_boletines_pdf
+from app.core.plantillas import registro_plantillas
 from app.models.models import (
     AnioLectivo,
     Asignatura,
@@ -25,9 +28,10 @@ from app.models.models import (
     PeriodoAcademico,
     Persona,
 )
+from app.services.boletin_contexto_service import guardar_snapshot, leer_snapshot
 
 
-def _get_template_path() -> Path:
+def get_template_path() -> Path:
     settings = get_settings()
     template_path = Path(settings.BOLETIN_TEMPLATE_PATH)
     if not template_path.exists():
@@ -83,6 +87,7 @@ def obtener_contexto_boletin(
     anio: AnioLectivo | None = db.get(AnioLectivo, grupo.id_anio_lectivo)
     grado: Grado | None = db.get(Grado, grupo.id_grado)
     jornada: Jornada | None = db.get(Jornada, grupo.id_jornada) if getattr(grupo, "id_jornada", None) else None
+    director_persona = grupo.director.persona if grupo.director else None
 
     estudiantes_rows = (
         db.query(Persona, Matricula)
@@ -225,6 +230,7 @@ def obtener_contexto_boletin(
             "nivel": grado.nivel if grado else "",
             "jornada": jornada.nombre if jornada else "",
             "anio": anio.anio if anio else "",
+            "director": f"{director_persona.nombre} {director_persona.apellido}" if director_persona else "",
         },
         "periodo": {
             "nombre": periodo.nombre_periodo,
@@ -239,21 +245,133 @@ def obtener_contexto_boletin(
     return context
 
 
-def generar_boletin_docx(db: Session, grupo_id: int, periodo_id: int) -> Tuple[BytesIO, str]:
+def obtener_contexto_vigente(db: Session, grupo_id: int, periodo_id: int) -> Dict:
+    """
+    Contexto desde el snapshot de (grupo, período) si sigue vigente; si no,
+    se calcula con `obtener_contexto_boletin` y se guarda para las siguientes descargas.
+    """
+    context, version = leer_snapshot(db, grupo_id, periodo_id)
+    if context is not None:
+        context["fecha_generacion"] = datetime.now().strftime("%d/%m/%Y %H:%M")
+        return context
+
     context = obtener_contexto_boletin(db, grupo_id, periodo_id)
-    template_path = _get_template_path()
+    guardar_snapshot(db, grupo_id, periodo_id, version, context)
+    return context
+
+
+def nombre_archivo_boletin(context: Dict, extension: str = "docx") -> str:
+    periodo_nombre = context["periodo"]["nombre"]
+    grupo_codigo = context["grupo"]["codigo"]
+    return f"Boletines_{grupo_codigo}_{periodo_nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+
+
+def nombre_archivo_estudiante(context: Dict, estudiante: Dict, extension: str = "docx") -> str:
+    nombre = f"{estudiante['apellido']}_{estudiante['primer_nombre']}_{estudiante['numero_identificacion']}"
+    nombre = re.sub(r"[^\w\-]+", "_", nombre).strip("_")
+    return f"Boletin_{context['grupo']['codigo']}_{context['periodo']['nombre']}_{nombre}.{extension}"
+
+
+def contextos_por_estudiante(context: Dict) -> Iterator[Tuple[Dict, Dict]]:
+    """Divide el contexto del grupo en un contexto de un solo estudiante por documento."""
+    for estudiante in context["estudiantes"]:
+        yield estudiante, {**context, "estudiantes": [estudiante]}
+
+
+class _SalidaZip:
+    """Destino de escritura no posicionable: acumula lo que zipfile escribe hasta que se vacía."""
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._partes.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def vaciar(self) -> bytes:
+        data = b"".join(self._partes)
+        self._partes.clear()
+        return data
+
+
+def zip_en_flujo(archivos: Iterable[Tuple[str, Callable[[], bytes]]]) -> Iterator[bytes]:
+    """
+    Genera un ZIP por partes: cada archivo se produce, se comprime y se entrega
+    antes de pasar al siguiente, así la memoria no depende del número de archivos.
+    """
+    salida = _SalidaZip()
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for filename, producir in archivos:
+            zf.writestr(filename, producir())
+            yield salida.vaciar()
+    yield salida.vaciar()
 
-    doc = DocxTemplate(str(template_path))
+
+def renderizar_docx(template_path: str, context: Dict) -> bytes:
+    """
+    Renderiza la plantilla con el contexto y devuelve el documento en bytes.
+    Es una función de módulo (sin sesión de BD) para poder ejecutarse en un
+    pool de procesos; cada proceso compila la plantilla una sola vez.
+    """
+    doc = registro_plantillas.obtener(template_path)
     doc.render(context)
 
     buffer = BytesIO()
     doc.save(buffer)
-    buffer.seek(0)
+    return buffer.getvalue()
 
-    periodo_nombre = context["periodo"]["nombre"]
-    grupo_codigo = context["grupo"]["codigo"]
-    filename = f"Boletines_{grupo_codigo}_{periodo_nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
+
+def generar_boletin_docx(db: Session, grupo_id: int, periodo_id: int) -> Tuple[BytesIO, str]:
+    context = obtener_contexto_vigente(db, grupo_id, periodo_id)
+    template_path = get_template_path()
+
+    buffer = BytesIO(renderizar_docx(str(template_path), context))
+    filename = nombre_archivo_boletin(context)
 
     return buffer, filename
 
 
+def generar_boletines_zip_por_estudiante(db: Session, grupo_id: int, periodo_id: int) -> Tuple[Iterator[bytes], str]:
+    """
+    Un .docx por estudiante dentro de un ZIP que se genera mientras se envía.
+    El contexto se consulta antes de empezar para que los errores lleguen como
+    respuesta HTTP normal y no a mitad del flujo.
+    """
+    context = obtener_contexto_vigente(db, grupo_id, periodo_id)
+    template_path = str(get_template_path())
+
+    archivos = (
+        (
+            nombre_archivo_estudiante(context, estudiante),
+            lambda ctx=contexto_estudiante: renderizar_docx(template_path, ctx),
+        )
+        for estudiante, contexto_estudiante in contextos_por_estudiante(context)
+    )
+    filename = nombre_archivo_boletin(context, "zip")
+
+    return zip_en_flujo(archivos), filename
+
+
+def generar_boletin_pdf_grupo(db: Session, grupo_id: int, periodo_id: int) -> Tuple[BytesIO, str]:
+    """Boletines del grupo en un solo PDF (una página por estudiante), sin pasar por DOCX."""
+    context = obtener_contexto_vigente(db, grupo_id, periodo_id)
+    return generar_boletines_pdf(context), nombre_archivo_boletin(context, "pdf")
+
+
+def generar_boletines_pdf_por_estudiante(db: Session, grupo_id: int, periodo_id: int) -> Tuple[Iterator[bytes], str]:
+    """Un PDF por estudiante dentro de un ZIP que se genera mientras se envía."""
+    context = obtener_contexto_vigente(db, grupo_id, periodo_id)
+
+    archivos = (
+        (
+            nombre_archivo_estudiante(context, estudiante, "pdf"),
+            lambda est=estudiante: generar_boletin_pdf(datos_pdf_estudiante(context, est)).getvalue(),
+        )
+        for estudiante in context["estudiantes"]
+    )
+    filename = nombre_archivo_boletin(context, "zip")
+
+    return zip_en_flujo(archivos), filename
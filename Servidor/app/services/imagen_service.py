@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import logging
+import mimetypes
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+from typing import Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, ImageOps, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Bloques de lectura/escritura de la subida
+_TAMANO_BLOQUE = 1024 * 1024
+
+# Formato detectado por Pillow → (extensión, mime)
+_FORMATOS = {
+    "JPEG": (".jpg", "image/jpeg"),
+    "PNG": (".png", "image/png"),
+    "WEBP": (".webp", "image/webp"),
+    "GIF": (".gif", "image/gif"),
+}
+
+# Tipos de imagen con miniaturas generadas al subir (Persona.foto / Persona.firma)
+TIPOS_CON_MINIATURA = ("foto_persona", "firma")
+
+# Nombres servibles: por contenido (<sha256>.<ext>) o los uuid de antes del cambio.
+# Cualquier otro nombre es 404, así no hay forma de salir del directorio
+_NOMBRE_POR_CONTENIDO = re.compile(r"[0-9a-f]{64}\.(jpg|png|webp|gif)")
+_NOMBRE_ANTERIOR = re.compile(r"[0-9a-fA-F]{8}(-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}\.[A-Za-z0-9]{1,5}")
+
+# Ruta de descarga (routes/imagen_route.py, prefijo /imagenes)
+RUTA_ARCHIVOS = "/imagenes/archivo"
+
+
+# === RUTAS ===
+def directorio_imagenes() -> Path:
+    return Path(get_settings().IMAGEN_DIR)
+
+
+def directorio_variantes() -> Path:
+    return directorio_imagenes() / "variantes"
+
+
+def nombre_variante(nombre_archivo: str, ancho: int) -> str:
+    """'<sha256>.jpg' → '<sha256>_w96.jpg' (los GIF se reducen a PNG)."""
+    base, extension = os.path.splitext(nombre_archivo)
+    if extension == ".gif":
+        extension = ".png"
+    return f"{base}_w{ancho}{extension}"
+
+
+# === SUBIDA ===
+def _detectar_formato(ruta: Path) -> Tuple[str, str]:
+    """Valida con Pillow que el archivo sea una imagen permitida (no confía en el content-type)."""
+    try:
+        with Image.open(ruta) as imagen:
+            formato = imagen.format
+            imagen.verify()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "El archivo no es una imagen válida.")
+    if formato not in _FORMATOS:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, f"Formato de imagen no permitido: {formato}")
+    return _FORMATOS[formato]
+
+
+def _mover_a_destino(temporal: Path, sha256: str) -> Tuple[str, Path, str]:
+    extension, mime = _detectar_formato(temporal)
+    nombre = f"{sha256}{extension}"
+    destino = directorio_imagenes() / nombre
+    if destino.exists():
+        # Mismo contenido ya guardado: se reutiliza
+        temporal.unlink()
+    else:
+        os.replace(temporal, destino)
+    return nombre, destino, mime
+
+
+async def guardar_subida(archivo: UploadFile) -> Tuple[str, Path, int, str]:
+    """
+    Copia la subida a disco por bloques (fuera del event loop), calculando
+    el SHA-256 en el camino, y la guarda como `<sha256>.<ext>`.
+    Devuelve (nombre, ruta, bytes, mime). 413 si supera IMAGEN_TAMANO_MAX_MB.
+    """
+    maximo = get_settings().IMAGEN_TAMANO_MAX_MB * 1024 * 1024
+    directorio = directorio_imagenes()
+    directorio.mkdir(parents=True, exist_ok=True)
+
+    # El temporal va en el mismo directorio para que os.replace sea un rename
+    descriptor, nombre_temporal = tempfile.mkstemp(dir=directorio, prefix=".subida-")
+    temporal = Path(nombre_temporal)
+    digest, total = hashlib.sha256(), 0
+    try:
+        with os.fdopen(descriptor, "wb") as destino:
+            while bloque := await archivo.read(_TAMANO_BLOQUE):
+                total += len(bloque)
+                if total > maximo:
+                    raise HTTPException(
+                        413,
+                        f"La imagen supera el máximo de {get_settings().IMAGEN_TAMANO_MAX_MB} MB.",
+                    )
+                digest.update(bloque)
+                await run_in_threadpool(destino.write, bloque)
+        if total == 0:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "El archivo está vacío.")
+        nombre, ruta, mime = await run_in_threadpool(_mover_a_destino, temporal, digest.hexdigest())
+    except BaseException:
+        temporal.unlink(missing_ok=True)
+        raise
+    return nombre, ruta, total, mime
+
+
+# === VARIANTES (MINIATURAS) ===
+def generar_variante(nombre_archivo: str, ancho: int) -> Optional[Path]:
+    """
+    Crea (si no existe) la versión de `ancho` px de ancho, con la altura
+    proporcional y sin agrandar. Escribe en un temporal y renombra, así dos
+    peticiones simultáneas no dejan un archivo a medias. None si falta el original.
+    """
+    destino = directorio_variantes() / nombre_variante(nombre_archivo, ancho)
+    if destino.exists():
+        return destino
+    origen = directorio_imagenes() / nombre_archivo
+    if not origen.exists():
+        return None
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    with Image.open(origen) as imagen:
+        imagen.seek(0)
+        # Fotos de celular: aplicar la orientación EXIF antes de reducir
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.width > ancho:
+            alto = max(1, round(imagen.height * ancho / imagen.width))
+            imagen = imagen.resize((ancho, alto), Image.Resampling.LANCZOS)
+
+        extension = destino.suffix
+        if extension == ".jpg":
+            if imagen.mode not in ("RGB", "L"):
+                imagen = imagen.convert("RGB")
+            opciones = {"format": "JPEG", "quality": 85, "optimize": True, "progressive": True}
+        elif extension == ".webp":
+            opciones = {"format": "WEBP", "quality": 85}
+        else:
+            # PNG (también GIF): conserva la transparencia de las firmas
+            if imagen.mode == "P":
+                imagen = imagen.convert("RGBA")
+            opciones = {"format": "PNG", "optimize": True}
+
+        descriptor, nombre_temporal = tempfile.mkstemp(dir=destino.parent, prefix=".variante-")
+        try:
+            with os.fdopen(descriptor, "wb") as salida:
+                imagen.save(salida, **opciones)
+            os.replace(nombre_temporal, destino)
+        except BaseException:
+            Path(nombre_temporal).unlink(missing_ok=True)
+            raise
+    return destino
+
+
+def generar_miniaturas(nombre_archivo: str, anchos: Optional[Iterable[int]] = None) -> Dict[int, str]:
+    """Variantes de IMAGEN_ANCHOS_MINIATURA; devuelve {ancho: nombre de archivo}."""
+    anchos = anchos if anchos is not None else get_settings().IMAGEN_ANCHOS_MINIATURA
+    miniaturas = {}
+    for ancho in anchos:
+        ruta = generar_variante(nombre_archivo, ancho)
+        if ruta is not None:
+            miniaturas[ancho] = ruta.name
+    return miniaturas
+
+
+# === URLS FIRMADAS ===
+def _firma(nombre_archivo: str, ancho: Optional[int], vence: int) -> str:
+    mensaje = f"{nombre_archivo}|{ancho or ''}|{vence}".encode()
+    return hmac.new(get_settings().SECRET_KEY.encode(), mensaje, hashlib.sha256).hexdigest()
+
+
+def firmar_archivo(nombre_archivo: str, ancho: Optional[int] = None) -> Dict[str, str]:
+    """
+    Parámetros `vence` y `firma` para descargar `nombre_archivo` sin token
+    (sirven en `<img src>`). El vencimiento se redondea a ventanas de
+    IMAGEN_URL_VIGENCIA para que la URL no cambie en cada respuesta y el
+    navegador la siga teniendo en cache.
+    """
+    vigencia = max(1, get_settings().IMAGEN_URL_VIGENCIA)
+    vence = (int(time.time()) // vigencia + 2) * vigencia
+    return {"vence": str(vence), "firma": _firma(nombre_archivo, ancho, vence)}
+
+
+def verificar_firma(nombre_archivo: str, ancho: Optional[int], vence: Optional[int], firma: Optional[str]):
+    if vence is None or not firma or vence < time.time():
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Enlace de imagen inválido o vencido.")
+    if not hmac.compare_digest(firma, _firma(nombre_archivo, ancho, vence)):
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Enlace de imagen inválido o vencido.")
+
+
+def url_archivo(nombre_archivo: str, ancho: Optional[int] = None) -> str:
+    """URL firmada, relativa a la raíz de la API, de `nombre_archivo` (o su variante de `ancho` px)."""
+    parametros = {"w": ancho} if ancho is not None else {}
+    parametros.update(firmar_archivo(nombre_archivo, ancho))
+    return f"{RUTA_ARCHIVOS}/{nombre_archivo}?{urlencode(parametros)}"
+
+
+def nombre_subido(valor: Optional[str]) -> Optional[str]:
+    """
+    Nombre del archivo subido que guarda `persona.foto` / `persona.firma`.
+    Acepta también la ruta completa (`static/images/<sha256>.jpg`) que se
+    guardó en algunas filas; None si el valor no es una imagen subida
+    (vacío o una URL externa cargada a mano).
+    """
+    if not valor:
+        return None
+    nombre = valor.replace("\\", "/").rsplit("/", 1)[-1]
+    if _NOMBRE_POR_CONTENIDO.fullmatch(nombre) or _NOMBRE_ANTERIOR.fullmatch(nombre):
+        return nombre
+    return None
+
+
+def url_miniatura(valor: Optional[str], ancho: Optional[int] = None) -> Optional[str]:
+    """
+    URL firmada de la miniatura de `persona.foto` / `persona.firma` para
+    listados (por defecto el menor de IMAGEN_ANCHOS_MINIATURA, ya generado al
+    subir). Las URLs externas se devuelven tal cual.
+    """
+    nombre = nombre_subido(valor)
+    if nombre is None:
+        return valor or None
+    if ancho is None:
+        ancho = min(get_settings().IMAGEN_ANCHOS_MINIATURA)
+    return url_archivo(nombre, ancho)
+
+
+# === SERVIR ARCHIVOS ===
+class ArchivoImagen:
+    def __init__(self, ruta: Path, etag: str, inmutable: bool, estado: os.stat_result):
+        self.ruta = ruta
+        self.etag = etag
+        self.inmutable = inmutable
+        self.estado = estado
+        self.mime = mimetypes.guess_type(ruta.name)[0] or "application/octet-stream"
+
+
+def resolver_archivo(nombre_archivo: str, ancho: Optional[int] = None) -> ArchivoImagen:
+    """
+    Archivo a servir para `nombre_archivo` (o su variante de `ancho` px,
+    generada la primera vez). Los nombres por contenido nunca cambian: su
+    ETag es el propio hash y se pueden cachear como inmutables.
+    """
+    por_contenido = bool(_NOMBRE_POR_CONTENIDO.fullmatch(nombre_archivo))
+    if not por_contenido and not _NOMBRE_ANTERIOR.fullmatch(nombre_archivo):
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Imagen no encontrada.")
+
+    if ancho is None:
+        ruta = directorio_imagenes() / nombre_archivo
+    else:
+        permitidos = get_settings().IMAGEN_ANCHOS_VARIANTE
+        if ancho not in permitidos:
+            raise HTTPException(
+                status.HTTP_400_BAD_REQUEST,
+                f"Ancho no permitido. Use uno de: {', '.join(map(str, permitidos))}",
+            )
+        try:
+            ruta = generar_variante(nombre_archivo, ancho)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "No se pudo generar la variante de la imagen.")
+        if ruta is None:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Imagen no encontrada.")
+
+    try:
+        estado = ruta.stat()
+    except FileNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Imagen no encontrada.")
+
+    if por_contenido:
+        sufijo = f"-w{ancho}" if ancho else ""
+        etag = f'"{nombre_archivo.split(".")[0]}{sufijo}"'
+    else:
+        base = f"{estado.st_mtime}-{estado.st_size}"
+        etag = f'"{hashlib.md5(base.encode(), usedforsecurity=False).hexdigest()}"'
+    return ArchivoImagen(ruta, etag, por_contenido, estado)
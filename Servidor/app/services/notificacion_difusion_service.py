@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import insert, or_, select, union
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.core.database import SessionLocal
+from app.core.trabajos import Trabajo, registro_trabajos
+from app.models.models import DocenteAsignatura, Grupo, Matricula, Notificacion, Usuario, usuario_rol
+from app.services.notificacion_service import pendientes_publicacion, sumar_no_leidas
+
+logger = logging.getLogger(__name__)
+
+TIPO_TRABAJO = "difusion_notificaciones"
+
+
+# === DESTINATARIOS ===
+def _grupos_alcance(
+    grupos: Optional[List[int]],
+    grados: Optional[List[int]],
+    id_anio_lectivo: Optional[int],
+):
+    """Grupos vigentes indicados por id, por grado y/o por año lectivo (None si no se filtró por grupo)."""
+    if not grupos and not grados and id_anio_lectivo is None:
+        return None
+    consulta = select(Grupo.id_grupo).where(Grupo.fecha_eliminacion.is_(None))
+    seleccion = []
+    if grupos:
+        seleccion.append(Grupo.id_grupo.in_(grupos))
+    if grados:
+        seleccion.append(Grupo.id_grado.in_(grados))
+    if seleccion:
+        consulta = consulta.where(or_(*seleccion))
+    if id_anio_lectivo is not None:
+        consulta = consulta.where(Grupo.id_anio_lectivo == id_anio_lectivo)
+    return consulta
+
+
+def consulta_destinatarios(
+    grupos: Optional[List[int]] = None,
+    grados: Optional[List[int]] = None,
+    id_anio_lectivo: Optional[int] = None,
+    roles: Optional[List[int]] = None,
+    estudiantes: bool = True,
+    docentes: bool = False,
+    directores: bool = False,
+):
+    """
+    Usuarios vigentes a notificar, en una sola consulta (UNION, sin repetidos):
+    estudiantes matriculados en los grupos del alcance, directores de esos
+    grupos, docentes con asignación en ellos (o en su grado, si la asignación
+    no fija grupo) y usuarios con alguno de `roles`. None si no hay criterio.
+    """
+    alcance = _grupos_alcance(grupos, grados, id_anio_lectivo)
+    partes = []
+    if alcance is not None:
+        if estudiantes:
+            partes.append(
+                select(Usuario.id_usuario)
+                .join(Matricula, Matricula.id_persona == Usuario.id_persona)
+                .where(
+                    Matricula.id_grupo.in_(alcance),
+                    Matricula.fecha_eliminacion.is_(None),
+                    Matricula.activo.isnot(False),
+                )
+            )
+        if directores:
+            partes.append(
+                select(Grupo.id_usuario_director.label("id_usuario"))
+                .where(Grupo.id_grupo.in_(alcance), Grupo.id_usuario_director.isnot(None))
+            )
+        if docentes:
+            grados_alcance = select(Grupo.id_grado).where(Grupo.id_grupo.in_(alcance))
+            consulta = (
+                select(Usuario.id_usuario)
+                .join(DocenteAsignatura, DocenteAsignatura.id_persona_docente == Usuario.id_persona)
+                .where(
+                    DocenteAsignatura.fecha_eliminacion.is_(None),
+                    or_(
+                        DocenteAsignatura.id_grupo.in_(alcance),
+                        DocenteAsignatura.id_grupo.is_(None) & DocenteAsignatura.id_grado.in_(grados_alcance),
+                    ),
+                )
+            )
+            if id_anio_lectivo is not None:
+                consulta = consulta.where(or_(
+                    DocenteAsignatura.id_anio_lectivo == id_anio_lectivo,
+                    DocenteAsignatura.id_anio_lectivo.is_(None),
+                ))
+            partes.append(consulta)
+    if roles:
+        partes.append(
+            select(usuario_rol.c.id_usuario)
+            .where(usuario_rol.c.id_rol.in_(roles), usuario_rol.c.fecha_eliminacion.is_(None))
+        )
+    if not partes:
+        return None
+
+    candidatos = union(*partes).subquery()
+    return (
+        select(Usuario.id_usuario)
+        .where(Usuario.id_usuario.in_(select(candidatos.c.id_usuario)), Usuario.fecha_eliminacion.is_(None))
+        .order_by(Usuario.id_usuario)
+    )
+
+
+def resolver_destinatarios(db: Session, **criterios) -> List[int]:
+    consulta = consulta_destinatarios(**criterios)
+    if consulta is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Indique al menos un grupo, grado, año lectivo o rol destinatario",
+        )
+    destinatarios = list(db.execute(consulta).scalars())
+    if not destinatarios:
+        raise HTTPException(status_code=404, detail="No hay usuarios que coincidan con los destinatarios indicados")
+    return destinatarios
+
+
+# === INSERCIÓN POR LOTES ===
+def _insertar_lote(db: Session, ids: List[int], datos: Dict, ahora: datetime):
+    """
+    Un INSERT multi-fila por lote más el upsert de contadores, en la misma
+    transacción. El INSERT masivo no pasa por el flush del ORM: el contador y
+    el aviso por SSE se registran aquí.
+    """
+    filas = [{**datos, "id_usuario_destino": id_usuario, "fecha_creacion": ahora} for id_usuario in ids]
+    dialecto = db.get_bind().dialect
+    if dialecto.insert_executemany_returning:
+        nuevas = db.execute(
+            insert(Notificacion).returning(Notificacion.id_notificacion, Notificacion.id_usuario_destino), filas
+        ).all()
+        creadas = dict((u, i) for i, u in nuevas)
+    else:
+        # MySQL no devuelve los ids de un INSERT multi-fila: el aviso va sin id
+        db.execute(insert(Notificacion), filas)
+        creadas = dict.fromkeys(ids)
+    sumar_no_leidas(db, dict.fromkeys(ids, 1))
+
+    pendientes = pendientes_publicacion(db)
+    for id_usuario in ids:
+        pendientes["deltas"][id_usuario] += 1
+        pendientes["nuevas"].append((id_usuario, {
+            "id_notificacion": creadas.get(id_usuario),
+            "tipo": datos["tipo"],
+            "titulo": datos["titulo"],
+            "mensaje": datos["mensaje"],
+            "leida": False,
+            "prioridad": datos["prioridad"],
+            "fecha_creacion": ahora.isoformat(),
+        }))
+
+
+def _ejecutar_difusion(trabajo: Trabajo, destinatarios: List[int], datos: Dict):
+    lote = max(1, get_settings().NOTIFICACIONES_LOTE)
+    ahora = datetime.utcnow()
+    creadas = 0
+    db = SessionLocal()
+    try:
+        for inicio in range(0, len(destinatarios), lote):
+            ids = destinatarios[inicio:inicio + lote]
+            try:
+                _insertar_lote(db, ids, datos, ahora)
+                db.commit()
+                creadas += len(ids)
+                trabajo.avanzar(len(ids))
+            except Exception as e:
+                db.rollback()
+                logger.exception(f"Error en lote de difusión {trabajo.id_trabajo}")
+                trabajo.avanzar(len(ids), error=f"Usuarios {ids[0]}–{ids[-1]}: {e}")
+    finally:
+        db.close()
+
+    if not creadas:
+        trabajo.finalizar(error="No se creó ninguna notificación")
+    else:
+        trabajo.finalizar(str(creadas))
+
+
+def iniciar_difusion(destinatarios: List[int], datos: Dict) -> Trabajo:
+    """
+    Crea la notificación `datos` (tipo, titulo, mensaje, prioridad,
+    id_usuario_origen) para cada destinatario en segundo plano, por lotes de
+    NOTIFICACIONES_LOTE; el avance se consulta con `obtener_difusion`.
+    """
+    registro_trabajos.purgar(tipo=TIPO_TRABAJO)
+    trabajo = registro_trabajos.crear(TIPO_TRABAJO, total=len(destinatarios))
+    registro_trabajos.lanzar(trabajo, _ejecutar_difusion, destinatarios, datos)
+    return trabajo
+
+
+def obtener_difusion(id_trabajo: str) -> Trabajo:
+    trabajo = registro_trabajos.obtener(id_trabajo)
+    if not trabajo or trabajo.tipo != TIPO_TRABAJO:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return trabajo
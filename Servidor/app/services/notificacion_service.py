@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+from sqlalchemy import event, inspect, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.bulk import upsert
+from app.models.models import Notificacion, NotificacionContador
+
+logger = logging.getLogger(__name__)
+
+# Eventos en cola por conexión SSE; si el cliente no lee, se descartan
+# (el ping periódico vuelve a mandar el contador real)
+_MAX_EVENTOS_EN_COLA = 100
+
+
+def filtro_no_leidas():
+    return or_(Notificacion.leida.is_(False), Notificacion.leida.is_(None))
+
+
+# === CONTADOR DE NO LEÍDAS ===
+def contar_no_leidas(db: Session, id_usuario: int) -> int:
+    """Lectura por llave primaria de `notificacion_contador` (sin COUNT)."""
+    valor = db.execute(
+        select(NotificacionContador.no_leidas).where(NotificacionContador.id_usuario == id_usuario)
+    ).scalar()
+    return max(valor or 0, 0)
+
+
+async def contar_no_leidas_async(db: AsyncSession, id_usuario: int) -> int:
+    valor = (await db.execute(
+        select(NotificacionContador.no_leidas).where(NotificacionContador.id_usuario == id_usuario)
+    )).scalar()
+    return max(valor or 0, 0)
+
+
+def sumar_no_leidas(conexion, deltas: Dict[int, int]):
+    """Suma `deltas` {id_usuario: n} a los contadores (crea la fila si falta). No hace commit."""
+    ahora = datetime.utcnow()
+    filas = [
+        {"id_usuario": id_usuario, "no_leidas": delta, "fecha_actualizacion": ahora}
+        for id_usuario, delta in sorted(deltas.items()) if delta
+    ]
+    if filas:
+        upsert(conexion, NotificacionContador, filas, ("id_usuario",), ("fecha_actualizacion",), sumar=("no_leidas",))
+
+
+def marcar_todas_leidas(db: Session, id_usuario: int) -> int:
+    """
+    Marca como leídas todas las notificaciones del usuario en un UPDATE y
+    descuenta del contador las que cambiaron (no lo pone en 0: una
+    notificación insertada entre el UPDATE y el commit sigue contando).
+    Devuelve cuántas se marcaron; no hace commit.
+    """
+    resultado = db.execute(
+        update(Notificacion)
+        .where(Notificacion.id_usuario_destino == id_usuario, filtro_no_leidas())
+        .values(leida=True, fecha_leida=datetime.utcnow())
+        .execution_options(synchronize_session="fetch")
+    )
+    if resultado.rowcount:
+        sumar_no_leidas(db, {id_usuario: -resultado.rowcount})
+        pendientes_publicacion(db)["deltas"][id_usuario] -= resultado.rowcount
+    return resultado.rowcount
+
+
+# === ACTUALIZACIÓN POR CAMBIOS EN BD ===
+def pendientes_publicacion(session: Session) -> dict:
+    """Avisos SSE a publicar cuando la sesión haga commit (se descartan con rollback)."""
+    return session.info.setdefault(
+        "notificaciones_pendientes", {"deltas": defaultdict(int), "nuevas": []}
+    )
+
+
+def _anterior(obj, atributo: str):
+    historial = inspect(obj).attrs[atributo].history
+    if historial.deleted:
+        return historial.deleted[0]
+    return getattr(obj, atributo)
+
+
+def _payload(notificacion: Notificacion) -> dict:
+    # fecha_creacion la pone la BD: se lee del estado sin recargar la fila
+    fecha = inspect(notificacion).dict.get("fecha_creacion") or datetime.utcnow()
+    return {
+        "id_notificacion": notificacion.id_notificacion,
+        "tipo": notificacion.tipo,
+        "titulo": notificacion.titulo,
+        "mensaje": notificacion.mensaje,
+        "leida": bool(notificacion.leida),
+        "prioridad": notificacion.prioridad or "normal",
+        "fecha_creacion": fecha.isoformat(),
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_cambios(session: Session, flush_context):
+    deltas: Dict[int, int] = defaultdict(int)
+    nuevas = []
+    for obj in session.new:
+        if isinstance(obj, Notificacion) and obj.id_usuario_destino is not None:
+            if not obj.leida:
+                deltas[obj.id_usuario_destino] += 1
+            nuevas.append((obj.id_usuario_destino, _payload(obj)))
+    for obj in session.dirty:
+        if not isinstance(obj, Notificacion):
+            continue
+        # Leída ↔ no leída, o cambio de destinatario: se resta del estado anterior y se suma al nuevo
+        antes = (_anterior(obj, "id_usuario_destino"), not _anterior(obj, "leida"))
+        despues = (obj.id_usuario_destino, not obj.leida)
+        if antes == despues:
+            continue
+        if antes[0] is not None and antes[1]:
+            deltas[antes[0]] -= 1
+        if despues[0] is not None and despues[1]:
+            deltas[despues[0]] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Notificacion) and not _anterior(obj, "leida"):
+            destino = _anterior(obj, "id_usuario_destino")
+            if destino is not None:
+                deltas[destino] -= 1
+
+    deltas = {u: d for u, d in deltas.items() if d}
+    if not deltas and not nuevas:
+        return
+    # Mismo flush, misma transacción: el contador se confirma o se descarta con las notificaciones
+    sumar_no_leidas(session.connection(), deltas)
+    pendientes = pendientes_publicacion(session)
+    for id_usuario, delta in deltas.items():
+        pendientes["deltas"][id_usuario] += delta
+    pendientes["nuevas"].extend(nuevas)
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar(session: Session):
+    pendientes = session.info.pop("notificaciones_pendientes", None)
+    if not pendientes or not _bus.hay_suscriptores():
+        return
+    for id_usuario, payload in pendientes["nuevas"]:
+        _bus.publicar(id_usuario, ("notificacion", payload))
+    for id_usuario, delta in pendientes["deltas"].items():
+        if delta:
+            _bus.publicar(id_usuario, ("delta", delta))
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendientes(session: Session):
+    session.info.pop("notificaciones_pendientes", None)
+
+
+# === BUS EN PROCESO (SSE) ===
+class Suscripcion:
+    def __init__(self, id_usuario: int, loop: asyncio.AbstractEventLoop):
+        self.id_usuario = id_usuario
+        self.loop = loop
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=_MAX_EVENTOS_EN_COLA)
+
+
+class _BusNotificaciones:
+    """
+    Conexiones SSE abiertas por usuario. Los commits ocurren en hilos del
+    threadpool; cada evento se entrega en el loop de la conexión con
+    call_soon_threadsafe. Solo alcanza a las conexiones de este proceso: las
+    de otros workers se ponen al día con el ping (relee el contador).
+    """
+
+    def __init__(self):
+        self._suscripciones: Dict[int, Set[Suscripcion]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def hay_suscriptores(self) -> bool:
+        return bool(self._suscripciones)
+
+    def suscribir(self, id_usuario: int) -> Suscripcion:
+        suscripcion = Suscripcion(id_usuario, asyncio.get_running_loop())
+        with self._lock:
+            self._suscripciones[id_usuario].add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._lock:
+            activas = self._suscripciones.get(suscripcion.id_usuario)
+            if activas is not None:
+                activas.discard(suscripcion)
+                if not activas:
+                    del self._suscripciones[suscripcion.id_usuario]
+
+    def publicar(self, id_usuario: int, evento: tuple):
+        with self._lock:
+            destinos = list(self._suscripciones.get(id_usuario, ()))
+        for suscripcion in destinos:
+            try:
+                suscripcion.loop.call_soon_threadsafe(_encolar, suscripcion, evento)
+            except RuntimeError:
+                # Loop cerrado (apagado del servidor)
+                self.cancelar(suscripcion)
+
+
+def _encolar(suscripcion: Suscripcion, evento: tuple):
+    try:
+        suscripcion.cola.put_nowait(evento)
+    except asyncio.QueueFull:
+        logger.debug("Cola SSE llena para el usuario %s; evento descartado", suscripcion.id_usuario)
+
+
+_bus = _BusNotificaciones()
+
+
+def suscribir(id_usuario: int) -> Suscripcion:
+    return _bus.suscribir(id_usuario)
+
+
+def cancelar(suscripcion: Suscripcion):
+    _bus.cancelar(suscripcion)
+
+
+async def siguiente_evento(suscripcion: Suscripcion, espera: float) -> Optional[tuple]:
+    """Próximo evento de la suscripción, o None si pasan `espera` segundos sin eventos."""
+    try:
+        return await asyncio.wait_for(suscripcion.cola.get(), timeout=espera)
+    except asyncio.TimeoutError:
+        return None
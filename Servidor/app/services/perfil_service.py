@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Set, Tuple
+
+from sqlalchemy import event, exists, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import get_settings
+from app.core.permissions import version_permisos
+from app.core.security import credenciales_invalidas, version_token_usuario_async
+from app.models.models import Grupo, Pagina, Permiso, Persona, Rol, Usuario, usuario_rol
+from app.models.Usuario_model import Usuario as UsuarioSchema
+
+logger = logging.getLogger(__name__)
+
+
+# === CACHE DE PERFILES ===
+class _CachePerfiles:
+    """
+    Perfil armado (UsuarioSchema) por id_usuario. Cada entrada guarda la llave
+    de versión con la que se calculó: (versión de permisos, versión de tokens
+    del usuario, versión global de roles). Si alguna cambió, se recalcula.
+    """
+
+    def __init__(self):
+        self._entradas: "OrderedDict[int, Tuple[tuple, float, UsuarioSchema]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.version_roles = 0
+
+    def obtener(self, id_usuario: int, llave: tuple) -> Optional[UsuarioSchema]:
+        with self._lock:
+            entrada = self._entradas.get(id_usuario)
+            if entrada is None:
+                return None
+            llave_guardada, expira, perfil = entrada
+            if llave_guardada != llave or time.monotonic() >= expira:
+                del self._entradas[id_usuario]
+                return None
+            self._entradas.move_to_end(id_usuario)
+            return perfil
+
+    def guardar(self, id_usuario: int, llave: tuple, perfil: UsuarioSchema):
+        settings = get_settings()
+        with self._lock:
+            self._entradas[id_usuario] = (llave, time.monotonic() + settings.PERFIL_CACHE_TTL, perfil)
+            self._entradas.move_to_end(id_usuario)
+            while len(self._entradas) > settings.PERFIL_CACHE_MAX:
+                self._entradas.popitem(last=False)
+
+    def descartar_usuarios(self, ids: Set[int]):
+        with self._lock:
+            for id_usuario in ids:
+                self._entradas.pop(id_usuario, None)
+
+    def descartar_personas(self, ids_persona: Set[int]):
+        with self._lock:
+            for id_usuario, (_, _, perfil) in list(self._entradas.items()):
+                if perfil.id_persona in ids_persona:
+                    del self._entradas[id_usuario]
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.version_roles += 1
+
+
+_cache_perfiles = _CachePerfiles()
+
+
+def invalidar_cache_perfiles():
+    _cache_perfiles.invalidar()
+
+
+# === INVALIDACIÓN POR CAMBIOS EN BD ===
+def _valores(obj, atributo: str) -> Set[int]:
+    historial = inspect(obj).attrs[atributo].history
+    valores = set(historial.added) | set(historial.unchanged) | set(historial.deleted)
+    return {v for v in valores if v is not None}
+
+
+@event.listens_for(Session, "after_flush")
+def _registrar_cambios(session: Session, flush_context):
+    usuarios, personas, roles = set(), set(), False
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Usuario):
+            usuarios.update(_valores(obj, "id_usuario"))
+        elif isinstance(obj, Persona):
+            personas.update(_valores(obj, "id_persona"))
+        elif isinstance(obj, Grupo):
+            # es_director_grupo del director anterior y del nuevo
+            usuarios.update(_valores(obj, "id_usuario_director"))
+        elif isinstance(obj, Rol):
+            roles = True
+    if usuarios or personas or roles:
+        pendientes = session.info.setdefault("perfiles_afectados", {"usuarios": set(), "personas": set(), "roles": False})
+        pendientes["usuarios"] |= usuarios
+        pendientes["personas"] |= personas
+        pendientes["roles"] = pendientes["roles"] or roles
+
+
+@event.listens_for(Session, "after_commit")
+def _aplicar_invalidacion(session: Session):
+    pendientes = session.info.pop("perfiles_afectados", None)
+    if not pendientes:
+        return
+    if pendientes["roles"]:
+        _cache_perfiles.invalidar()
+        return
+    _cache_perfiles.descartar_usuarios(pendientes["usuarios"])
+    _cache_perfiles.descartar_personas(pendientes["personas"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendientes(session: Session):
+    session.info.pop("perfiles_afectados", None)
+
+
+# === CONSTRUCCIÓN DEL PERFIL ===
+async def _cargar_perfil(db: AsyncSession, id_usuario: int, username: str) -> UsuarioSchema:
+    # 1. Usuario + persona + si dirige algún grupo, en una consulta
+    es_director = exists().where(
+        Grupo.id_usuario_director == Usuario.id_usuario,
+        Grupo.fecha_eliminacion.is_(None),
+    ).label("es_director_grupo")
+    fila = (await db.execute(
+        select(Usuario, es_director)
+        .options(joinedload(Usuario.persona))
+        .where(
+            Usuario.id_usuario == id_usuario,
+            Usuario.username == username,
+            Usuario.fecha_eliminacion.is_(None),
+        )
+    )).first()
+    if fila is None:
+        raise credenciales_invalidas()
+    user, es_director_grupo = fila
+
+    # 2. Roles con sus permisos y páginas, en una consulta
+    filas = (await db.execute(
+        select(
+            Rol.nombre_rol,
+            Permiso.id_permiso, Permiso.puede_ver, Permiso.puede_crear,
+            Permiso.puede_editar, Permiso.puede_eliminar,
+            Pagina.id_pagina, Pagina.nombre, Pagina.ruta, Pagina.visible,
+        )
+        .select_from(usuario_rol)
+        .join(Rol, Rol.id_rol == usuario_rol.c.id_rol)
+        .outerjoin(Permiso, Permiso.id_rol == Rol.id_rol)
+        .outerjoin(Pagina, Pagina.id_pagina == Permiso.id_pagina)
+        .where(usuario_rol.c.id_usuario == id_usuario)
+        .order_by(Permiso.id_permiso)
+    )).all()
+
+    roles = list(dict.fromkeys(f.nombre_rol.lower() for f in filas))
+    # Desarrollador ve TODAS las páginas; el resto solo las visibles
+    es_desarrollador = "desarrollador" in roles
+    permisos = [
+        {
+            "pagina": {"id_pagina": f.id_pagina, "nombre": f.nombre, "ruta": f.ruta},
+            "puede_ver": f.puede_ver,
+            "puede_crear": f.puede_crear,
+            "puede_editar": f.puede_editar,
+            "puede_eliminar": f.puede_eliminar,
+        }
+        for f in filas
+        if f.id_permiso is not None and f.id_pagina is not None and (es_desarrollador or f.visible)
+    ]
+
+    datos = {
+        "id_usuario": user.id_usuario,
+        "username": user.username,
+        "password": user.password,
+        "es_docente": user.es_docente,
+        "es_director_grupo": bool(es_director_grupo),
+        "id_persona": user.id_persona,
+        "permisos": permisos,
+        "roles": roles,
+        "fecha_creacion": user.fecha_creacion,
+        "fecha_actualizacion": user.fecha_actualizacion,
+        "fecha_eliminacion": user.fecha_eliminacion,
+    }
+    if user.persona:
+        datos["persona"] = {
+            "id_persona": user.persona.id_persona,
+            "nombre": user.persona.nombre,
+            "apellido": user.persona.apellido,
+            "email": user.persona.email,
+            "telefono": user.persona.telefono,
+        }
+    return UsuarioSchema(**datos)
+
+
+async def obtener_perfil(db: AsyncSession, payload: dict) -> UsuarioSchema:
+    """
+    Perfil con roles y permisos del usuario del token. Con la cache vigente no
+    se consulta la BD (salvo la recarga periódica de versiones de token).
+    """
+    id_usuario, username = payload["uid"], payload["sub"]
+    version_token = await version_token_usuario_async(db, id_usuario)
+    if "ver" in payload and payload["ver"] != version_token:
+        raise credenciales_invalidas()
+
+    llave = (version_permisos(), version_token, _cache_perfiles.version_roles)
+    perfil = _cache_perfiles.obtener(id_usuario, llave)
+    if perfil is not None and perfil.username == username:
+        return perfil
+
+    perfil = await _cargar_perfil(db, id_usuario, username)
+    _cache_perfiles.guardar(id_usuario, llave, perfil)
+    return perfil
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import and_, case, delete, event, func, inspect, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.bulk import upsert
+from app.models.models import Persona, PersonaBusqueda
+
+logger = logging.getLogger(__name__)
+
+_NO_ALFANUMERICO = re.compile(r"[^0-9a-z]+")
+
+# Tamaño de lote al reindexar toda la tabla persona
+_LOTE_REINDEXAR = 1000
+
+
+# === NORMALIZACIÓN ===
+def normalizar(texto: Optional[str]) -> str:
+    """'Núñez  Pérez-Gómez' → 'nunez perez gomez' (sin tildes, minúsculas, un espacio)."""
+    if not texto:
+        return ""
+    sin_tildes = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return _NO_ALFANUMERICO.sub(" ", sin_tildes.lower()).strip()
+
+
+def _fila_busqueda(persona: Persona) -> dict:
+    return {
+        "id_persona": persona.id_persona,
+        "texto": " ".join(
+            t for t in (normalizar(persona.nombre), normalizar(persona.apellido),
+                        normalizar(persona.numero_identificacion)) if t
+        ),
+        "identificacion": normalizar(persona.numero_identificacion).replace(" ", "") or None,
+        "fecha_actualizacion": datetime.now(),
+    }
+
+
+# === SINCRONIZACIÓN CON persona ===
+_CAMPOS = ("nombre", "apellido", "numero_identificacion")
+
+
+@event.listens_for(Session, "after_flush")
+def _sincronizar_tras_flush(session: Session, flush_context):
+    filas = [_fila_busqueda(obj) for obj in session.new if isinstance(obj, Persona)]
+    filas += [
+        _fila_busqueda(obj) for obj in session.dirty
+        if isinstance(obj, Persona) and any(inspect(obj).attrs[c].history.has_changes() for c in _CAMPOS)
+    ]
+    eliminadas = [obj.id_persona for obj in session.deleted if isinstance(obj, Persona)]
+
+    conexion = session.connection()
+    if filas:
+        upsert(conexion, PersonaBusqueda, filas, ("id_persona",), ("texto", "identificacion", "fecha_actualizacion"))
+    if eliminadas:
+        conexion.execute(delete(PersonaBusqueda).where(PersonaBusqueda.id_persona.in_(eliminadas)))
+
+
+def reindexar(db: Session, ids: Optional[Iterable[int]] = None) -> int:
+    """Recalcula el texto de búsqueda (todas las personas o solo `ids`) por lotes. Hace commit."""
+    query = select(Persona).order_by(Persona.id_persona)
+    if ids is not None:
+        query = query.where(Persona.id_persona.in_(list(ids)))
+
+    total, ultimo = 0, 0
+    while True:
+        lote = db.execute(
+            query.where(Persona.id_persona > ultimo).limit(_LOTE_REINDEXAR)
+        ).scalars().all()
+        if not lote:
+            break
+        upsert(db, PersonaBusqueda, [_fila_busqueda(p) for p in lote],
+               ("id_persona",), ("texto", "identificacion", "fecha_actualizacion"))
+        db.commit()
+        total += len(lote)
+        ultimo = lote[-1].id_persona
+        db.expunge_all()
+    logger.info("Índice de búsqueda de personas reconstruido: %s registros", total)
+    return total
+
+
+# === CONSULTA ===
+def _escapar_like(termino: str) -> str:
+    return termino.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filtro_busqueda(termino: str):
+    """
+    Condición sobre PersonaBusqueda: cada palabra del término debe aparecer
+    (sin importar tildes ni mayúsculas). Requiere unir persona_busqueda.
+    """
+    palabras = normalizar(termino).split()
+    return and_(*[
+        PersonaBusqueda.texto.like(f"%{_escapar_like(p)}%", escape="\\") for p in palabras
+    ])
+
+
+def rango_busqueda(termino: str, dialecto: str):
+    """
+    Expresión de orden (menor = más relevante). En PostgreSQL usa la
+    similitud de trigramas; en el resto, un rango por tipo de coincidencia:
+    identificación exacta, texto que empieza por el término, palabra que
+    empieza por el término, resto.
+    """
+    normalizado = normalizar(termino)
+    identificacion = normalizado.replace(" ", "")
+    if dialecto == "postgresql":
+        return case(
+            (PersonaBusqueda.identificacion == identificacion, literal(-1.0)),
+            else_=1.0 - func.similarity(PersonaBusqueda.texto, normalizado),
+        )
+    escapado = _escapar_like(normalizado)
+    return case(
+        (PersonaBusqueda.identificacion == identificacion, 0),
+        (PersonaBusqueda.texto.like(f"{escapado}%", escape="\\"), 1),
+        (PersonaBusqueda.texto.like(f"% {escapado}%", escape="\\"), 2),
+        else_=3,
+    )
+
+
+def condicion_busqueda(termino: str, dialecto: str):
+    """
+    Todas las palabras en el texto, o la identificación empieza por el término.
+    En PostgreSQL también acepta coincidencias aproximadas (errores de tipeo)
+    con el operador `%` de pg_trgm, que usa el índice GIN y el umbral
+    `pg_trgm.similarity_threshold` (0.3 por defecto).
+    """
+    identificacion = normalizar(termino).replace(" ", "")
+    condicion = or_(
+        filtro_busqueda(termino),
+        # Identificación sin puntos ni guiones: "1098765" encuentra "1.098.765"
+        PersonaBusqueda.identificacion.like(f"{_escapar_like(identificacion)}%", escape="\\"),
+    )
+    if dialecto == "postgresql":
+        condicion = or_(condicion, PersonaBusqueda.texto.op("%")(normalizar(termino)))
+    return condicion
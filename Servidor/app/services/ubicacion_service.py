@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+
+from app.core.catalogo_cache import version_catalogos
+from app.core.config import get_settings
+from app.models.models import Ciudad, Departamento, Pais, Persona
+from app.services.persona_busqueda_service import normalizar
+
+_TABLAS_CIUDADES = ("ciudad", "departamento", "pais")
+
+
+# === PROYECCIONES ===
+def consulta_departamentos():
+    """Departamentos vigentes con el nombre del país, en una sola consulta."""
+    return (
+        select(
+            Departamento.id_departamento,
+            Departamento.nombre,
+            Departamento.id_pais,
+            Pais.nombre.label("pais_nombre"),
+        )
+        .join(Pais, Pais.id_pais == Departamento.id_pais)
+        .where(Departamento.fecha_eliminacion.is_(None))
+    )
+
+
+def consulta_ciudades():
+    """Ciudades vigentes con departamento y país, en una sola consulta."""
+    return (
+        select(
+            Ciudad.id_ciudad,
+            Ciudad.nombre,
+            Ciudad.id_departamento,
+            Departamento.nombre.label("departamento_nombre"),
+            Pais.nombre.label("pais_nombre"),
+        )
+        .join(Departamento, Departamento.id_departamento == Ciudad.id_departamento)
+        .join(Pais, Pais.id_pais == Departamento.id_pais)
+        .where(Ciudad.fecha_eliminacion.is_(None))
+    )
+
+
+def lugares_nacimiento(db: Session) -> List[dict]:
+    """
+    Ciudades donde nació al menos una persona, como "Ciudad, Departamento, País".
+    EXISTS en lugar de DISTINCT sobre persona: recorre ciudades, no personas.
+    """
+    filas = db.execute(
+        select(
+            Ciudad.id_ciudad,
+            Ciudad.nombre,
+            Departamento.nombre.label("departamento_nombre"),
+            Pais.nombre.label("pais_nombre"),
+        )
+        .join(Departamento, Departamento.id_departamento == Ciudad.id_departamento)
+        .join(Pais, Pais.id_pais == Departamento.id_pais)
+        .where(
+            Ciudad.fecha_eliminacion.is_(None),
+            exists().where(Persona.id_ciudad_nacimiento == Ciudad.id_ciudad),
+        )
+    ).all()
+    lugares = [
+        {"id_ciudad": f.id_ciudad, "nombre_completo": f"{f.nombre}, {f.departamento_nombre}, {f.pais_nombre}"}
+        for f in filas
+    ]
+    lugares.sort(key=lambda l: l["nombre_completo"])
+    return lugares
+
+
+def arbol_ubicaciones(db: Session) -> List[dict]:
+    """País → departamentos → ciudades (solo vigentes) armado desde una consulta plana."""
+    filas = db.execute(
+        select(
+            Pais.id_pais, Pais.nombre, Pais.codigo_iso,
+            Departamento.id_departamento, Departamento.nombre.label("departamento_nombre"),
+            Ciudad.id_ciudad, Ciudad.nombre.label("ciudad_nombre"),
+        )
+        .outerjoin(Departamento, (Departamento.id_pais == Pais.id_pais) & Departamento.fecha_eliminacion.is_(None))
+        .outerjoin(Ciudad, (Ciudad.id_departamento == Departamento.id_departamento) & Ciudad.fecha_eliminacion.is_(None))
+        .where(Pais.fecha_eliminacion.is_(None))
+        .order_by(Pais.nombre, Departamento.nombre, Ciudad.nombre)
+    ).all()
+
+    paises: Dict[int, dict] = {}
+    departamentos: Dict[int, dict] = {}
+    for f in filas:
+        pais = paises.get(f.id_pais)
+        if pais is None:
+            pais = paises[f.id_pais] = {
+                "id_pais": f.id_pais, "nombre": f.nombre, "codigo_iso": f.codigo_iso, "departamentos": [],
+            }
+        if f.id_departamento is None:
+            continue
+        depto = departamentos.get(f.id_departamento)
+        if depto is None:
+            depto = departamentos[f.id_departamento] = {
+                "id_departamento": f.id_departamento, "nombre": f.departamento_nombre, "ciudades": [],
+            }
+            pais["departamentos"].append(depto)
+        if f.id_ciudad is not None:
+            depto["ciudades"].append({"id_ciudad": f.id_ciudad, "nombre": f.ciudad_nombre})
+    return list(paises.values())
+
+
+# === AUTOCOMPLETAR CIUDADES ===
+class _IndiceCiudades:
+    """
+    Lista ordenada de (clave normalizada, posición) para buscar por prefijo
+    con bisect. Cada ciudad aparece una vez por palabra de su nombre, así
+    "gil" encuentra "San Gil". Se reconstruye cuando cambia ciudad,
+    departamento o país (versiones de catalogo_cache) o vence el TTL.
+    """
+
+    def __init__(self):
+        # (claves, ciudades, nombres normalizados), reemplazado en bloque al reconstruir
+        self._datos: Tuple[List[Tuple[str, int]], List[dict], List[str]] = ([], [], [])
+        self._versiones: Optional[tuple] = None
+        self._expira = 0.0
+        self._lock = threading.Lock()
+
+    def _construir(self, db: Session):
+        ciudades = [dict(f._mapping) for f in db.execute(
+            consulta_ciudades().order_by(Ciudad.nombre, Ciudad.id_ciudad)
+        )]
+        nombres = [normalizar(c["nombre"]) for c in ciudades]
+        claves = []
+        for posicion, nombre in enumerate(nombres):
+            palabras = nombre.split()
+            for i in range(len(palabras)):
+                claves.append((" ".join(palabras[i:]), posicion))
+        claves.sort()
+        return claves, ciudades, nombres
+
+    def _vigente(self, versiones: tuple) -> bool:
+        return self._versiones == versiones and time.monotonic() < self._expira
+
+    def buscar(self, db: Session, termino: str, limite: int) -> List[dict]:
+        versiones = version_catalogos(*_TABLAS_CIUDADES)
+        if not self._vigente(versiones):
+            with self._lock:
+                if not self._vigente(versiones):
+                    self._datos = self._construir(db)
+                    self._versiones = versiones
+                    self._expira = time.monotonic() + get_settings().CATALOGO_CACHE_TTL
+        claves, ciudades, nombres = self._datos
+
+        prefijo = normalizar(termino)
+        if not prefijo:
+            return []
+        # Coincidencias al inicio del nombre primero, luego al inicio de otra palabra
+        # Las posiciones siguen el orden alfabético de `ciudades`
+        inicio, resto = set(), set()
+        i = bisect_left(claves, (prefijo, -1))
+        while i < len(claves) and claves[i][0].startswith(prefijo):
+            posicion = claves[i][1]
+            (inicio if nombres[posicion].startswith(prefijo) else resto).add(posicion)
+            i += 1
+        posiciones = sorted(inicio) + sorted(resto - inicio)
+        return [ciudades[p] for p in posiciones[:limite]]
+
+
+_indice_ciudades = _IndiceCiudades()
+
+
+def autocompletar_ciudades(db: Session, termino: str, limite: int = 10) -> List[dict]:
+    return _indice_ciudades.buscar(db, termino, limite)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routes import aniolectivo_route
 from app.routes import estado_aniolectivo_route
@@ -29,6 +29,7 @@ from app.routes import boletin_route
 
 from app.routes import auth
 from app.core.database import Base, engine
+from app.core.permissions import require_permission
 from app.models import *  # Importar todos los modelos para crear tablas
 
 # Crear la aplicación FastAPI
@@ -45,19 +46,45 @@ async def startup_event():
         # Solo ejecutar migración si es PostgreSQL (producción)
         if "postgresql" in settings.DATABASE_URL.lower():
             print("🔄 Detectado PostgreSQL - Ejecutando migración...")
+            # pg_trgm: índice de trigramas de persona_busqueda
+            from sqlalchemy import text
+            with engine.begin() as conexion:
+                conexion.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             # Crear todas las tablas
             Base.metadata.create_all(bind=engine)
             print("✅ Tablas creadas correctamente")
+
+            # Cambios sobre tablas existentes (índices, etc.)
+            from app.core.migraciones import migrar
+            aplicadas = migrar(engine)
+            if aplicadas:
+                print(f"✅ Migraciones aplicadas: {', '.join(aplicadas)}")
             
             # Ejecutar migración de datos esenciales
             from migrate_data import migrate_data
             migrate_data()
         else:
-            print("🏠 Detectado MySQL local - Sin migración")
+            print("🏠 Detectado MySQL local - Sin migración (usar: python -m app.core.migraciones)")
         
     except Exception as e:
         print(f"⚠️ Error en startup: {e}")
 
+    # Procesos de bcrypt listos antes del primer inicio de sesión
+    from app.core.contrasenas import iniciar_pool_hash
+    iniciar_pool_hash()
+
+    # Hilo que vacía la cola de correo saliente
+    from app.core.correo import iniciar_envio_correos
+    iniciar_envio_correos()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.core.contrasenas import cerrar_pool_hash
+    cerrar_pool_hash()
+    from app.core.correo import detener_envio_correos
+    detener_envio_correos()
+
 
 
 
@@ -69,6 +96,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cursor-Siguiente", "X-Total-Count"],
 )
 
 # Health check endpoint
@@ -77,6 +105,16 @@ def health():
     return {"status": "ok", "message": "API is running"}
 
 
+@app.get("/health/pool")
+def health_pool(user=Depends(require_permission("/permisos", "ver"))):
+    """
+    Conexiones en uso, overflow, timeouts e histogramas de espera/checkout/uso (ms).
+    Expone la carga del servidor: solo para quien administra permisos.
+    """
+    from app.core.database import metricas_pool
+    return metricas_pool()
+
+
 # Incluir el router 
 app.include_router(notas_route.router)
 app.include_router(auth.router)
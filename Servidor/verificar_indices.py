@@ -0,0 +1,147 @@
+"""
+Lista las columnas que los routers usan en filtros (.filter / .where / join)
+y que no encabezan ningún índice, llave primaria o restricción única.
+
+Uso (desde Servidor/):
+    python verificar_indices.py
+    python verificar_indices.py --todas   # también las cubiertas parcialmente
+
+Por defecto se omiten las columnas cubiertas solo por una llave foránea
+(MySQL/InnoDB crea un índice para cada FK, PostgreSQL no) y las que están en
+un índice compuesto sin encabezarlo. Sale con código 1 si encuentra
+columnas sin índice.
+"""
+import ast
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+# Solo se leen los modelos; no hace falta la base de datos real ni su driver
+os.environ["DATABASE_URL"] = "sqlite://"
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from app.models import models  # noqa: E402
+from app.core.database import Base  # noqa: E402
+
+DIRECTORIO_RUTAS = Path(__file__).resolve().parent / "app" / "routes"
+METODOS_FILTRO = {"filter", "where", "join", "outerjoin", "having"}
+# Borrado lógico: lo cubren los índices parciales (WHERE fecha_eliminacion IS NULL)
+COLUMNAS_IGNORADAS = {"fecha_eliminacion"}
+
+
+def _modelos():
+    """Nombre de clase / tabla en models.py → Table."""
+    tablas = {}
+    for nombre in dir(models):
+        objeto = getattr(models, nombre)
+        if isinstance(objeto, type) and issubclass(objeto, Base) and hasattr(objeto, "__table__"):
+            tablas[nombre] = objeto.__table__
+        elif getattr(objeto, "metadata", None) is Base.metadata and hasattr(objeto, "c"):
+            tablas[nombre] = objeto
+    return tablas
+
+
+def _columnas_indexadas(tabla):
+    """(encabezan índice / PK / unique, cubiertas solo por FK, dentro de un compuesto)."""
+    indexadas, en_compuesto = set(), set()
+    for indice in tabla.indexes:
+        columnas = [c.name for c in indice.columns]
+        indexadas.add(columnas[0])
+        en_compuesto.update(columnas[1:])
+    for restriccion in tabla.constraints:
+        columnas = [c.name for c in getattr(restriccion, "columns", [])]
+        if columnas and restriccion.__class__.__name__ in ("PrimaryKeyConstraint", "UniqueConstraint"):
+            indexadas.add(columnas[0])
+            en_compuesto.update(columnas[1:])
+    for columna in tabla.columns:
+        if columna.index or columna.unique:
+            indexadas.add(columna.name)
+    solo_fk = {fk.parent.name for fk in tabla.foreign_keys} - indexadas
+    return indexadas, solo_fk, en_compuesto - indexadas
+
+
+class _Visitante(ast.NodeVisitor):
+    def __init__(self, archivo, tablas):
+        self.archivo = archivo
+        self.tablas = tablas
+        self.alias = {}
+        self.usos = defaultdict(list)
+
+    def visit_ImportFrom(self, nodo):
+        if nodo.module and nodo.module.endswith("models.models"):
+            for nombre in nodo.names:
+                if nombre.name in self.tablas:
+                    self.alias[nombre.asname or nombre.name] = nombre.name
+        self.generic_visit(nodo)
+
+    def visit_Assign(self, nodo):
+        # Alias = aliased(Modelo)
+        valor = nodo.value
+        if (isinstance(valor, ast.Call) and getattr(valor.func, "id", None) == "aliased"
+                and valor.args and isinstance(valor.args[0], ast.Name)
+                and valor.args[0].id in self.alias):
+            for destino in nodo.targets:
+                if isinstance(destino, ast.Name):
+                    self.alias[destino.id] = self.alias[valor.args[0].id]
+        self.generic_visit(nodo)
+
+    def visit_Call(self, nodo):
+        if isinstance(nodo.func, ast.Attribute) and nodo.func.attr in METODOS_FILTRO:
+            for argumento in nodo.args:
+                for sub in ast.walk(argumento):
+                    self._registrar(sub)
+        self.generic_visit(nodo)
+
+    def _registrar(self, nodo):
+        if not isinstance(nodo, ast.Attribute):
+            return
+        base = nodo.value
+        # tabla.c.columna (Table de Core, p. ej. usuario_rol)
+        if isinstance(base, ast.Attribute) and base.attr == "c" and isinstance(base.value, ast.Name):
+            base = base.value
+        if isinstance(base, ast.Name) and base.id in self.alias:
+            tabla = self.tablas[self.alias[base.id]]
+            if nodo.attr in tabla.c and nodo.attr not in COLUMNAS_IGNORADAS:
+                self.usos[(tabla.name, nodo.attr)].append(f"{self.archivo.name}:{nodo.lineno}")
+
+
+def main():
+    todas = "--todas" in sys.argv
+    tablas = _modelos()
+    usos = defaultdict(list)
+    for archivo in sorted(DIRECTORIO_RUTAS.glob("*.py")):
+        visitante = _Visitante(archivo, tablas)
+        visitante.visit(ast.parse(archivo.read_text(encoding="utf-8"), filename=str(archivo)))
+        for clave, lugares in visitante.usos.items():
+            usos[clave].extend(lugares)
+
+    por_tabla = {t.name: t for t in tablas.values()}
+    faltantes = []
+    for (tabla, columna), lugares in sorted(usos.items()):
+        indexadas, solo_fk, en_compuesto = _columnas_indexadas(por_tabla[tabla])
+        if columna in indexadas:
+            continue
+        if (columna in solo_fk or columna in en_compuesto) and not todas:
+            continue
+        if columna in solo_fk:
+            nota = " (solo FK: indexada en MySQL, no en PostgreSQL)"
+        elif columna in en_compuesto:
+            nota = " (en índice compuesto, no al inicio)"
+        else:
+            nota = ""
+        faltantes.append((tabla, columna, lugares, nota))
+
+    if not faltantes:
+        print("✅ Todas las columnas filtradas por los routers tienen índice")
+        return 0
+
+    print(f"⚠️ {len(faltantes)} columnas filtradas sin índice que las encabece:\n")
+    for tabla, columna, lugares, nota in faltantes:
+        extra = f" (+{len(lugares) - 3})" if len(lugares) > 3 else ""
+        print(f"  {tabla}.{columna}{nota}: {len(lugares)} usos — {', '.join(lugares[:3])}{extra}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -26,6 +26,14 @@ export const API_CONFIG = {
   RETRY_DELAY: 1000,
 } as const;
 
+// URL absoluta de un recurso servido por la API (p. ej. las URLs firmadas de
+// /imagenes/archivo que traen los listados); las URLs completas quedan igual
+export const urlApi = (ruta?: string | null): string | undefined => {
+  if (!ruta) return undefined;
+  if (/^https?:\/\//.test(ruta)) return ruta;
+  return `${API_CONFIG.BASE_URL}${ruta}`;
+};
+
 export const HTTP_STATUS = {
   OK: 200,
   CREATED: 201,
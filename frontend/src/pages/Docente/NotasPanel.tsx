@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useAppContext } from '../../context';
 import { useApi } from '../../hooks/useApi';
+import { urlApi } from '../../config/api';
 
 interface Asignatura {
   id_docente_asignatura: number;
@@ -26,6 +27,7 @@ interface Estudiante {
   nombre: string;
   apellido: string;
   foto?: string;
+  foto_miniatura?: string;
   calificacion_actual?: number;
   id_calificacion?: number;
   total_fallas?: number;
@@ -520,9 +522,9 @@ const NotasPanel: React.FC = () => {
                     <tr key={est.id_persona}>
                       <td>{index + 1}</td>
                       <td>
-                        {est.foto && (
+                        {est.foto_miniatura && (
                           <img
-                            src={est.foto}
+                            src={urlApi(est.foto_miniatura)}
                             alt={`${est.nombre} ${est.apellido}`}
                             style={{ width: '30px', height: '30px', borderRadius: '50%', marginRight: '10px' }}
                           />
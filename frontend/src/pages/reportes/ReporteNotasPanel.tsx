@@ -2,6 +2,7 @@ import React, { useCallback, useEffect, useMemo, useState } from 'react';
 import { useAppContext } from '../../context';
 import { useApi } from '../../hooks/useApi';
 import { usePermissions } from '../../hooks/usePermissions';
+import { urlApi } from '../../config/api';
 import './ReporteNotasPanel.css';
 
 type Nullable<T> = T | null;
@@ -54,6 +55,7 @@ interface EstudianteNotaRow {
   nombre: string;
   apellido: string;
   foto?: string;
+  foto_miniatura?: string;
   numeroIdentificacion?: string | null;
   id_calificacion?: Nullable<number>;
   calificacion_actual?: Nullable<number>;
@@ -81,6 +83,7 @@ interface ClasePeriodoResponse {
     apellido: string;
     numero_identificacion?: string | null;
     foto?: string;
+    foto_miniatura?: string;
     id_calificacion?: Nullable<number>;
     calificacion_actual?: Nullable<number>;
     total_fallas?: number;
@@ -489,6 +492,7 @@ const ReporteNotasPanel: React.FC = () => {
         nombre: est.nombre,
         apellido: est.apellido,
         foto: est.foto,
+        foto_miniatura: est.foto_miniatura,
         numeroIdentificacion: est.numero_identificacion ?? null,
         id_calificacion: est.id_calificacion,
           calificacion_actual: notaFuente,
@@ -1047,7 +1051,7 @@ const ReporteNotasPanel: React.FC = () => {
                         <td>{index + 1}</td>
                         <td>
                           <div className="estudiante-info">
-                            {estudiante.foto && <img src={estudiante.foto} alt={estudiante.nombre} />}
+                            {estudiante.foto_miniatura && <img src={urlApi(estudiante.foto_miniatura)} alt={estudiante.nombre} />}
                             <div>
                               <strong>{estudiante.nombre} {estudiante.apellido}</strong>
                                 <span>ID interno: {estudiante.id_persona}</span>